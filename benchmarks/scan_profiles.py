@@ -0,0 +1,41 @@
+"""Measure how much each built in config profile shortens a scan.
+
+Each profile is applied to a fresh handle, and the scan is timed against a
+handle with no profile. This needs the permissions to scan the devices.
+"""
+
+import statistics
+import time
+from typing import Optional
+
+from jetblack_lvm2 import LVM
+from jetblack_lvm2.profiles import MONITORING, PROFILES, ConfigProfile
+
+REPEAT = 5
+
+
+def time_scan(profile: Optional[ConfigProfile]) -> float:
+    """Return the median time of a scan in seconds"""
+    with LVM(profiles=[profile] if profile else []) as lvm:
+        timings = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            lvm.scan()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    """Run the benchmark"""
+    baseline = time_scan(None)
+    print(f'{"none":<16} {baseline * 1000:10.2f} ms')
+    for name, profile in PROFILES.items():
+        if profile is MONITORING:
+            continue
+        elapsed = time_scan(profile)
+        saving = (1 - elapsed / baseline) * 100 if baseline else 0.0
+        print(f'{name:<16} {elapsed * 1000:10.2f} ms {saving:6.1f}% shorter')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""Load and soak test the wrapper API.
+
+Each worker repeatedly picks an operation from a weighted mix until the
+duration has passed:
+
+* churn: open and close an lvm handle.
+* open: open and close a volume group and read its seqno.
+* list: open a volume group and read the name of every logical volume.
+* names: list the volume group names.
+* snapshot: take a snapshot of a volume group.
+
+The report gives the throughput and latency percentiles of each operation,
+the growth in resident memory between the end of the warm up and the end of
+the run, and any handles left open.
+
+The real library is not thread safe, so against it each worker runs in its
+own process with its own handle. The fake backend runs the workers as
+threads sharing one engine. For example:
+
+    python benchmarks/soak.py --backend fake --concurrency 8 --duration 60 \
+        --mix open=5,list=2,churn=1,names=1 --lvs 10000
+"""
+
+import argparse
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+import gc
+import os
+import random
+import resource
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from jetblack_lvm2.exceptions import LVMException
+from jetblack_lvm2.fake import FakeEngine, FakeLVM, FakeVolumeGroup
+
+MiB = 1024 * 1024
+
+OPERATIONS = ('churn', 'open', 'list', 'names', 'snapshot')
+
+# The engine shared by the threads of the fake backend.
+_ENGINE: Optional[FakeEngine] = None
+
+
+class WorkerResult(NamedTuple):
+    """The measurements of one worker"""
+    pid: int
+    latencies: Dict[str, List[float]]
+    errors: Dict[str, int]
+    rss_start: int
+    rss_end: int
+    open_handles: int
+
+
+def rss() -> int:
+    """The resident memory of the process in bytes"""
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Parse an operation mix such as "open=5,list=2,churn=1" """
+    mix: Dict[str, int] = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'Unknown operation {name}')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def make_engine(vg_count: int, lv_count: int) -> FakeEngine:
+    """Make a fake engine with volume groups holding logical volumes"""
+    engine = FakeEngine()
+    with FakeLVM(engine) as lvm:
+        for index in range(vg_count):
+            device = f'/dev/fake{index}'
+            engine.add_device(device, (lv_count + 16) * 4 * MiB)
+            with lvm.vg_create(f'vg{index}') as vg:
+                vg.extend(device)
+                vg.write()
+                for lv_index in range(lv_count):
+                    vg.create_lv_linear(f'lv{lv_index}', 4 * MiB)
+    return engine
+
+
+def _open_lvm(backend: str) -> Any:
+    if backend == 'fake':
+        return FakeLVM(_ENGINE)
+    # Imported here, as it loads the library, so the fake backend runs on
+    # hosts without it.
+    from jetblack_lvm2 import LVM  # pylint: disable=import-outside-toplevel
+    return LVM()
+
+
+def _count_open_handles(backend: str) -> int:
+    if backend == 'fake':
+        gc.collect()
+        return sum(
+            1 for obj in gc.get_objects()
+            if isinstance(obj, FakeVolumeGroup) and not obj.closed
+        )
+    # pylint: disable=import-outside-toplevel
+    from jetblack_lvm2 import open_handles
+    return len(open_handles())
+
+
+def run_worker(
+        backend: str,
+        mix: Dict[str, int],
+        vg_names: List[str],
+        duration: float,
+        warmup: float,
+        seed: int
+) -> WorkerResult:
+    """Run operations until the duration has passed.
+
+    Args:
+        backend (str): "real" or "fake".
+        mix (Dict[str, int]): The weight of each operation.
+        vg_names (List[str]): The volume groups to open.
+        duration (float): The time in seconds to run for, after the warm up.
+        warmup (float): The time in seconds to run before measuring.
+        seed (int): The seed for choosing operations.
+
+    Returns:
+        WorkerResult: The measurements.
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+
+    with _open_lvm(backend) as lvm:
+        operations: Dict[str, Callable[[], Any]] = {
+            'churn': lambda: _churn(backend),
+            'open': lambda: _open_vg(lvm, rng.choice(vg_names)),
+            'list': lambda: _list_lvs(lvm, rng.choice(vg_names)),
+            'names': lvm.list_vg_names,
+            'snapshot': lambda: lvm.vg_snapshot(rng.choice(vg_names))
+        }
+
+        clock = time.perf_counter
+        start = clock()
+        measuring = warmup <= 0
+        rss_start = rss() if measuring else 0
+        end = start + warmup + duration
+        while True:
+            now = clock()
+            if now >= end:
+                break
+            if not measuring and now - start >= warmup:
+                measuring = True
+                rss_start = rss()
+            name = rng.choices(names, weights)[0]
+            try:
+                operations[name]()
+            except LVMException:
+                errors[name] += 1
+            if measuring:
+                latencies[name].append(clock() - now)
+
+    return WorkerResult(
+        os.getpid(),
+        latencies,
+        errors,
+        rss_start,
+        rss(),
+        _count_open_handles(backend)
+    )
+
+
+def _churn(backend: str) -> None:
+    with _open_lvm(backend) as lvm:
+        lvm.list_vg_names()
+
+
+def _open_vg(lvm: Any, name: str) -> None:
+    with lvm.vg_open(name) as vg:
+        vg.seqno  # pylint: disable=pointless-statement
+
+
+def _list_lvs(lvm: Any, name: str) -> None:
+    with lvm.vg_open(name) as vg:
+        for lv in vg.logical_volumes:
+            lv.name  # pylint: disable=pointless-statement
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The value at a fraction of the sorted values"""
+    index = min(int(fraction * len(values)), len(values) - 1)
+    return values[index]
+
+
+def report(
+        results: List[WorkerResult],
+        duration: float,
+        leaked: int
+) -> str:
+    """Describe the measurements of the workers"""
+    lines = [
+        f'{"operation":<10} {"ops":>9} {"ops/s":>10} {"errors":>7}'
+        f' {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9}'
+    ]
+    for name in results[0].latencies:
+        values = sorted(
+            value for result in results for value in result.latencies[name]
+        )
+        errors = sum(result.errors[name] for result in results)
+        if not values:
+            lines.append(f'{name:<10} {0:>9} {0:>10.1f} {errors:>7}')
+            continue
+        lines.append(
+            f'{name:<10} {len(values):>9} {len(values) / duration:>10.1f}'
+            f' {errors:>7}'
+            f' {percentile(values, 0.5) * 1000:>9.3f}'
+            f' {percentile(values, 0.9) * 1000:>9.3f}'
+            f' {percentile(values, 0.99) * 1000:>9.3f}'
+            f' {values[-1] * 1000:>9.3f}'
+        )
+
+    # Threads share a process, so only count its memory once.
+    processes = {result.pid: result for result in results}
+    growth = sum(
+        result.rss_end - result.rss_start for result in processes.values()
+    )
+    lines.append(f'rss growth: {growth / MiB:.1f} MiB')
+    lines.append(f'open handles at exit: {leaked}')
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    """Run the soak test"""
+    global _ENGINE  # pylint: disable=global-statement
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('real', 'fake'), default='fake')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument(
+        '--mix', type=parse_mix, default='open=5,list=2,churn=1,names=1')
+    parser.add_argument(
+        '--vg', action='append', default=[],
+        help='A volume group to open. Defaults to every volume group.')
+    parser.add_argument(
+        '--vgs', type=int, default=2,
+        help='The volume groups of the fake backend.')
+    parser.add_argument(
+        '--lvs', type=int, default=1000,
+        help='The logical volumes in each volume group of the fake backend.')
+    args = parser.parse_args()
+
+    executor: Executor
+    if args.backend == 'fake':
+        _ENGINE = make_engine(args.vgs, args.lvs)
+        executor = ThreadPoolExecutor(args.concurrency)
+    else:
+        executor = ProcessPoolExecutor(args.concurrency)
+
+    with _open_lvm(args.backend) as lvm:
+        vg_names = args.vg or lvm.list_vg_names()
+    if not vg_names:
+        parser.error('There are no volume groups to open')
+
+    print(
+        f'{args.backend} backend, {args.concurrency} workers,'
+        f' {args.duration}s after {args.warmup}s warm up'
+    )
+    with executor:
+        futures = [
+            executor.submit(
+                run_worker,
+                args.backend,
+                args.mix,
+                vg_names,
+                args.duration,
+                args.warmup,
+                seed
+            )
+            for seed in range(args.concurrency)
+        ]
+        results = [future.result() for future in futures]
+
+    if args.backend == 'fake':
+        # The workers share the engine, so count once they have all finished.
+        leaked = _count_open_handles(args.backend)
+    else:
+        leaked = sum(result.open_handles for result in results)
+
+    print(report(results, args.duration, leaked))
+
+
+if __name__ == '__main__':
+    main()
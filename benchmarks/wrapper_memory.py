@@ -0,0 +1,63 @@
+"""Measure the memory used per logical volume wrapper.
+
+The previous wrappers were ordinary classes holding the handle and a bound
+exception factory in an instance dictionary. This compares that layout with
+the slotted wrappers sharing a volume group context.
+"""
+
+from ctypes import c_void_p
+import tracemalloc
+
+from jetblack_lvm2.context import VolumeGroupContext
+from jetblack_lvm2.logical_volume import LogicalVolume
+
+COUNT = 100_000
+
+
+class Factory:
+    """Stands in for the instance owning the exception factory"""
+
+    def create_exception(self):
+        """The exception factory"""
+
+
+class DictLogicalVolume:
+    """The layout of the logical volume wrapper before slots"""
+
+    def __init__(self, handle, create_exception) -> None:
+        self.handle = handle
+        self._create_exception = create_exception
+
+
+def measure(create) -> float:
+    """Measure the bytes allocated per wrapper"""
+    handles = [c_void_p(i + 1) for i in range(COUNT)]
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    wrappers = [create(handle) for handle in handles]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(wrappers) == COUNT
+    return (after - before) / COUNT
+
+
+def main() -> None:
+    """Run the benchmark"""
+    factory = Factory()
+    # A NULL volume group handle is neither tracked nor released, so the
+    # context makes no library calls.
+    context = VolumeGroupContext(None, factory.create_exception)
+
+    # The old wrappers shared one bound method, so bind it once here too.
+    create_exception = factory.create_exception
+    before = measure(
+        lambda handle: DictLogicalVolume(handle, create_exception)
+    )
+    after = measure(lambda handle: LogicalVolume(handle, context))
+
+    print(f'before: {before:.1f} bytes per wrapper')
+    print(f'after:  {after:.1f} bytes per wrapper')
+
+
+if __name__ == '__main__':
+    main()
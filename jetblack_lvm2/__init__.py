@@ -1,3 +1,45 @@
-"""jetblack_lvm2"""
+"""jetblack_lvm2
 
-from .lvm import LVM
+The names which need liblvm2app are imported when first used, so the daemon
+client, the fake engine and the modules which only handle records can be
+imported on hosts without the library.
+"""
+
+from importlib import import_module
+from typing import Any
+
+from .capacity import CapacityHistory
+from .events import EventStream
+from .records import PhysicalVolumeRecord
+from .profiling import profiling, start_from_environment
+from .snapshot import VolumeGroupSnapshot
+from .exceptions import (
+    LVMException,
+    LVMNotFoundError,
+    LVMExistsError,
+    LVMLockedError,
+    LVMNoSpaceError,
+    LVMTimeoutError,
+    LVMQuarantinedError,
+    LVMPlacementError,
+    LVMClosedError,
+    LVMOwnershipError,
+    LVMCommandError
+)
+
+# The names which need the library, by the module defining them.
+_LIBRARY_NAMES = {
+    'LVM': 'lvm',
+    'open_handles': 'lifecycle',
+    'LogicalVolumeColumns': 'columns',
+    'Query': 'query'
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LIBRARY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
@@ -8,7 +8,9 @@ from .types import (
     dm_list_t,
     vg_t,
     lv_t,
-    pv_t
+    pv_t,
+    lv_create_params_t,
+    lvm_property_value
 )
 
 lib = find_library("lvm2app")
@@ -291,6 +293,11 @@ lvm_pv_from_name = lvmlib.lvm_pv_from_name
 lvm_pv_from_name.argtypes = [vg_t, c_char_p]
 lvm_pv_from_name.restype = pv_t
 
+# lvm_pv_get_property
+lvm_pv_get_property = lvmlib.lvm_pv_get_property
+lvm_pv_get_property.argtypes = [pv_t, c_char_p]
+lvm_pv_get_property.restype = lvm_property_value
+
 # LV Functions
 
 # lvm_lv_get_name
@@ -341,11 +348,29 @@ lvm_lv_get_attr = lvmlib.lvm_lv_get_attr
 lvm_lv_get_attr.argtypes = [lv_t]
 lvm_lv_get_attr.restype = c_char_p
 
+# lvm_lv_get_property
+lvm_lv_get_property = lvmlib.lvm_lv_get_property
+lvm_lv_get_property.argtypes = [lv_t, c_char_p]
+lvm_lv_get_property.restype = lvm_property_value
+
 # lvm_lv_get_origin
 lvm_lv_get_origin = lvmlib.lvm_lv_get_origin
 lvm_lv_get_origin.argtypes = [lvm_t]
 lvm_lv_get_origin.restype = c_char_p
 
+# lvm_lv_get_tags
+lvm_lv_get_tags = lvmlib.lvm_lv_get_tags
+lvm_lv_get_tags.argtypes = [lv_t]
+lvm_lv_get_tags.restype = dm_list_t
+
+# lvm_lv_add_tag
+lvm_lv_add_tag = lvmlib.lvm_lv_add_tag
+lvm_lv_add_tag.argtypes = [lv_t, c_char_p]
+
+# lvm_lv_remove_tag
+lvm_lv_remove_tag = lvmlib.lvm_lv_remove_tag
+lvm_lv_remove_tag.argtypes = [lv_t, c_char_p]
+
 # lvm_list_pvs
 lvm_list_pvs = lvmlib.lvm_list_pvs
 lvm_list_pvs.argtypes = [lvm_t]
@@ -354,3 +379,13 @@ lvm_list_pvs.restype = dm_list_t
 # lvm_list_pvs_free
 lvm_list_pvs_free = lvmlib.lvm_list_pvs_free
 lvm_list_pvs_free.argtypes = [dm_list_t]
+
+# lvm_lv_params_create_thin
+lvm_lv_params_create_thin = lvmlib.lvm_lv_params_create_thin
+lvm_lv_params_create_thin.argtypes = [vg_t, c_char_p, c_char_p, c_uint64]
+lvm_lv_params_create_thin.restype = lv_create_params_t
+
+# lvm_lv_create
+lvm_lv_create = lvmlib.lvm_lv_create
+lvm_lv_create.argtypes = [lv_create_params_t]
+lvm_lv_create.restype = lv_t
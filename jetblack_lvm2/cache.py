@@ -0,0 +1,377 @@
+"""Persistent inventory cache"""
+
+from __future__ import annotations
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import (
+    ContextManager,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TYPE_CHECKING
+)
+
+from .exceptions import LVMException, LVMNotFoundError
+from .protocol import decode, encode
+from .snapshot import VolumeGroupSnapshot
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+_MAGIC = b'JBLVMC01'
+_LENGTH = struct.Struct('>I')
+
+
+class CacheEntry(NamedTuple):
+    """The location of a volume group snapshot in the cache file"""
+    uuid: str
+    name: str
+    seqno: int
+    offset: int
+    length: int
+
+
+class InventoryCache:
+    """A file holding the last snapshot of each volume group.
+
+    The file starts with an index of the volume groups by uuid with their
+    seqno, followed by the encoded snapshots. It is memory mapped, and a
+    snapshot is only decoded when it is asked for.
+    """
+
+    def __init__(self, path: str) -> None:
+        """A file holding the last snapshot of each volume group
+
+        Args:
+            path (str): The path of the cache file.
+        """
+        self.path = path
+        self.entries: Dict[str, CacheEntry] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._decoded: Dict[str, VolumeGroupSnapshot] = {}
+
+    def load(self) -> bool:
+        """Map the cache file and read its index.
+
+        Returns:
+            bool: True if a valid cache file was loaded.
+        """
+        self.close()
+        try:
+            with open(self.path, 'rb') as fp:
+                mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            if mapped[:len(_MAGIC)] != _MAGIC:
+                raise ValueError('Invalid cache file')
+            offset = len(_MAGIC)
+            (length,) = _LENGTH.unpack_from(mapped, offset)
+            offset += _LENGTH.size
+            index = decode(mapped[offset:offset + length])
+            base = offset + length
+            self.entries = {
+                uuid: CacheEntry(uuid, name, seqno, base + start, size)
+                for uuid, name, seqno, start, size in index
+            }
+        except (ValueError, TypeError, KeyError, struct.error, IndexError):
+            # A truncated or corrupt file, or an index of the wrong shape.
+            mapped.close()
+            self.entries = {}
+            return False
+
+        self._mmap = mapped
+        return True
+
+    def get(self, uuid: str) -> Optional[VolumeGroupSnapshot]:
+        """Get the cached snapshot of a volume group.
+
+        Args:
+            uuid (str): The volume group uuid.
+
+        Returns:
+            Optional[VolumeGroupSnapshot]: The snapshot, or None if it is not
+                cached.
+        """
+        snapshot = self._decoded.get(uuid)
+        if snapshot is not None:
+            return snapshot
+        entry = self.entries.get(uuid)
+        if entry is None or self._mmap is None:
+            return None
+        snapshot = VolumeGroupSnapshot.from_dict(
+            decode(self._mmap[entry.offset:entry.offset + entry.length])
+        )
+        self._decoded[uuid] = snapshot
+        return snapshot
+
+    def write(self, snapshots: List[VolumeGroupSnapshot]) -> str:
+        """Write the given snapshots to a new file alongside the cache file.
+
+        The file is uniquely named, so concurrent writes do not write to the
+        same file, and is synced to disk before it is returned. It takes the
+        place of the cache file when passed to `replace`.
+
+        Args:
+            snapshots (List[VolumeGroupSnapshot]): The snapshots.
+
+        Returns:
+            str: The path of the new file.
+        """
+        blobs = [encode(snapshot.to_dict()) for snapshot in snapshots]
+        index: List[Tuple[str, str, int, int, int]] = []
+        start = 0
+        for snapshot, blob in zip(snapshots, blobs):
+            index.append(
+                (snapshot.uuid, snapshot.name, snapshot.seqno, start, len(blob)))
+            start += len(blob)
+        encoded_index = encode(index)
+
+        directory, filename = os.path.split(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{filename}.', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(_MAGIC)
+                fp.write(_LENGTH.pack(len(encoded_index)))
+                fp.write(encoded_index)
+                for blob in blobs:
+                    fp.write(blob)
+                fp.flush()
+                os.fsync(fp.fileno())
+        except BaseException:
+            self.discard(temp_path)
+            raise
+        return temp_path
+
+    def replace(
+            self,
+            temp_path: str,
+            snapshots: List[VolumeGroupSnapshot]
+    ) -> None:
+        """Rename a file made by `write` into place and map it.
+
+        Args:
+            temp_path (str): The path returned by `write`.
+            snapshots (List[VolumeGroupSnapshot]): The snapshots written to
+                the file.
+        """
+        try:
+            os.replace(temp_path, self.path)
+        except BaseException:
+            self.discard(temp_path)
+            raise
+        self.load()
+        self._decoded = {snapshot.uuid: snapshot for snapshot in snapshots}
+
+    @staticmethod
+    def discard(temp_path: str) -> None:
+        """Remove a file made by `write` which will not be used.
+
+        Args:
+            temp_path (str): The path returned by `write`.
+        """
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+    def save(self, snapshots: List[VolumeGroupSnapshot]) -> None:
+        """Replace the cache file with the given snapshots.
+
+        The file is written alongside and renamed into place, so readers
+        never see a partial file.
+
+        Args:
+            snapshots (List[VolumeGroupSnapshot]): The snapshots.
+        """
+        self.replace(self.write(snapshots), snapshots)
+
+    def close(self) -> None:
+        """Unmap the cache file"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.entries = {}
+        self._decoded = {}
+
+
+class CachedInventory:
+    """Serve volume group snapshots from a persistent cache.
+
+    At startup the snapshots saved by the previous run are served at once.
+    Calling refresh, or starting it in the background, opens each volume
+    group to read its seqno and only takes a new snapshot of the groups which
+    have changed, before saving the cache again. A background refresh opens an
+    lvm handle of its own, as the library is not thread safe.
+    """
+
+    def __init__(
+            self,
+            lvm: LVMInstance,
+            path: str,
+            config_path: Optional[str] = None
+    ) -> None:
+        """Serve volume group snapshots from a persistent cache
+
+        Args:
+            lvm (LVMInstance): The lvm instance used by `refresh`.
+            path (str): The path of the cache file.
+            config_path (Optional[str], optional): The path to the lvm config
+                of the handle opened by a background refresh. Defaults to
+                None.
+        """
+        self.lvm = lvm
+        self.cache = InventoryCache(path)
+        self.config_path = config_path
+        self.is_fresh = False
+        self.error: Optional[Exception] = None
+        self._snapshots: Dict[str, VolumeGroupSnapshot] = {}
+        self._lock = threading.Lock()
+        # The number of refreshes started, and of the last to be saved.
+        self._started = 0
+        self._saved = 0
+        self._thread: Optional[threading.Thread] = None
+        self.cache.load()
+
+    def _cached(self, name: str) -> Optional[VolumeGroupSnapshot]:
+        for entry in self.cache.entries.values():
+            if entry.name == name:
+                return self.cache.get(entry.uuid)
+        return None
+
+    @property
+    def names(self) -> List[str]:
+        """The names of the known volume groups.
+
+        Returns:
+            List[str]: The volume group names.
+        """
+        with self._lock:
+            if self.is_fresh:
+                return list(self._snapshots)
+            return [entry.name for entry in self.cache.entries.values()]
+
+    def vg_snapshot(self, name: str) -> Optional[VolumeGroupSnapshot]:
+        """Get the latest known snapshot of a volume group.
+
+        Args:
+            name (str): The volume group name.
+
+        Returns:
+            Optional[VolumeGroupSnapshot]: The snapshot, or None if the volume
+                group is not known.
+        """
+        with self._lock:
+            if self.is_fresh:
+                return self._snapshots.get(name)
+            return self._cached(name)
+
+    def refresh(self) -> int:
+        """Bring the snapshots up to date and save the cache.
+
+        A volume group removed while the refresh runs is left out.
+
+        Raises:
+            LVMException: If the volume groups could not be listed or read.
+
+        Returns:
+            int: The number of volume groups which were read again.
+        """
+        with self.lvm.guard:
+            return self._refresh(self.lvm)
+
+    def _refresh(self, lvm: LVMInstance) -> int:
+        with self._lock:
+            self._started += 1
+            started = self._started
+
+        current: Dict[str, VolumeGroupSnapshot] = {}
+        changed = 0
+        for name in lvm.list_vg_names():
+            try:
+                with lvm.vg_open(name) as vg:
+                    uuid, seqno = vg.uuid, vg.seqno
+                    with self._lock:
+                        known = self._snapshots.get(name)
+                        if known is None and uuid in self.cache.entries:
+                            known = self.cache.get(uuid)
+                    if (
+                            known is not None and
+                            known.uuid == uuid and
+                            known.seqno == seqno
+                    ):
+                        current[name] = known
+                    else:
+                        current[name] = vg.snapshot()
+                        changed += 1
+            except LVMNotFoundError:
+                # Removed since the names were listed.
+                continue
+
+        with self._lock:
+            removed = len(current) != len(self.cache.entries)
+        snapshots = list(current.values())
+        # The file is written and synced without the lock, so readers are
+        # only held up by the rename.
+        temp_path = self.cache.write(snapshots) if changed or removed else None
+
+        with self._lock:
+            if started < self._saved:
+                # A refresh which started later has already been saved.
+                if temp_path is not None:
+                    self.cache.discard(temp_path)
+                return changed
+            self._saved = started
+            self._snapshots = current
+            self.is_fresh = True
+            if temp_path is not None:
+                self.cache.replace(temp_path, snapshots)
+
+        return changed
+
+    def _open_lvm(self) -> ContextManager[LVMInstance]:
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from .lvm import LVM
+        return LVM(self.config_path)
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._open_lvm() as lvm:
+                self._refresh(lvm)
+        except LVMException as error:
+            self.error = error
+
+    def start(self) -> None:
+        """Refresh the snapshots on a background thread.
+
+        The thread opens an lvm handle of its own, so the handle of the
+        inventory may still be used while it runs. An error is kept in
+        `error`.
+        """
+        self._thread = threading.Thread(
+            target=self._refresh_in_background,
+            name='lvm-inventory-refresh',
+            daemon=True
+        )
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a background refresh to finish.
+
+        Args:
+            timeout (Optional[float], optional): The time in seconds to wait.
+                Defaults to None.
+
+        Returns:
+            bool: True if the refresh has finished.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
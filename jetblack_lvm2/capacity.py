@@ -0,0 +1,316 @@
+"""Capacity history and forecasting"""
+
+from __future__ import annotations
+from array import array
+import operator
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+# The fixed point value of 100% in the data_percent property.
+DM_PERCENT_100 = 100_000_000
+
+# A week of samples taken once a minute.
+DEFAULT_CAPACITY = 7 * 24 * 60
+
+
+class Forecast(NamedTuple):
+    """The growth of a volume group or thin pool"""
+    key: str
+    samples: int
+    size: int
+    used: int
+    growth_rate: Optional[float]
+    time_to_full: Optional[float]
+
+    @property
+    def utilisation(self) -> float:
+        """The fraction of the space used in the latest sample.
+
+        Returns:
+            float: The fraction from 0 to 1.
+        """
+        return self.used / self.size if self.size else 0.0
+
+
+class _Sums:
+    """The sums for a least squares fit of used space against time.
+
+    The sums are held as integers, so adding and removing samples is exact
+    however long the history runs.
+    """
+
+    __slots__ = ('count', 't', 'y', 'tt', 'ty')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.t = 0
+        self.y = 0
+        self.tt = 0
+        self.ty = 0
+
+    def add(self, t: int, y: int, sign: int = 1) -> None:
+        self.count += sign
+        self.t += sign * t
+        self.y += sign * y
+        self.tt += sign * t * t
+        self.ty += sign * t * y
+
+    def slope(self) -> Optional[float]:
+        denominator = self.count * self.tt - self.t * self.t
+        if self.count < 2 or denominator == 0:
+            return None
+        return (self.count * self.ty - self.t * self.y) / denominator
+
+
+class CapacityRing:
+    """A fixed size ring of capacity samples.
+
+    Each sample is a time in whole seconds, a size and the space used, in
+    bytes, held in three arrays of 64 bit integers. When the ring is full the
+    oldest sample is overwritten. The sums for a fit over the whole ring are
+    kept as the samples come and go, so forecasting from the whole history
+    takes constant time.
+    """
+
+    __slots__ = (
+        'capacity', 'times', 'sizes', 'used', '_start', '_count', '_sums'
+    )
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """A fixed size ring of capacity samples
+
+        Args:
+            capacity (int, optional): The number of samples kept. Defaults to a
+                week of samples taken once a minute.
+        """
+        self.capacity = capacity
+        self.times = array('q', bytes(8 * capacity))
+        self.sizes = array('q', bytes(8 * capacity))
+        self.used = array('q', bytes(8 * capacity))
+        self._start = 0
+        self._count = 0
+        self._sums = _Sums()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, size: int, used: int) -> None:
+        """Add a sample, overwriting the oldest if the ring is full.
+
+        Args:
+            timestamp (float): The time of the sample in seconds, which must
+                not be before the previous sample.
+            size (int): The size in bytes.
+            used (int): The space used in bytes.
+        """
+        t = int(timestamp)
+        if self._count == self.capacity:
+            oldest = self._start
+            self._sums.add(self.times[oldest], self.used[oldest], -1)
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+        index = (self._start + self._count) % self.capacity
+        self.times[index] = t
+        self.sizes[index] = size
+        self.used[index] = used
+        self._count += 1
+        self._sums.add(t, used)
+
+    def _ordered(self, column: array, first: int = 0) -> array:
+        # The samples from the logical index first to the newest, oldest first.
+        if first >= self._count:
+            return column[:0]
+        start = (self._start + first) % self.capacity
+        end = self._start + self._count
+        if end <= self.capacity:
+            return column[start:end]
+        end -= self.capacity
+        if start < end:
+            return column[start:end]
+        return column[start:] + column[:end]
+
+    def _first_after(self, timestamp: int) -> int:
+        # A binary search over the logical indices of the sorted times.
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[(self._start + middle) % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def samples(self) -> List[Tuple[int, int, int]]:
+        """The samples, oldest first.
+
+        Returns:
+            List[Tuple[int, int, int]]: The time, size and used space of each
+                sample.
+        """
+        return list(zip(
+            self._ordered(self.times),
+            self._ordered(self.sizes),
+            self._ordered(self.used)
+        ))
+
+    def forecast(self, key: str, window: Optional[float] = None) -> Forecast:
+        """Fit the growth of the used space and forecast when it is full.
+
+        The growth rate is the slope of a least squares fit of the used space
+        against time. The time to full is the free space in the latest sample
+        divided by the growth rate, measured from that sample.
+
+        Args:
+            key (str): The name given to the forecast.
+            window (Optional[float], optional): Only fit the samples taken in
+                this many seconds before the latest. Defaults to None, for the
+                whole ring.
+
+        Raises:
+            ValueError: If the window is negative.
+
+        Returns:
+            Forecast: The forecast.
+        """
+        if window is not None and window < 0:
+            raise ValueError('The window must not be negative')
+        if self._count == 0:
+            return Forecast(key, 0, 0, 0, None, None)
+
+        newest = (self._start + self._count - 1) % self.capacity
+        size, used = self.sizes[newest], self.used[newest]
+
+        if window is None:
+            sums = self._sums
+        else:
+            first = self._first_after(self.times[newest] - int(window))
+            times = self._ordered(self.times, first)
+            values = self._ordered(self.used, first)
+            sums = _Sums()
+            sums.count = len(times)
+            sums.t = sum(times)
+            sums.y = sum(values)
+            sums.tt = sum(map(operator.mul, times, times))
+            sums.ty = sum(map(operator.mul, times, values))
+
+        slope = sums.slope()
+        time_to_full = (
+            max(size - used, 0) / slope
+            if slope is not None and slope > 0 else None
+        )
+        return Forecast(key, sums.count, size, used, slope, time_to_full)
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Return the samples as NumPy arrays, oldest first.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+
+        Returns:
+            Dict[str, Any]: The times, sizes and used space.
+        """
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return {
+            'time': np.frombuffer(self._ordered(self.times), dtype=np.int64),
+            'size': np.frombuffer(self._ordered(self.sizes), dtype=np.int64),
+            'used': np.frombuffer(self._ordered(self.used), dtype=np.int64)
+        }
+
+
+class CapacityHistory:
+    """The capacity history of the volume groups and thin pools of a host.
+
+    Each volume group is recorded under its name, and each thin pool under
+    "vg/pool". The used space of a volume group is its allocated space, and
+    that of a thin pool is the space taken by its data.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """The capacity history of a host
+
+        Args:
+            capacity (int, optional): The samples kept for each volume group
+                and thin pool. Defaults to a week of samples taken once a
+                minute.
+        """
+        self.capacity = capacity
+        self.rings: Dict[str, CapacityRing] = {}
+
+    def record(self, key: str, timestamp: float, size: int, used: int) -> None:
+        """Record a sample.
+
+        Args:
+            key (str): The volume group name or "vg/pool".
+            timestamp (float): The time of the sample in seconds.
+            size (int): The size in bytes.
+            used (int): The space used in bytes.
+        """
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = CapacityRing(self.capacity)
+        ring.append(timestamp, size, used)
+
+    def sample(self, lvm: LVMInstance, timestamp: Optional[float] = None) -> int:
+        """Record a sample of every volume group and thin pool.
+
+        Args:
+            lvm (LVMInstance): The lvm instance.
+            timestamp (Optional[float], optional): The time of the samples.
+                Defaults to None, for now.
+
+        Returns:
+            int: The number of samples recorded.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        count = 0
+        for name in lvm.list_vg_names():
+            with lvm.vg_open(name) as vg:
+                size = vg.size
+                self.record(name, timestamp, size, size - vg.free_size)
+                count += 1
+                for lv in vg.logical_volumes:
+                    if not lv.attr.startswith('t'):
+                        continue
+                    percent = lv.get_property('data_percent')
+                    if not isinstance(percent, int):
+                        continue
+                    pool_size = lv.size
+                    self.record(
+                        f'{name}/{lv.name}',
+                        timestamp,
+                        pool_size,
+                        pool_size * percent // DM_PERCENT_100
+                    )
+                    count += 1
+        return count
+
+    def forecast(self, window: Optional[float] = None) -> List[Forecast]:
+        """Forecast every volume group and thin pool, soonest full first.
+
+        Args:
+            window (Optional[float], optional): Only fit the samples taken in
+                this many seconds before the latest. Defaults to None, for the
+                whole history.
+
+        Raises:
+            ValueError: If the window is negative.
+
+        Returns:
+            List[Forecast]: The forecasts.
+        """
+        if window is not None and window < 0:
+            raise ValueError('The window must not be negative')
+        forecasts = [
+            ring.forecast(key, window) for key, ring in self.rings.items()
+        ]
+        return sorted(
+            forecasts,
+            key=lambda forecast: (
+                forecast.time_to_full is None,
+                forecast.time_to_full or 0.0
+            )
+        )
@@ -0,0 +1,255 @@
+"""A client for the LVM daemon"""
+
+from __future__ import annotations
+from errno import ENOENT
+import itertools
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from .exceptions import LVMException, LVMNotFoundError, exception_for
+from .records import PhysicalVolumeRecord
+from .protocol import recv_frame, send_frame
+
+
+class RemoteLogicalVolume:
+    """A logical volume read from the daemon"""
+
+    __slots__ = (
+        'name', 'uuid', 'size', 'attr', 'is_active', 'is_suspended', 'origin',
+        'tags'
+    )
+
+    def __init__(self, values: Dict[str, Any]) -> None:
+        for key in self.__slots__:
+            setattr(self, key, values[key])
+
+
+class RemotePhysicalVolume:
+    """A physical volume read from the daemon"""
+
+    __slots__ = ('name', 'uuid', 'mda_count', 'dev_size', 'size', 'free')
+
+    def __init__(self, values: Dict[str, Any]) -> None:
+        for key in self.__slots__:
+            setattr(self, key, values[key])
+
+
+class RemoteVolumeGroup:
+    """A read only snapshot of a volume group taken by the daemon"""
+
+    def __init__(self, values: Dict[str, Any]) -> None:
+        self.name: str = values['name']
+        self.uuid: str = values['uuid']
+        self.seqno: int = values['seqno']
+        self.is_clustered: bool = values['is_clustered']
+        self.is_exported: bool = values['is_exported']
+        self.is_partial: bool = values['is_partial']
+        self.size: int = values['size']
+        self.free_size: int = values['free_size']
+        self.extent_size: int = values['extent_size']
+        self.extent_count: int = values['extent_count']
+        self.free_extent_count: int = values['free_extent_count']
+        self.pv_count: int = values['pv_count']
+        self.max_pv: int = values['max_pv']
+        self.max_lv: int = values['max_lv']
+        self.tags: List[str] = values['tags']
+        self.logical_volumes = [
+            RemoteLogicalVolume(lv) for lv in values['logical_volumes']
+        ]
+        self.physical_volumes = [
+            RemotePhysicalVolume(pv) for pv in values['physical_volumes']
+        ]
+
+    def lv_from_name(self, name: str) -> RemoteLogicalVolume:
+        """Lookup a logical volume by name.
+
+        Args:
+            name (str): The name of the logical volume.
+
+        Raises:
+            LVMNotFoundError: If there is no such logical volume.
+
+        Returns:
+            RemoteLogicalVolume: The logical volume.
+        """
+        for lv in self.logical_volumes:
+            if lv.name == name:
+                return lv
+        raise LVMNotFoundError(ENOENT, f'Logical volume {name} not found')
+
+
+class RemoteVolumeGroupOpen:
+    """The context manager returned by RemoteLVMInstance.vg_open"""
+
+    def __init__(self, client: RemoteLVMInstance, name: str) -> None:
+        self.client = client
+        self.name = name
+
+    def __enter__(self) -> RemoteVolumeGroup:
+        return RemoteVolumeGroup(self.client.call('vg_snapshot', self.name))
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+class RemoteLVMInstance:
+    """The read methods of LVMInstance, served by the daemon"""
+
+    def __init__(self, sock: socket.socket) -> None:
+        """The read methods of LVMInstance, served by the daemon
+
+        Args:
+            sock (socket.socket): The connected socket.
+        """
+        self.sock = sock
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def call(self, method: str, *args: Any) -> Any:
+        """Call a method on the daemon.
+
+        Args:
+            method (str): The method name.
+            *args (Any): The arguments.
+
+        Raises:
+            LVMException: If the method failed.
+
+        Returns:
+            Any: The result.
+        """
+        with self._lock:
+            request_id = next(self._ids)
+            send_frame(self.sock, [request_id, method, list(args)])
+            response_id, ok, result = recv_frame(self.sock)
+        if response_id is None and not ok:
+            # The daemon could not read the request, so could not echo its id.
+            errno, msg = result
+            raise exception_for(errno, msg)
+        if response_id != request_id:
+            raise LVMException(-1, 'Response out of sequence')
+        if not ok:
+            errno, msg = result
+            raise exception_for(errno, msg)
+        return result
+
+    def batch(self, *requests: List[Any]) -> List[Any]:
+        """Make several calls in a single round trip.
+
+        Args:
+            *requests (List[Any]): The method name followed by its arguments.
+
+        Returns:
+            List[Any]: The results.
+        """
+        return self.call(
+            'batch',
+            [[request[0], list(request[1:])] for request in requests]
+        )
+
+    @property
+    def version(self) -> str:
+        """The library version of the daemon.
+
+        Returns:
+            str: The version.
+        """
+        return self.call('version')
+
+    def list_vg_names(self) -> List[str]:
+        """Return the list of volume group names.
+
+        Returns:
+            List[str]: The volume group names.
+        """
+        return self.call('list_vg_names')
+
+    def list_vg_uuids(self) -> List[str]:
+        """Return the list of volume group uuids.
+
+        Returns:
+            List[str]: The volume group uuids.
+        """
+        return self.call('list_vg_uuids')
+
+    def vgname_from_pvid(self, pvid: str) -> Optional[str]:
+        """Return the volume group name given a PV UUID
+
+        Args:
+            pvid (str): The PV uuid
+
+        Returns:
+            Optional[str]: The volume group name.
+        """
+        return self.call('vgname_from_pvid', pvid)
+
+    def vgname_from_device(self, device: str) -> Optional[str]:
+        """Return the volume group name given a device name
+
+        Args:
+            device (str): The device name
+
+        Returns:
+            Optional[str]: The volume group name.
+        """
+        return self.call('vgname_from_device', device)
+
+    def vg_name_validate(self, name: str) -> bool:
+        """Validate a volume group name
+
+        Args:
+            name (str): The name
+
+        Returns:
+            bool: True if this is a valid name.
+        """
+        return self.call('vg_name_validate', name)
+
+    def pv_records(self) -> List[PhysicalVolumeRecord]:
+        """List the physical volumes of the host with their volume groups.
+
+        Returns:
+            List[PhysicalVolumeRecord]: The physical volume records.
+        """
+        return [
+            PhysicalVolumeRecord(*record)
+            for record in self.call('pv_records')
+        ]
+
+    def scan(self) -> None:
+        """Ask the daemon to scan all devices for VGs and LVM metadata."""
+        self.call('scan')
+
+    def vg_open(self, name: str) -> RemoteVolumeGroupOpen:
+        """Open a read only snapshot of a volume group.
+
+        Args:
+            name (str): The name
+
+        Returns:
+            RemoteVolumeGroupOpen: A volume group context.
+        """
+        return RemoteVolumeGroupOpen(self, name)
+
+
+class RemoteLVM:
+    """The context manager for a connection to the LVM daemon"""
+
+    def __init__(self, path: str) -> None:
+        """Create a connection context
+
+        Args:
+            path (str): The path of the daemon's Unix domain socket.
+        """
+        self.path = path
+        self.sock: Optional[socket.socket] = None
+
+    def __enter__(self) -> RemoteLVMInstance:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        return RemoteLVMInstance(self.sock)
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self.sock:
+            self.sock.close()
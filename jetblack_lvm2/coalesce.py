@@ -0,0 +1,92 @@
+"""Coalesced reads"""
+
+from __future__ import annotations
+from typing import Callable, Tuple, TypeVar, TYPE_CHECKING
+
+from .records import PhysicalVolumeRecord
+from .singleflight import SingleFlight
+from .snapshot import VolumeGroupSnapshot
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+T = TypeVar('T')
+
+
+class CoalescedReads:
+    """Read methods of an lvm instance which coalesce concurrent calls.
+
+    Callers asking for the same listing at the same time wait on a single
+    call and share its result, which is immutable. The callers may only be on
+    several threads when the lvm handle was opened without thread affinity.
+    """
+
+    def __init__(self, lvm: LVMInstance) -> None:
+        """Read methods which coalesce concurrent calls
+
+        Args:
+            lvm (LVMInstance): The lvm instance.
+        """
+        self.lvm = lvm
+        self.flights = SingleFlight()
+
+    def _locked(self, read: Callable[[], T]) -> T:
+        # The reads run on whichever caller leads the flight, so they are
+        # serialised through the guard, which refuses any thread but the owner
+        # when the handle has thread affinity.
+        with self.lvm.guard:
+            return read()
+
+    @property
+    def requests(self) -> int:
+        """The number of read requests made.
+
+        Returns:
+            int: The number of requests.
+        """
+        return self.flights.requests
+
+    @property
+    def coalesced(self) -> int:
+        """The number of read requests which shared another call.
+
+        Returns:
+            int: The number of coalesced requests.
+        """
+        return self.flights.coalesced
+
+    def list_vg_names(self) -> Tuple[str, ...]:
+        """Return the volume group names.
+
+        Returns:
+            Tuple[str, ...]: The volume group names.
+        """
+        return self.flights.do(
+            ('list_vg_names',),
+            lambda: self._locked(lambda: tuple(self.lvm.list_vg_names()))
+        )
+
+    def physical_volumes(self) -> Tuple[PhysicalVolumeRecord, ...]:
+        """Return the physical volumes of the host.
+
+        Returns:
+            Tuple[PhysicalVolumeRecord, ...]: The physical volume records.
+        """
+        return self.flights.do(
+            ('physical_volumes',),
+            lambda: self._locked(lambda: tuple(self.lvm.pv_records()))
+        )
+
+    def vg_snapshot(self, name: str) -> VolumeGroupSnapshot:
+        """Open a volume group read only and take a snapshot.
+
+        Args:
+            name (str): The volume group name.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        return self.flights.do(
+            ('vg_snapshot', name),
+            lambda: self._locked(lambda: self.lvm.vg_snapshot(name))
+        )
@@ -0,0 +1,185 @@
+"""Columnar inventory"""
+
+from array import array
+from typing import Any, Dict, List
+
+from .bindings import (
+    lvm_lv_get_name,
+    lvm_lv_get_uuid,
+    lvm_lv_get_size,
+    lvm_lv_get_attr,
+    lvm_lv_is_active
+)
+
+
+class _StringColumn:
+    """A string column stored as Arrow style offsets and ascii data.
+
+    LVM names are ascii, so the data is also valid Arrow utf-8.
+    """
+
+    def __init__(self) -> None:
+        self.offsets = array('i', [0])
+        self.data = bytearray()
+
+    def append(self, value: bytes) -> None:
+        self.data += value
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].decode('ascii')
+
+
+class _DictionaryColumn:
+    """A string column stored as codes into an interned table"""
+
+    def __init__(self) -> None:
+        self.codes = array('I')
+        self.table: List[str] = []
+        self._lookup: Dict[bytes, int] = {}
+
+    def append(self, value: bytes) -> None:
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.table)
+            self._lookup[value] = code
+            self.table.append(value.decode('ascii'))
+        self.codes.append(code)
+
+    def __getitem__(self, index: int) -> str:
+        return self.table[self.codes[index]]
+
+
+class LogicalVolumeColumns:
+    """The logical volume inventory held in columns.
+
+    The columns are filled directly from the logical volume handles while the
+    list is walked, so no per row Python object is created. Names and uuids
+    are held as Arrow style offset and data buffers, while the volume group
+    names and attributes, which repeat heavily, are held as codes into an
+    interned table.
+    """
+
+    def __init__(self) -> None:
+        self.vg = _DictionaryColumn()
+        self.name = _StringColumn()
+        self.uuid = _StringColumn()
+        self.attr = _DictionaryColumn()
+        self.size = array('Q')
+        self.active = array('B')
+
+    def __len__(self) -> int:
+        return len(self.size)
+
+    def append(self, vg_name: bytes, handle: Any) -> None:
+        """Append a row read from a logical volume handle.
+
+        Args:
+            vg_name (bytes): The encoded name of the owning volume group.
+            handle (Any): The logical volume handle.
+        """
+        self.vg.append(vg_name)
+        self.name.append(lvm_lv_get_name(handle))
+        self.uuid.append(lvm_lv_get_uuid(handle))
+        self.attr.append(lvm_lv_get_attr(handle))
+        self.size.append(lvm_lv_get_size(handle))
+        self.active.append(1 if lvm_lv_is_active(handle) == 1 else 0)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Materialise a single row.
+
+        Args:
+            index (int): The row index.
+
+        Returns:
+            Dict[str, Any]: The row as a dictionary.
+        """
+        return {
+            'vg': self.vg[index],
+            'name': self.name[index],
+            'uuid': self.uuid[index],
+            'attr': self.attr[index],
+            'size': self.size[index],
+            'active': self.active[index] == 1
+        }
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Return the columns as NumPy arrays without copying.
+
+        The string columns are returned as a tuple of offsets and ascii
+        data, and the interned columns as a tuple of codes and table.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+
+        Returns:
+            Dict[str, Any]: The columns.
+        """
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        def strings(column: _StringColumn):
+            return (
+                np.frombuffer(column.offsets, dtype=np.int32),
+                np.frombuffer(column.data, dtype=np.uint8)
+            )
+
+        def interned(column: _DictionaryColumn):
+            return (
+                np.frombuffer(column.codes, dtype=np.uint32),
+                np.array(column.table, dtype=object)
+            )
+
+        return {
+            'vg': interned(self.vg),
+            'name': strings(self.name),
+            'uuid': strings(self.uuid),
+            'attr': interned(self.attr),
+            'size': np.frombuffer(self.size, dtype=np.uint64),
+            'active': np.frombuffer(self.active, dtype=np.uint8).view(np.bool_)
+        }
+
+    def to_arrow(self) -> Any:
+        """Return the columns as an Arrow record batch.
+
+        The record batch is built over the existing buffers.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+
+        Returns:
+            pyarrow.RecordBatch: The record batch.
+        """
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+        count = len(self)
+
+        def strings(column: _StringColumn):
+            return pa.Array.from_buffers(
+                pa.string(),
+                count,
+                [None, pa.py_buffer(column.offsets), pa.py_buffer(column.data)]
+            )
+
+        def interned(column: _DictionaryColumn):
+            codes = pa.Array.from_buffers(
+                pa.uint32(),
+                count,
+                [None, pa.py_buffer(column.codes)]
+            )
+            return pa.DictionaryArray.from_arrays(codes, pa.array(column.table))
+
+        return pa.RecordBatch.from_arrays(
+            [
+                interned(self.vg),
+                strings(self.name),
+                strings(self.uuid),
+                interned(self.attr),
+                pa.Array.from_buffers(
+                    pa.uint64(), count, [None, pa.py_buffer(self.size)]),
+                pa.Array.from_buffers(
+                    pa.uint8(), count, [None, pa.py_buffer(self.active)]
+                ).cast(pa.bool_())
+            ],
+            names=['vg', 'name', 'uuid', 'attr', 'size', 'active']
+        )
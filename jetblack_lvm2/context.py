@@ -0,0 +1,150 @@
+"""Volume group context"""
+
+from contextlib import nullcontext
+from ctypes import c_void_p, cast
+import weakref
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple
+
+from .bindings import lvm_lv_get_name, lvm_vg_get_name
+from .exceptions import LVMClosedError, LVMException
+from .journal import Journal
+from .lifecycle import release_leaked_vg, tracker
+from .ownership import HandleGuard
+
+
+class VolumeGroupContext:
+    """The state shared by a volume group and the volumes taken from it.
+
+    Logical and physical volume wrappers hold a reference to this rather than
+    their own copy of the exception factory and caches.
+
+    The library allocates a fresh copy of a name or uuid from the volume group
+    memory pool on every call, so strings which cannot change while the handle
+    is open are decoded once and cached here against the object handle.
+    """
+
+    __slots__ = (
+        'handle', 'create_exception', 'journal', 'guard', 'closed', 'cache',
+        'strings', '_token', '_finalizer', '__weakref__'
+    )
+
+    def __init__(
+            self,
+            handle: Any,
+            create_exception: Callable[[], LVMException],
+            journal: Optional[Journal] = None,
+            guard: Optional[HandleGuard] = None,
+            lvm_handle: Optional[Any] = None
+    ) -> None:
+        """The state shared by a volume group and its volumes.
+
+        Args:
+            handle (Any): The volume group handle.
+            create_exception (Callable[[], LVMException]): An exception factory.
+            journal (Optional[Journal], optional): The journal recording
+                metadata changes. Defaults to None.
+            guard (Optional[HandleGuard], optional): The guard of the owning
+                lvm handle. Defaults to None.
+            lvm_handle (Optional[Any], optional): The owning lvm handle, which
+                closes the volume group if it is leaked. Defaults to None.
+        """
+        self.handle = handle
+        self.create_exception = create_exception
+        self.journal = journal
+        self.guard = guard
+        self.closed = False
+        self.cache: Dict[str, Any] = {}
+        self.strings: Dict[Tuple[int, str], str] = {}
+        self._token: Optional[int] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        if not handle:
+            # Nothing to track or release.
+            return
+        name = (
+            self.cached_string(handle, 'name', lvm_vg_get_name)
+            if tracker.capture_sites else None
+        )
+        self._token = tracker.opened('vg', name)
+        # The logical and physical volume wrappers hold the context, so the
+        # handle is released once the volume group and all of its wrappers
+        # have been collected without being closed.
+        self._finalizer = weakref.finalize(
+            self, release_leaked_vg, handle, guard, lvm_handle, self._token)
+
+    def close(self) -> None:
+        """Mark the volume group as closed.
+
+        The wrappers taken from it fail from now on, and the handle is no
+        longer tracked as open.
+        """
+        self.closed = True
+        if self._finalizer is not None and self._finalizer.detach() is not None:
+            tracker.closed(self._token)
+
+    def check(self) -> None:
+        """Check the handles may be used.
+
+        Raises:
+            LVMClosedError: If the volume group or lvm handle has been closed.
+            LVMOwnershipError: If another thread owns the lvm handle.
+        """
+        if self.closed:
+            raise LVMClosedError('volume group')
+        if self.guard is not None:
+            self.guard.check()
+
+    def cached_string(
+            self,
+            handle: Any,
+            field: str,
+            getter: Callable[[Any], bytes]
+    ) -> str:
+        """Get a string property of a handle, decoding it only once.
+
+        Args:
+            handle (Any): The object handle.
+            field (str): The name of the property.
+            getter (Callable[[Any], bytes]): The library getter.
+
+        Returns:
+            str: The decoded string.
+        """
+        key = (cast(handle, c_void_p).value, field)
+        value = self.strings.get(key)
+        if value is None:
+            value = getter(handle).decode('ascii')
+            self.strings[key] = value
+        return value
+
+    def forget(self, handle: Any) -> None:
+        """Drop the cached strings of a handle.
+
+        Args:
+            handle (Any): The object handle.
+        """
+        address = cast(handle, c_void_p).value
+        for key in [key for key in self.strings if key[0] == address]:
+            del self.strings[key]
+
+    def journal_entry(
+            self,
+            operation: str,
+            args: Tuple[Any, ...],
+            lv_handle: Optional[Any] = None
+    ) -> ContextManager[None]:
+        """Record a mutating call in the journal, if there is one.
+
+        Args:
+            operation (str): The operation name.
+            args (Tuple[Any, ...]): The arguments.
+            lv_handle (Optional[Any], optional): The logical volume handle, for
+                calls on a logical volume. Defaults to None.
+
+        Returns:
+            ContextManager[None]: A context manager wrapping the call.
+        """
+        if self.journal is None:
+            return nullcontext()
+        lv_name = None if lv_handle is None else self.cached_string(
+            lv_handle, 'name', lvm_lv_get_name)
+        return self.journal.entry(self, operation, args, lv_name)
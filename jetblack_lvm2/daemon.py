@@ -0,0 +1,230 @@
+"""An LVM daemon serving read requests over a Unix domain socket.
+
+A single process owns the library handle, so the device scans and locking are
+shared by every client. The handle is only used from one worker thread, and
+concurrent identical requests wait on the same in flight call. Read results
+are cached for a short time, and a scan discards the cache.
+
+The socket is created readable and writable by its owner only.
+
+Run the daemon with::
+
+    python -m jetblack_lvm2.daemon /run/jetblack-lvm2.sock
+"""
+
+from __future__ import annotations
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .exceptions import LVMException
+from .lvm import LVM, LVMInstance
+from .protocol import recv_frame, send_frame
+from .singleflight import SingleFlight
+
+
+# The requests the daemon serves, by name.
+METHODS: Dict[str, Callable[..., Any]] = {
+    'version': lambda lvm: lvm.version,
+    'list_vg_names': lambda lvm: lvm.list_vg_names(),
+    'list_vg_uuids': lambda lvm: lvm.list_vg_uuids(),
+    'vgname_from_pvid': lambda lvm, pvid: lvm.vgname_from_pvid(pvid),
+    'vgname_from_device': lambda lvm, device: lvm.vgname_from_device(device),
+    'vg_name_validate': lambda lvm, name: lvm.vg_name_validate(name),
+    'pv_records': lambda lvm: [list(record) for record in lvm.pv_records()],
+    'vg_snapshot': lambda lvm, name: lvm.vg_snapshot(name).to_dict(),
+    'scan': lambda lvm: lvm.scan()
+}
+
+
+class LVMDaemon:
+    """The LVM daemon"""
+
+    def __init__(
+            self,
+            path: str,
+            config_path: Optional[str] = None,
+            cache_ttl: float = 1.0,
+            socket_mode: int = 0o600
+    ) -> None:
+        """The LVM daemon
+
+        Args:
+            path (str): The path of the Unix domain socket.
+            config_path (Optional[str], optional): The path to the lvm config.
+                Defaults to None.
+            cache_ttl (float, optional): The time in seconds read results are
+                served from the cache. Defaults to 1.0.
+            socket_mode (int, optional): The permissions of the socket.
+                Defaults to 0o600.
+        """
+        self.path = path
+        self.config_path = config_path
+        self.cache_ttl = cache_ttl
+        self.socket_mode = socket_mode
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._cache_lock = threading.Lock()
+        self.flights = SingleFlight()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='lvm-daemon'
+        )
+        self._lvm = LVM(config_path)
+        self._instance: Optional[LVMInstance] = None
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def _call(self, method: str, args: Tuple[Any, ...]) -> Any:
+        if method == 'scan':
+            result = METHODS[method](self._instance, *args)
+            with self._cache_lock:
+                self._cache.clear()
+            return result
+
+        key = (method, args)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None and now - cached[0] < self.cache_ttl:
+            return cached[1]
+        result = METHODS[method](self._instance, *args)
+        with self._cache_lock:
+            self._cache[key] = (now, result)
+        return result
+
+    def _batch(self, requests: List[Tuple[str, List[Any]]]) -> List[Any]:
+        return [self._call(method, tuple(args)) for method, args in requests]
+
+    def call(self, method: str, args: Tuple[Any, ...]) -> Any:
+        """Run a request, sharing any identical request in flight.
+
+        Args:
+            method (str): The method name.
+            args (Tuple[Any, ...]): The arguments.
+
+        Raises:
+            KeyError: If the method is unknown.
+
+        Returns:
+            Any: The result.
+        """
+        if method == 'batch':
+            requests = [(name, list(values)) for name, values in args[0]]
+            for name, _ in requests:
+                if name not in METHODS:
+                    raise KeyError(name)
+            return self._executor.submit(self._batch, requests).result()
+
+        if method not in METHODS:
+            raise KeyError(method)
+
+        return self.flights.do(
+            (method, args),
+            lambda: self._executor.submit(self._call, method, args).result()
+        )
+
+    def _handle(self, request: Any) -> List[Any]:
+        try:
+            request_id, method, args = request
+        except (TypeError, ValueError):
+            # Echo the id when there is one, so the client sees this error.
+            request_id = (
+                request[0]
+                if isinstance(request, (list, tuple)) and request else None
+            )
+            return [request_id, False, [-1, 'Malformed request']]
+        try:
+            result = self.call(method, tuple(args))
+            return [request_id, True, result]
+        except LVMException as error:
+            return [request_id, False, [error.errno, error.msg]]
+        except Exception as error:  # pylint: disable=broad-except
+            return [request_id, False, [-1, f'{type(error).__name__}: {error}']]
+
+    def serve_forever(self) -> None:
+        """Open the library handle and serve requests until shutdown"""
+        self._instance = self._executor.submit(self._lvm.__enter__).result()
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            """Serve the requests of one client connection"""
+
+            def handle(self) -> None:
+                while True:
+                    try:
+                        request = recv_frame(self.request)
+                    except EOFError:
+                        return
+                    except Exception as error:  # pylint: disable=broad-except
+                        # The frame was read whole, so the stream is still in
+                        # step and the connection can carry on.
+                        send_frame(self.request, [
+                            None,
+                            False,
+                            [-1, f'Malformed frame: {type(error).__name__}']
+                        ])
+                        continue
+                    send_frame(self.request, daemon._handle(request))
+
+        self._remove_stale_socket()
+        umask = os.umask(0o777 & ~self.socket_mode)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                self.path, Handler)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, self.socket_mode)
+        self._server.daemon_threads = True
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(self.path)
+            self._executor.submit(
+                self._lvm.__exit__, None, None, None).result()
+            self._executor.shutdown()
+
+    def _remove_stale_socket(self) -> None:
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise RuntimeError(f'{self.path} exists and is not a socket')
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            # Left behind by a daemon which has exited.
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f'A daemon is already serving {self.path}')
+
+    def shutdown(self) -> None:
+        """Stop serving requests"""
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def main() -> None:
+    """Run the daemon"""
+    parser = argparse.ArgumentParser(description='Serve LVM requests')
+    parser.add_argument('path', help='The path of the Unix domain socket')
+    parser.add_argument('--config', help='The path to the lvm config')
+    parser.add_argument(
+        '--cache-ttl', type=float, default=1.0,
+        help='The time in seconds read results are cached')
+    args = parser.parse_args()
+    LVMDaemon(args.path, args.config, args.cache_ttl).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
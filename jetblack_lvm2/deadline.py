@@ -0,0 +1,133 @@
+"""Deadlines for blocking calls"""
+
+from collections import deque
+import threading
+import time
+from typing import Any, Callable, Deque, List, NamedTuple, Optional
+
+from .exceptions import LVMQuarantinedError, LVMTimeoutError
+from .ownership import HandleGuard
+
+
+class CallTiming(NamedTuple):
+    """The timing of a call which ran past its deadline.
+
+    The elapsed time is None while the call is still running.
+    """
+    name: str
+    started: float
+    timeout: float
+    elapsed: Optional[float]
+
+
+class Supervisor:
+    """Run blocking library calls with a deadline.
+
+    A call with a timeout runs on its own worker thread. If it does not
+    complete in time control returns to the caller with an LVMTimeoutError,
+    and the guard of the lvm handle is quarantined, as the library is still
+    using it. Every use of the lvm handle and the handles taken from it then
+    fails with LVMQuarantinedError, until the call returns and the
+    quarantine is lifted. The timing of each timed out call is recorded, and
+    is completed with the full duration if the call eventually returns.
+    """
+
+    def __init__(self, history: int = 1000) -> None:
+        """Run blocking library calls with a deadline
+
+        Args:
+            history (int, optional): The number of timed out calls to keep.
+                Defaults to 1000.
+        """
+        self._timings: Deque[List[Any]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @property
+    def timings(self) -> List[CallTiming]:
+        """The timings of the calls which ran past their deadline.
+
+        Returns:
+            List[CallTiming]: The timings, oldest first.
+        """
+        with self._lock:
+            return [CallTiming(*timing) for timing in self._timings]
+
+    def call(
+            self,
+            name: str,
+            guard: Optional[HandleGuard],
+            func: Callable[[], Any],
+            timeout: Optional[float],
+            on_late_result: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """Make a call with a deadline.
+
+        Args:
+            name (str): The name of the operation, for reporting.
+            guard (Optional[HandleGuard]): The guard of the lvm handle the call
+                uses, or None for a handle which is not quarantined.
+            func (Callable[[], Any]): The call.
+            timeout (Optional[float]): The timeout in seconds, or None to call
+                directly.
+            on_late_result (Optional[Callable[[Any], None]], optional): Called
+                with the result of a call which completes after its deadline,
+                for example to release the resource it returned, before the
+                handle leaves quarantine. Defaults to None.
+
+        Raises:
+            LVMQuarantinedError: If the handle is quarantined.
+            LVMTimeoutError: If the call did not complete in time.
+
+        Returns:
+            Any: The result of the call.
+        """
+        if guard is not None and guard.quarantined:
+            raise LVMQuarantinedError(name)
+        if timeout is None:
+            return func()
+
+        done = threading.Event()
+        # The result, the error, and whether the deadline passed.
+        outcome: List[Any] = [None, None, False]
+        timing: List[Any] = [name, time.time(), timeout, None]
+        start = time.perf_counter()
+
+        def run() -> None:
+            try:
+                outcome[0] = func()
+            except BaseException as error:  # pylint: disable=broad-except
+                outcome[1] = error
+            with self._lock:
+                done.set()
+                if not outcome[2]:
+                    return
+                timing[3] = time.perf_counter() - start
+                try:
+                    # Release the late result while the handle is still
+                    # quarantined, so no other thread is using it.
+                    if outcome[1] is None and on_late_result is not None:
+                        on_late_result(outcome[0])
+                finally:
+                    if guard is not None:
+                        # The library has finished with the handle.
+                        guard.quarantined -= 1
+
+        thread = threading.Thread(target=run, name=f'lvm-{name}', daemon=True)
+        thread.start()
+
+        if not done.wait(timeout):
+            with self._lock:
+                if not done.is_set():
+                    outcome[2] = True
+                    self._timings.append(timing)
+                    if guard is not None:
+                        guard.quarantined += 1
+                    raise LVMTimeoutError(name, timeout)
+
+        if outcome[1] is not None:
+            raise outcome[1]
+        return outcome[0]
+
+
+# The supervisor used by the calls which take a timeout.
+supervisor = Supervisor()
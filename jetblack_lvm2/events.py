@@ -0,0 +1,625 @@
+"""Change events from udev"""
+
+from __future__ import annotations
+import asyncio
+import glob
+import os
+import re
+import select
+import socket
+import struct
+import threading
+import time
+from typing import (
+    IO,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    TYPE_CHECKING
+)
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+NETLINK_KOBJECT_UEVENT = 15
+# The multicast groups of the raw kernel events and of the events udev
+# sends once its rules have run, which add the DM_VG_NAME and DM_LV_NAME
+# properties.
+KERNEL_GROUP = 1
+UDEV_GROUP = 2
+
+_UDEV_PREFIX = b'libudev\0'
+_UDEV_MAGIC = 0xfeedcafe
+
+ACTIVATED = 'activated'
+DEACTIVATED = 'deactivated'
+CHANGED = 'changed'
+ADDED = 'added'
+REMOVED = 'removed'
+
+# Device mapper escapes a dash in a volume group or logical volume name by
+# doubling it, so the separator is a single dash.
+_DM_SEPARATOR = re.compile(r'(?<!-)-(?!-)')
+
+
+class LogicalVolumeEvent(NamedTuple):
+    """A logical volume was activated, deactivated or changed"""
+    action: str
+    vg_name: str
+    lv_name: str
+    device: Optional[str]
+    seqnum: Optional[int]
+    received: float
+
+
+class PhysicalVolumeEvent(NamedTuple):
+    """The device of a physical volume was added, removed or changed"""
+    action: str
+    vg_name: Optional[str]
+    device: Optional[str]
+    seqnum: Optional[int]
+    received: float
+
+
+ChangeEvent = Union[LogicalVolumeEvent, PhysicalVolumeEvent]
+Properties = Dict[str, str]
+
+
+def parse_uevent(data: bytes) -> Optional[Properties]:
+    """Parse a message from the uevent netlink socket.
+
+    Both the kernel format, "action@devpath" followed by the properties, and
+    the udev format, a binary header followed by the properties, are read.
+
+    Args:
+        data (bytes): The message.
+
+    Returns:
+        Optional[Properties]: The properties, or None if the message is not
+            a uevent.
+    """
+    if data.startswith(_UDEV_PREFIX):
+        if (
+                len(data) < 24 or
+                struct.unpack_from('!I', data, 8)[0] != _UDEV_MAGIC
+        ):
+            return None
+        offset, length = struct.unpack_from('=II', data, 16)
+        fields = data[offset:offset + length].split(b'\0')
+    else:
+        fields = data.split(b'\0')
+        if not fields or b'@' not in fields[0]:
+            return None
+        fields = fields[1:]
+
+    properties: Properties = {}
+    for field in fields:
+        key, sep, value = field.partition(b'=')
+        if sep:
+            properties[key.decode('ascii', 'replace')] = value.decode(
+                'utf-8', 'replace')
+    return properties
+
+
+def split_dm_name(name: str) -> Optional[Tuple[str, str]]:
+    """Split a device mapper name into the volume group and logical volume.
+
+    Args:
+        name (str): The device mapper name, for example "vg--a-lv".
+
+    Returns:
+        Optional[Tuple[str, str]]: The volume group and logical volume names,
+            or None if the name is not that of a logical volume.
+    """
+    parts = _DM_SEPARATOR.split(name, maxsplit=1)
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        return None
+    vg_name, lv_name = (part.replace('--', '-') for part in parts)
+    return vg_name, lv_name
+
+
+def _devname(properties: Properties) -> Optional[str]:
+    # Kernel events name the device relative to /dev.
+    devname = properties.get('DEVNAME')
+    if devname and not devname.startswith('/'):
+        return f'/dev/{devname}'
+    return devname
+
+
+def _seqnum(properties: Properties) -> Optional[int]:
+    seqnum = properties.get('SEQNUM')
+    return int(seqnum) if seqnum else None
+
+
+class NetlinkSource:
+    """Read uevents from the netlink socket"""
+
+    def __init__(
+            self,
+            group: int = UDEV_GROUP,
+            buffer_size: int = 4 * 1024 * 1024
+    ) -> None:
+        """Read uevents from the netlink socket
+
+        Args:
+            group (int, optional): UDEV_GROUP for the events sent by udev, or
+                KERNEL_GROUP for the raw kernel events. Defaults to
+                UDEV_GROUP.
+            buffer_size (int, optional): The receive buffer size, which must
+                hold a burst of events. Defaults to 4 MiB.
+        """
+        self._socket = socket.socket(
+            socket.AF_NETLINK,  # type: ignore # pylint: disable=no-member
+            socket.SOCK_DGRAM | socket.SOCK_CLOEXEC | socket.SOCK_NONBLOCK,
+            NETLINK_KOBJECT_UEVENT
+        )
+        self._socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+        self._socket.bind((0, group))
+
+    def fileno(self) -> int:
+        """The file descriptor to wait on"""
+        return self._socket.fileno()
+
+    def read(self) -> List[Properties]:
+        """Read the events which have arrived.
+
+        Returns:
+            List[Properties]: The properties of each event.
+        """
+        events: List[Properties] = []
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except BlockingIOError:
+                return events
+            properties = parse_uevent(data)
+            if properties is not None:
+                events.append(properties)
+
+    def close(self) -> None:
+        """Close the socket"""
+        self._socket.close()
+
+
+class StreamSource:
+    """Read uevents from a local stream.
+
+    This stands in for the netlink socket, for example to replay recorded
+    events or to read the output of `udevadm monitor --udev --property`. Each
+    event is a block of KEY=VALUE lines ending with a blank line, and lines
+    without an equals sign are ignored. The stream is read without buffering
+    so waiting on its file descriptor never misses an event.
+    """
+
+    def __init__(self, stream: IO) -> None:
+        """Read uevents from a local stream
+
+        Args:
+            stream (IO): The stream, which must have a file descriptor.
+        """
+        self._stream = stream
+        self._pending = b''
+        self._eof = False
+
+    def fileno(self) -> int:
+        """The file descriptor to wait on"""
+        return self._stream.fileno()
+
+    def read(self) -> List[Properties]:
+        """Read the events which have arrived.
+
+        Raises:
+            EOFError: At the end of the stream.
+
+        Returns:
+            List[Properties]: The properties of each complete event.
+        """
+        if self._eof:
+            raise EOFError
+        data = os.read(self.fileno(), 65536)
+        if data:
+            self._pending += data
+        else:
+            # The last event need not end with a blank line.
+            self._eof = True
+            self._pending += b'\n\n'
+
+        events: List[Properties] = []
+        properties: Properties = {}
+        lines = self._pending.split(b'\n')
+        self._pending = lines.pop()
+        consumed: List[bytes] = []
+        for line in lines:
+            consumed.append(line)
+            line = line.strip()
+            if not line:
+                if properties:
+                    events.append(properties)
+                    properties = {}
+                consumed = []
+                continue
+            key, sep, value = line.decode('utf-8', 'replace').partition('=')
+            if sep:
+                properties[key] = value
+        # Keep the lines of an incomplete event for the next read.
+        if consumed:
+            self._pending = b'\n'.join(consumed) + b'\n' + self._pending
+        if not events and self._eof:
+            raise EOFError
+        return events
+
+    def close(self) -> None:
+        """Close the stream"""
+        self._stream.close()
+
+
+class EventMapper:
+    """Map uevents to logical volume and physical volume changes.
+
+    Logical volumes are found from the device mapper devices with an LVM
+    uuid. A device mapper device is activated by the change event which
+    follows the load of its table, so the first change seen for a device is
+    reported as an activation and its removal as a deactivation. Creating an
+    inactive logical volume touches no device, so it produces no event.
+
+    Physical volumes are block devices which udev identifies as LVM members,
+    or which the device resolver of the lvm instance places in a volume
+    group. A device mapper device which is not a logical volume, such as a
+    multipath or LUKS device, may be a physical volume too. The mapper runs on a thread which may not use the lvm handle, so
+    it only reads the resolutions of the last refresh of the resolver. When
+    it sees an LVM member the resolver does not know, it invalidates the
+    resolver so the next lookup on a thread using the handle refreshes it.
+    """
+
+    def __init__(self, lvm: LVMInstance, sysfs: str = '/sys') -> None:
+        """Map uevents to changes
+
+        The device resolver is refreshed on the calling thread, which must be
+        one which may use the lvm handle.
+
+        Args:
+            lvm (LVMInstance): The lvm instance used to resolve devices.
+            sysfs (str, optional): The sysfs mount point. Defaults to '/sys'.
+        """
+        self.resolver = lvm.resolver
+        self.resolver.refresh()
+        self.sysfs = sysfs
+        self._active: Dict[str, Tuple[str, str]] = {}
+
+    def prime(self) -> None:
+        """Record the logical volumes which are already active"""
+        for path in glob.glob(os.path.join(self.sysfs, 'block', 'dm-*')):
+            names = self._read_dm_names(path)
+            if names is not None:
+                devpath = f'/devices/virtual/block/{os.path.basename(path)}'
+                self._active[devpath] = names
+
+    @staticmethod
+    def _read_sysfs(path: str) -> Optional[str]:
+        try:
+            with open(path) as fp:
+                return fp.read().strip()
+        except OSError:
+            return None
+
+    def _read_dm_names(self, path: str) -> Optional[Tuple[str, str]]:
+        uuid = self._read_sysfs(os.path.join(path, 'dm', 'uuid'))
+        name = self._read_sysfs(os.path.join(path, 'dm', 'name'))
+        if not uuid or not uuid.startswith('LVM-') or name is None:
+            return None
+        return split_dm_name(name)
+
+    def _lv_names(self, properties: Properties) -> Optional[Tuple[str, str]]:
+        if properties.get('DM_LV_LAYER'):
+            # The hidden layers of thin pools, mirrors and the like.
+            return None
+        vg_name = properties.get('DM_VG_NAME')
+        lv_name = properties.get('DM_LV_NAME')
+        if vg_name and lv_name:
+            return vg_name, lv_name
+        uuid = properties.get('DM_UUID')
+        name = properties.get('DM_NAME')
+        if uuid is not None and name is not None:
+            return split_dm_name(name) if uuid.startswith('LVM-') else None
+        # Kernel events carry no names, which are then read from sysfs.
+        return self._read_dm_names(
+            os.path.join(self.sysfs, properties['DEVPATH'].lstrip('/')))
+
+    def _map_lv(
+            self,
+            properties: Properties,
+            action: str,
+            received: float
+    ) -> Optional[LogicalVolumeEvent]:
+        devpath = properties['DEVPATH']
+        if action == 'remove':
+            names = self._active.pop(devpath, None)
+            kind = DEACTIVATED
+        elif action == 'change':
+            names = self._lv_names(properties)
+            if names is None:
+                return None
+            kind = CHANGED if devpath in self._active else ACTIVATED
+            self._active[devpath] = names
+        else:
+            return None
+        if names is None:
+            return None
+        return LogicalVolumeEvent(
+            kind,
+            names[0],
+            names[1],
+            _devname(properties),
+            _seqnum(properties),
+            received
+        )
+
+    def _map_pv(
+            self,
+            properties: Properties,
+            action: str,
+            received: float
+    ) -> Optional[PhysicalVolumeEvent]:
+        kind = {'add': ADDED, 'remove': REMOVED, 'change': CHANGED}.get(action)
+        if kind is None:
+            return None
+        is_member = properties.get('ID_FS_TYPE') == 'LVM2_member'
+        major, minor = properties.get('MAJOR'), properties.get('MINOR')
+        known, vg_name = (
+            self.resolver.lookup((int(major), int(minor)))
+            if major and minor else (False, None)
+        )
+        if is_member and (kind == ADDED or not known):
+            # A physical volume the resolutions may not hold yet.
+            self.resolver.invalidate()
+        if vg_name is None and not is_member:
+            return None
+        return PhysicalVolumeEvent(
+            kind,
+            vg_name,
+            _devname(properties),
+            _seqnum(properties),
+            received
+        )
+
+    def map(self, properties: Properties) -> Optional[ChangeEvent]:
+        """Map a uevent to a change.
+
+        Args:
+            properties (Properties): The properties of the uevent.
+
+        Returns:
+            Optional[ChangeEvent]: The change, or None if the event is not
+                about a logical volume or physical volume.
+        """
+        if properties.get('SUBSYSTEM') != 'block' or 'DEVPATH' not in properties:
+            return None
+        action = properties.get('ACTION', '')
+        received = time.time()
+        devpath = properties['DEVPATH']
+        if os.path.basename(devpath).startswith('dm-'):
+            event = self._map_lv(properties, action, received)
+            if event is not None:
+                return event
+        return self._map_pv(properties, action, received)
+
+
+class EventStream:
+    """Publish the changes to logical volumes and physical volumes.
+
+    The uevents are read on a background thread, which never uses the lvm
+    handle, and each change is passed to the subscribers as it arrives. A
+    subscriber is either a callback, called on the background thread, or an
+    async iterator.
+
+    The volume group of a physical volume event comes from the resolutions
+    of the device resolver, so it is None for a physical volume the resolver
+    had not seen. Refresh the resolver on a thread which may use the handle
+    to resolve it.
+    """
+
+    def __init__(
+            self,
+            lvm: LVMInstance,
+            source: Optional[Union[NetlinkSource, StreamSource]] = None
+    ) -> None:
+        """Publish the changes to logical volumes and physical volumes
+
+        The device resolver is refreshed on the calling thread, which must be
+        one which may use the lvm handle.
+
+        Args:
+            lvm (LVMInstance): The lvm instance used to resolve devices.
+            source (Optional[Union[NetlinkSource, StreamSource]], optional):
+                The uevent source. Defaults to None, for the udev netlink
+                socket.
+        """
+        self.mapper = EventMapper(lvm)
+        self.source = source if source is not None else NetlinkSource()
+        self.error: Optional[Exception] = None
+        self._subscribers: Dict[int, Tuple[
+            Callable[[ChangeEvent], None],
+            Optional[Callable[[], None]]
+        ]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._wake_read, self._wake_write = os.pipe()
+        self._stopping = False
+        self._ended = False
+        self._closed = False
+
+    def subscribe(
+            self,
+            callback: Callable[[ChangeEvent], None],
+            on_end: Optional[Callable[[], None]] = None
+    ) -> Callable[[], None]:
+        """Subscribe to the changes.
+
+        An exception raised by a callback is kept in `error` and does not stop
+        the stream.
+
+        Args:
+            callback (Callable[[ChangeEvent], None]): Called with each change
+                on the thread reading the events.
+            on_end (Optional[Callable[[], None]], optional): Called when the
+                stream ends. Defaults to None.
+
+        Returns:
+            Callable[[], None]: A function which unsubscribes.
+        """
+        with self._lock:
+            key = self._next_id
+            self._next_id += 1
+            self._subscribers[key] = (callback, on_end)
+            ended = self._ended
+        if ended and on_end is not None:
+            on_end()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers.pop(key, None)
+
+        return unsubscribe
+
+    def dispatch(self, properties: Properties) -> Optional[ChangeEvent]:
+        """Map a uevent and publish the change.
+
+        Args:
+            properties (Properties): The properties of the uevent.
+
+        Returns:
+            Optional[ChangeEvent]: The change, or None if the event is not
+                about a logical volume or physical volume.
+        """
+        event = self.mapper.map(properties)
+        if event is None:
+            return None
+        with self._lock:
+            callbacks = [callback for callback, _ in self._subscribers.values()]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as error:  # pylint: disable=broad-except
+                self.error = error
+        return event
+
+    def run(self) -> None:
+        """Read and publish events until stopped or the source ends."""
+        self.mapper.prime()
+        try:
+            while not self._stopping:
+                readable, _, _ = select.select(
+                    [self.source, self._wake_read], [], [])
+                if self._wake_read in readable:
+                    break
+                try:
+                    events = self.source.read()
+                except EOFError:
+                    break
+                for properties in events:
+                    self.dispatch(properties)
+        except Exception as error:  # pylint: disable=broad-except
+            self.error = error
+        finally:
+            with self._lock:
+                self._ended = True
+                endings = [on_end for _, on_end in self._subscribers.values()]
+                stopping = self._stopping
+            for on_end in endings:
+                if on_end is not None:
+                    on_end()
+            if stopping:
+                # A stop which timed out waiting left the closing to us.
+                self._close()
+
+    def start(self) -> None:
+        """Read and publish events on a background thread"""
+        if self._thread is not None or self._stopping:
+            return
+        self._thread = threading.Thread(
+            target=self.run,
+            name='lvm-event-stream',
+            daemon=True
+        )
+        self._thread.start()
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.source.close()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stop reading events and close the source.
+
+        Stopping more than once has no further effect. If the background
+        thread is still running when the timeout passes, it closes the source
+        itself when it ends.
+
+        Args:
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the background thread. Defaults to None.
+
+        Returns:
+            bool: True if the stream has stopped, or False if the background
+                thread is still running.
+        """
+        with self._lock:
+            if self._closed:
+                return True
+            wake = not self._stopping
+            self._stopping = True
+            if wake:
+                os.write(self._wake_write, b'\0')
+        thread = self._thread
+        if thread is not None:
+            if thread is threading.current_thread():
+                # Called by a subscriber, so the thread closes on its way out.
+                return False
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        self._close()
+        return True
+
+    async def events(self) -> AsyncIterator[ChangeEvent]:
+        """Iterate over the changes, starting the stream if needed.
+
+        Yields:
+            ChangeEvent: Each change, until the stream ends.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        unsubscribe = self.subscribe(
+            lambda event: loop.call_soon_threadsafe(queue.put_nowait, event),
+            lambda: loop.call_soon_threadsafe(queue.put_nowait, None)
+        )
+        self.start()
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            unsubscribe()
+
+    def __aiter__(self) -> AsyncIterator[ChangeEvent]:
+        return self.events()
+
+    def __enter__(self) -> EventStream:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
@@ -1,12 +1,155 @@
 """Exceptions"""
 
+from errno import (
+    EAGAIN,
+    EBADF,
+    EBUSY,
+    EEXIST,
+    EIO,
+    ENOENT,
+    ENOSPC,
+    EPERM,
+    ETIMEDOUT,
+    EXDEV
+)
+from typing import Dict, Iterable, Type, Union
+
 
 class LVMException(Exception):
-    """An LVM Exception"""
+    """An LVM Exception.
+
+    The message may be given as the raw bytes returned by the library, in
+    which case it is only decoded when it is used.
+    """
 
-    def __init__(self, errno: int, msg: str) -> None:
+    def __init__(self, errno: int, msg: Union[str, bytes]) -> None:
         super().__init__(msg)
         self.errno = errno
+        self._msg = msg
+
+    @property
+    def msg(self) -> str:
+        """The error message.
+
+        Returns:
+            str: The message.
+        """
+        if isinstance(self._msg, bytes):
+            self._msg = self._msg.decode('iso-8859-1')
+        return self._msg
+
+    def __str__(self):
+        return f'{self.errno}: {self.msg}'
+
+
+class LVMNotFoundError(LVMException):
+    """The object does not exist"""
+
+
+class LVMExistsError(LVMException):
+    """The object already exists"""
+
+
+class LVMLockedError(LVMException):
+    """The object is locked or busy"""
+
+
+class LVMNoSpaceError(LVMException):
+    """There is not enough space"""
+
+
+_EXCEPTIONS: Dict[int, Type[LVMException]] = {
+    ENOENT: LVMNotFoundError,
+    EEXIST: LVMExistsError,
+    EBUSY: LVMLockedError,
+    EAGAIN: LVMLockedError,
+    ENOSPC: LVMNoSpaceError
+}
+
+
+def exception_for(errno: int, msg: Union[str, bytes]) -> LVMException:
+    """Create the exception for an LVM error number.
+
+    Args:
+        errno (int): The error number.
+        msg (Union[str, bytes]): The message, or the raw bytes of the message.
+
+    Returns:
+        LVMException: The exception, as the subclass for the error number if
+            there is one.
+    """
+    return _EXCEPTIONS.get(errno, LVMException)(errno, msg)
+
+
+class LVMTimeoutError(LVMException):
+    """An LVM call did not complete before its deadline"""
+
+    def __init__(self, name: str, timeout: float) -> None:
+        super().__init__(
+            ETIMEDOUT,
+            f'{name} did not complete within {timeout}s'
+        )
+        self.name = name
+        self.timeout = timeout
+
+
+class LVMQuarantinedError(LVMException):
+    """A handle was used after a call on it timed out"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(
+            EBUSY,
+            f'{name} refused as the handle is quarantined after a timeout'
+        )
+        self.name = name
+
+
+class LVMPlacementError(LVMException):
+    """A logical volume was allocated outside its pinned devices"""
+
+    def __init__(self, name: str, devices: Iterable[str]) -> None:
+        self.devices = sorted(devices)
+        super().__init__(
+            EXDEV,
+            f'{name} was allocated on {", ".join(self.devices)}'
+            ' outside its pinned devices'
+        )
+        self.name = name
+
+
+class LVMClosedError(LVMException):
+    """A handle was used after it was closed"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(EBADF, f'{name} handle used after it was closed')
+        self.name = name
+
+
+class LVMOwnershipError(LVMException):
+    """A handle was used by a thread which does not own it"""
+
+    def __init__(self, name: str, owner: int) -> None:
+        super().__init__(
+            EPERM,
+            f'{name} handle is owned by thread {owner} and may only be used'
+            ' by that thread'
+        )
+        self.name = name
+        self.owner = owner
+
+
+class LVMCommandError(LVMException):
+    """An LVM command exited with an error"""
+
+    def __init__(
+            self,
+            command: str,
+            returncode: int,
+            output: Union[str, bytes]
+    ) -> None:
+        super().__init__(EIO, output)
+        self.command = command
+        self.returncode = returncode
 
     def __str__(self):
-        return f'{self.errno}: {super().__str__()}'
+        return f'{self.command} exited with {self.returncode}: {self.msg}'
@@ -0,0 +1,1274 @@
+"""An in memory LVM engine for tests"""
+
+from __future__ import annotations
+from errno import EAGAIN, EBUSY, EEXIST, EINVAL, ENOENT, ENOSPC, EPERM
+import random
+import re
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union
+)
+
+from .exceptions import (
+    LVMClosedError,
+    LVMException,
+    LVMPlacementError,
+    exception_for
+)
+from .records import PhysicalVolumeRecord
+from .placement import (
+    Placement,
+    PlacedVolume,
+    PlacementPolicy,
+    actual_placement,
+    capacities
+)
+from .snapshot import VolumeGroupSnapshot
+
+MiB = 1024 * 1024
+
+# The space at the start of a physical volume holding the metadata.
+PV_METADATA_SIZE = MiB
+DEFAULT_EXTENT_SIZE = 4 * MiB
+
+# The most changes a copy on write map keeps over the dict it shares.
+_MAX_CHANGES = 1024
+
+_NAME = re.compile(r'^[A-Za-z0-9+_.][A-Za-z0-9+_.-]*$')
+_UUID_CHARS = (
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+)
+
+
+def _valid_name(name: str) -> bool:
+    return (
+        len(name) <= 127 and
+        name not in ('.', '..') and
+        _NAME.match(name) is not None
+    )
+
+
+V = TypeVar('V')
+
+# Marks a key removed from the shared dict of a copy on write map.
+_REMOVED: Any = object()
+
+
+class _CowMap(MutableMapping[str, V]):
+    """A mapping over a shared dict which is never changed.
+
+    The changes are kept in a dict of their own, so a copy only copies the
+    changes. They are folded into a new shared dict once there are too many.
+    """
+
+    __slots__ = ('_shared', '_changes', '_len')
+
+    def __init__(
+            self,
+            shared: Optional[Dict[str, V]] = None,
+            changes: Optional[Dict[str, V]] = None,
+            length: Optional[int] = None
+    ) -> None:
+        self._shared: Dict[str, V] = shared if shared is not None else {}
+        self._changes: Dict[str, V] = changes if changes is not None else {}
+        self._len = len(self._shared) if length is None else length
+
+    def __getitem__(self, key: str) -> V:
+        if key in self._changes:
+            value = self._changes[key]
+        else:
+            value = self._shared.get(key, _REMOVED)
+        if value is _REMOVED:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._changes:
+            return self._changes[key] is not _REMOVED  # type: ignore
+        return key in self._shared
+
+    def __setitem__(self, key: str, value: V) -> None:
+        if key not in self:
+            self._len += 1
+        self._changes[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if key in self._shared:
+            self._changes[key] = _REMOVED
+        else:
+            del self._changes[key]
+        self._len -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        changes = self._changes
+        for key in self._shared:
+            if changes.get(key) is not _REMOVED:
+                yield key
+        for key, value in changes.items():
+            if value is not _REMOVED and key not in self._shared:
+                yield key
+
+    def __len__(self) -> int:
+        return self._len
+
+    def copy(self) -> _CowMap[V]:
+        if len(self._changes) > _MAX_CHANGES:
+            # The shared dict may be read by other copies, so a new one is made.
+            self._shared = {key: self[key] for key in self}
+            self._changes = {}
+        return _CowMap(self._shared, dict(self._changes), self._len)
+
+
+class _PVMeta(NamedTuple):
+    name: str
+    uuid: str
+    dev_size: int
+    allocated: int
+
+
+class _LVMeta(NamedTuple):
+    name: str
+    uuid: str
+    extents: int
+    tags: Tuple[str, ...]
+    segments: Tuple[Tuple[str, int], ...]
+
+
+class _VGMeta:
+    """The metadata of a volume group.
+
+    Every handle reads a private copy, taken when it is opened. The physical
+    and logical volumes are held in copy on write maps, so the copy shares
+    the committed volumes and only copies the recent changes. As writers hold
+    the write lock of the volume group, the metadata of a writer is the
+    committed metadata with its changes, and writing commits a copy of it.
+    """
+
+    __slots__ = (
+        'name', 'uuid', 'seqno', 'extent_size', 'tags', 'pvs', 'lvs',
+        'lv_names', 'allocated', 'max_pv', 'max_lv', 'removed'
+    )
+
+    def __init__(self, name: str, uuid: str) -> None:
+        self.name = name
+        self.uuid = uuid
+        self.seqno = 0
+        self.extent_size = DEFAULT_EXTENT_SIZE
+        self.tags: Tuple[str, ...] = ()
+        self.pvs: _CowMap[_PVMeta] = _CowMap()
+        self.lvs: _CowMap[_LVMeta] = _CowMap()
+        self.lv_names: _CowMap[str] = _CowMap()
+        self.allocated = 0
+        self.max_pv = 0
+        self.max_lv = 0
+        self.removed = False
+
+    def copy(self) -> _VGMeta:
+        meta = _VGMeta(self.name, self.uuid)
+        meta.pvs = self.pvs.copy()
+        meta.lvs = self.lvs.copy()
+        meta.lv_names = self.lv_names.copy()
+        meta.seqno = self.seqno
+        meta.extent_size = self.extent_size
+        meta.tags = self.tags
+        meta.allocated = self.allocated
+        meta.max_pv = self.max_pv
+        meta.max_lv = self.max_lv
+        meta.removed = self.removed
+        return meta
+
+    def set_pv(self, pv: _PVMeta) -> None:
+        self.pvs[pv.name] = pv
+
+    def remove_pv(self, name: str) -> None:
+        del self.pvs[name]
+
+    def set_lv(self, lv: _LVMeta) -> None:
+        self.lvs[lv.name] = lv
+        self.lv_names[lv.uuid] = lv.name
+
+    def remove_lv(self, name: str) -> None:
+        lv = self.lvs.pop(name)
+        del self.lv_names[lv.uuid]
+
+    def pe_count(self, pv: _PVMeta) -> int:
+        return max(pv.dev_size - PV_METADATA_SIZE, 0) // self.extent_size
+
+    @property
+    def extent_count(self) -> int:
+        return sum(self.pe_count(pv) for pv in self.pvs.values())
+
+
+class FakeEngine:
+    """The disks and metadata shared by every fake lvm handle"""
+
+    def __init__(
+            self,
+            devices: Optional[Dict[str, int]] = None,
+            seed: int = 0,
+            lock_timeout: float = 10.0
+    ) -> None:
+        """The disks and metadata shared by every fake lvm handle
+
+        Args:
+            devices (Optional[Dict[str, int]], optional): The sizes in bytes of
+                the block devices by path. Defaults to None.
+            seed (int, optional): The seed for the uuids. Defaults to 0.
+            lock_timeout (float, optional): The time in seconds to wait for
+                the write lock of a volume group. Defaults to 10.0.
+        """
+        self.devices: Dict[str, int] = dict(devices or {})
+        self.pvs: Dict[str, str] = {}
+        self.vgs: Dict[str, _VGMeta] = {}
+        self.active: Set[str] = set()
+        self.lock_timeout = lock_timeout
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._vg_locks: Dict[str, threading.Lock] = {}
+        self._vg_owners: Dict[str, int] = {}
+
+    def add_device(self, path: str, size: int) -> None:
+        """Add a block device.
+
+        Args:
+            path (str): The device path.
+            size (int): The size in bytes.
+        """
+        with self._lock:
+            self.devices[path] = size
+
+    def uuid(self) -> str:
+        """Make a uuid in the format used by LVM.
+
+        Returns:
+            str: The uuid.
+        """
+        with self._lock:
+            chars = ''.join(self._random.choice(_UUID_CHARS) for _ in range(32))
+        parts, start = [], 0
+        for length in (6, 4, 4, 4, 4, 4, 6):
+            parts.append(chars[start:start + length])
+            start += length
+        return '-'.join(parts)
+
+    def vg_of_device(self, device: str) -> Optional[_VGMeta]:
+        """Find the volume group holding a physical volume.
+
+        Args:
+            device (str): The device path.
+
+        Returns:
+            Optional[_VGMeta]: The committed metadata, or None for an orphan.
+        """
+        with self._lock:
+            for meta in self.vgs.values():
+                if device in meta.pvs:
+                    return meta
+        return None
+
+    def lock_vg(self, name: str) -> None:
+        """Take the write lock of a volume group.
+
+        Args:
+            name (str): The volume group name.
+
+        Raises:
+            LVMException: With EAGAIN if the lock could not be taken.
+        """
+        with self._lock:
+            lock = self._vg_locks.setdefault(name, threading.Lock())
+            if self._vg_owners.get(name) == threading.get_ident():
+                raise exception_for(
+                    EAGAIN, f'Volume group {name} is already open for writing')
+        if not lock.acquire(timeout=self.lock_timeout):
+            raise exception_for(
+                EAGAIN, f'Timed out waiting for the lock of {name}')
+        self._vg_owners[name] = threading.get_ident()
+
+    def unlock_vg(self, name: str) -> None:
+        """Release the write lock of a volume group.
+
+        Args:
+            name (str): The volume group name.
+        """
+        self._vg_owners.pop(name, None)
+        self._vg_locks[name].release()
+
+    def read_vg(self, name: str) -> Optional[_VGMeta]:
+        """Read a copy of the committed metadata of a volume group.
+
+        The copy shares the committed volumes, so it costs the changes made
+        since they were last folded in rather than the size of the group.
+
+        Args:
+            name (str): The volume group name.
+
+        Returns:
+            Optional[_VGMeta]: The metadata, or None if there is no such
+                volume group.
+        """
+        with self._lock:
+            committed = self.vgs.get(name)
+            return committed.copy() if committed is not None else None
+
+    def commit(self, meta: _VGMeta) -> None:
+        """Write the changes to the metadata of a volume group.
+
+        Args:
+            meta (_VGMeta): The metadata of the writing handle.
+        """
+        with self._lock:
+            if meta.removed:
+                self.vgs.pop(meta.name, None)
+                return
+            # The writer holds the write lock, so its metadata is the
+            # committed metadata with its changes.
+            meta.seqno += 1
+            self.vgs[meta.name] = meta.copy()
+
+
+class FakePhysicalVolume:
+    """A physical volume of the fake engine"""
+
+    __slots__ = ('_vg', '_engine', '_name')
+
+    def __init__(
+            self,
+            engine: FakeEngine,
+            name: str,
+            vg: Optional[FakeVolumeGroup] = None
+    ) -> None:
+        self._engine = engine
+        self._vg = vg
+        self._name = name
+
+    def _meta(self) -> Tuple[Optional[_VGMeta], Optional[_PVMeta]]:
+        if self._vg is not None:
+            meta = self._vg._read()  # pylint: disable=protected-access
+            return meta, meta.pvs.get(self._name)
+        meta = self._engine.vg_of_device(self._name)
+        return meta, meta.pvs[self._name] if meta is not None else None
+
+    @property
+    def name(self) -> str:
+        """The name of the physical volume"""
+        return self._name
+
+    @property
+    def uuid(self) -> str:
+        """The uuid of the physical volume"""
+        return self._engine.pvs[self._name]
+
+    @property
+    def mda_count(self) -> int:
+        """The number of metadata areas"""
+        return 1
+
+    @property
+    def dev_size(self) -> int:
+        """The size in bytes of the device"""
+        return self._engine.devices[self._name]
+
+    @property
+    def size(self) -> int:
+        """The size in bytes of the physical volume"""
+        vg, pv = self._meta()
+        if vg is None or pv is None:
+            return max(self.dev_size - PV_METADATA_SIZE, 0)
+        return vg.pe_count(pv) * vg.extent_size
+
+    @property
+    def free(self) -> int:
+        """The unallocated space in bytes"""
+        vg, pv = self._meta()
+        if vg is None or pv is None:
+            return self.size
+        return (vg.pe_count(pv) - pv.allocated) * vg.extent_size
+
+    def get_property(self, name: str) -> Optional[Union[str, int]]:
+        """Get the value of a physical volume property.
+
+        Args:
+            name (str): The property name.
+
+        Returns:
+            Optional[Union[str, int]]: The value, or None if it is not known.
+        """
+        vg, _ = self._meta()
+        values: Dict[str, Optional[Union[str, int]]] = {
+            'pv_name': self.name,
+            'pv_uuid': self.uuid,
+            'pv_size': self.size,
+            'pv_free': self.free,
+            'dev_size': self.dev_size,
+            'pv_mda_count': self.mda_count,
+            'vg_name': vg.name if vg else '',
+            'vg_uuid': vg.uuid if vg else ''
+        }
+        return values.get(name)
+
+
+class FakeLogicalVolume:
+    """A logical volume of the fake engine"""
+
+    __slots__ = ('_vg', '_name')
+
+    def __init__(self, vg: FakeVolumeGroup, name: str) -> None:
+        self._vg = vg
+        self._name = name
+
+    def _meta(self) -> _LVMeta:
+        meta = self._vg._read().lvs.get(self._name)  # pylint: disable=protected-access
+        if meta is None:
+            raise self._vg.fail(ENOENT, f'Logical volume {self._name} not found')
+        return meta
+
+    @property
+    def name(self) -> str:
+        """The name of the logical volume"""
+        return self._meta().name
+
+    @property
+    def uuid(self) -> str:
+        """The uuid of the logical volume"""
+        return self._meta().uuid
+
+    @property
+    def size(self) -> int:
+        """The size in bytes of the logical volume"""
+        return self._meta().extents * self._vg._read().extent_size  # pylint: disable=protected-access
+
+    @property
+    def is_active(self) -> bool:
+        """True if the logical volume is active"""
+        return self._meta().uuid in self._vg.engine.active
+
+    @is_active.setter
+    def is_active(self, value: bool) -> None:
+        if value and not self.is_active:
+            self.activate()
+        elif not value and self.is_active:
+            self.deactivate()
+
+    @property
+    def is_suspended(self) -> bool:
+        """True if the logical volume is suspended"""
+        self._meta()
+        return False
+
+    @property
+    def attr(self) -> str:
+        """The attributes of the logical volume"""
+        return '-wi-a-----' if self.is_active else '-wi-------'
+
+    @property
+    def origin(self) -> Optional[str]:
+        """The origin of a snapshot"""
+        self._meta()
+        return None
+
+    def get_property(self, name: str) -> Optional[Union[str, int]]:
+        """Get the value of a logical volume property.
+
+        Args:
+            name (str): The property name.
+
+        Returns:
+            Optional[Union[str, int]]: The value, or None if it is not known.
+        """
+        values: Dict[str, Optional[Union[str, int]]] = {
+            'lv_name': self.name,
+            'lv_uuid': self.uuid,
+            'lv_size': self.size,
+            'lv_attr': self.attr,
+            'vg_name': self._vg.name
+        }
+        return values.get(name)
+
+    @property
+    def tags(self) -> List[str]:
+        """The logical volume tags"""
+        return list(self._meta().tags)
+
+    def add_tag(self, tag: str) -> None:
+        """Add a tag, which requires the volume group to be written.
+
+        Args:
+            tag (str): The tag.
+        """
+        meta = self._meta()
+        self._vg._require_writable()  # pylint: disable=protected-access
+        if tag not in meta.tags:
+            self._vg._read().set_lv(meta._replace(tags=meta.tags + (tag,)))  # pylint: disable=protected-access
+
+    def remove_tag(self, tag: str) -> None:
+        """Remove a tag, which requires the volume group to be written.
+
+        Args:
+            tag (str): The tag.
+        """
+        meta = self._meta()
+        self._vg._require_writable()  # pylint: disable=protected-access
+        if tag in meta.tags:
+            self._vg._read().set_lv(meta._replace(  # pylint: disable=protected-access
+                tags=tuple(value for value in meta.tags if value != tag)))
+
+    def activate(self, timeout: Optional[float] = None) -> None:
+        """Activate the logical volume.
+
+        Args:
+            timeout (Optional[float], optional): Ignored. Defaults to None.
+        """
+        self._vg.engine.active.add(self._meta().uuid)
+
+    def deactivate(self, timeout: Optional[float] = None) -> None:
+        """Deactivate the logical volume.
+
+        Args:
+            timeout (Optional[float], optional): Ignored. Defaults to None.
+        """
+        self._vg.engine.active.discard(self._meta().uuid)
+
+    def remove(self) -> None:
+        """Remove the logical volume, committing the volume group.
+
+        Raises:
+            LVMException: With EBUSY if the logical volume is active.
+        """
+        meta = self._meta()
+        self._vg._require_writable()  # pylint: disable=protected-access
+        if meta.uuid in self._vg.engine.active:
+            raise self._vg.fail(
+                EBUSY, f'Can\'t remove open logical volume {meta.name}')
+        vg = self._vg._read()  # pylint: disable=protected-access
+        for device, extents in meta.segments:
+            pv = vg.pvs[device]
+            vg.set_pv(pv._replace(allocated=pv.allocated - extents))
+        vg.allocated -= meta.extents
+        vg.remove_lv(meta.name)
+        self._vg._commit()  # pylint: disable=protected-access
+
+
+class FakeVolumeGroup:
+    """A volume group handle of the fake engine"""
+
+    def __init__(
+            self,
+            instance: FakeLVMInstance,
+            meta: _VGMeta,
+            writable: bool
+    ) -> None:
+        self.instance = instance
+        self.engine = instance.engine
+        self.writable = writable
+        self.closed = False
+        self._meta = meta
+
+    def fail(self, errno: int, msg: str) -> LVMException:
+        """Record an error on the lvm instance and create its exception.
+
+        Args:
+            errno (int): The error number.
+            msg (str): The message.
+
+        Returns:
+            LVMException: The exception.
+        """
+        return self.instance.fail(errno, msg)
+
+    def _read(self) -> _VGMeta:
+        if self.closed:
+            raise LVMClosedError('volume group')
+        return self._meta
+
+    def _require_writable(self) -> None:
+        if not self.writable:
+            raise self.fail(EPERM, f'Volume group {self._meta.name} is read-only')
+
+    def _commit(self) -> None:
+        self.engine.commit(self._meta)
+
+    @property
+    def name(self) -> str:
+        """The name of the volume group"""
+        return self._read().name
+
+    @property
+    def uuid(self) -> str:
+        """The uuid of the volume group"""
+        return self._read().uuid
+
+    @property
+    def seqno(self) -> int:
+        """The metadata sequence number"""
+        return self._read().seqno
+
+    @property
+    def is_clustered(self) -> bool:
+        """False, as clustering is not modelled"""
+        self._read()
+        return False
+
+    @property
+    def is_exported(self) -> bool:
+        """False, as exporting is not modelled"""
+        self._read()
+        return False
+
+    @property
+    def is_partial(self) -> bool:
+        """False, as missing devices are not modelled"""
+        self._read()
+        return False
+
+    @property
+    def extent_size(self) -> int:
+        """The extent size in bytes"""
+        return self._read().extent_size
+
+    @extent_size.setter
+    def extent_size(self, value: int) -> None:
+        self._require_writable()
+        if value < 1024 or value & (value - 1):
+            raise self.fail(EINVAL, f'Invalid extent size {value}')
+        if self._read().lvs:
+            raise self.fail(
+                EBUSY, 'The extent size of a volume group with logical'
+                ' volumes is not changed by the fake engine')
+        self._read().extent_size = value
+
+    @property
+    def extent_count(self) -> int:
+        """The number of extents"""
+        return self._read().extent_count
+
+    @property
+    def free_extent_count(self) -> int:
+        """The number of free extents"""
+        meta = self._read()
+        return meta.extent_count - meta.allocated
+
+    @property
+    def size(self) -> int:
+        """The size in bytes"""
+        meta = self._read()
+        return meta.extent_count * meta.extent_size
+
+    @property
+    def free_size(self) -> int:
+        """The free space in bytes"""
+        return self.free_extent_count * self._read().extent_size
+
+    @property
+    def pv_count(self) -> int:
+        """The number of physical volumes"""
+        return len(self._read().pvs)
+
+    @property
+    def max_pv(self) -> int:
+        """The most physical volumes allowed, or 0 for no limit"""
+        return self._read().max_pv
+
+    @property
+    def max_lv(self) -> int:
+        """The most logical volumes allowed, or 0 for no limit"""
+        return self._read().max_lv
+
+    @property
+    def tags(self) -> List[str]:
+        """The volume group tags"""
+        return list(self._read().tags)
+
+    def add_tag(self, tag: str) -> None:
+        """Add a tag, which requires the volume group to be written.
+
+        Args:
+            tag (str): The tag.
+        """
+        self._require_writable()
+        if tag not in self._read().tags:
+            meta = self._read()
+            meta.tags = meta.tags + (tag,)
+
+    def remove_tag(self, tag: str) -> None:
+        """Remove a tag, which requires the volume group to be written.
+
+        Args:
+            tag (str): The tag.
+        """
+        self._require_writable()
+        if tag in self._read().tags:
+            meta = self._read()
+            meta.tags = tuple(value for value in meta.tags if value != tag)
+
+    def write(self) -> None:
+        """Commit the changes, incrementing the seqno."""
+        self._read()
+        self._require_writable()
+        self._commit()
+
+    def remove(self) -> None:
+        """Remove the volume group, which requires it to be written.
+
+        Raises:
+            LVMException: With EBUSY if it holds logical volumes.
+        """
+        self._require_writable()
+        if self._read().lvs:
+            raise self.fail(
+                EBUSY, f'Volume group {self._meta.name} still contains'
+                f' {len(self._meta.lvs)} logical volumes')
+        self._read().removed = True
+
+    def extend(self, device: str) -> None:
+        """Add a device, creating the physical volume if needed.
+
+        Args:
+            device (str): The device path.
+        """
+        self._require_writable()
+        meta = self._read()
+        if device in meta.pvs:
+            raise self.fail(
+                EEXIST, f'{device} is already in volume group {meta.name}')
+        if device not in self.engine.devices:
+            raise self.fail(ENOENT, f'Device {device} not found')
+        other = self.engine.vg_of_device(device)
+        if other is not None:
+            raise self.fail(
+                EBUSY, f'{device} is in volume group {other.name}')
+        if meta.max_pv and len(meta.pvs) >= meta.max_pv:
+            raise self.fail(EINVAL, f'No space for {device} in {meta.name}')
+        uuid = self.engine.pvs.get(device)
+        if uuid is None:
+            uuid = self.engine.pvs[device] = self.engine.uuid()
+        meta.set_pv(_PVMeta(device, uuid, self.engine.devices[device], 0))
+
+    def reduce(self, device: str) -> None:
+        """Remove an unused device.
+
+        Args:
+            device (str): The device path.
+        """
+        self._require_writable()
+        meta = self._read()
+        pv = meta.pvs.get(device)
+        if pv is None:
+            raise self.fail(
+                ENOENT, f'{device} is not in volume group {meta.name}')
+        if pv.allocated:
+            raise self.fail(EBUSY, f'{device} still has allocated extents')
+        if len(meta.pvs) == 1:
+            raise self.fail(
+                EINVAL, f'Can\'t remove the last physical volume of {meta.name}')
+        meta.remove_pv(device)
+
+    @property
+    def physical_volumes(self) -> List[FakePhysicalVolume]:
+        """The physical volumes of the volume group"""
+        return [
+            FakePhysicalVolume(self.engine, name, self)
+            for name in self._read().pvs
+        ]
+
+    @property
+    def logical_volumes(self) -> List[FakeLogicalVolume]:
+        """The logical volumes of the volume group"""
+        return [FakeLogicalVolume(self, name) for name in self._read().lvs]
+
+    @property
+    def lv_tag_index(self) -> Dict[str, List[FakeLogicalVolume]]:
+        """The logical volumes by tag"""
+        index: Dict[str, List[FakeLogicalVolume]] = {}
+        for lv in self._read().lvs.values():
+            for tag in lv.tags:
+                index.setdefault(tag, []).append(FakeLogicalVolume(self, lv.name))
+        return index
+
+    def lvs_with_tag(self, tag: str) -> List[FakeLogicalVolume]:
+        """Find the logical volumes with a tag.
+
+        Args:
+            tag (str): The tag.
+
+        Returns:
+            List[FakeLogicalVolume]: The logical volumes.
+        """
+        return list(self.lv_tag_index.get(tag, []))
+
+    def snapshot(self) -> VolumeGroupSnapshot:
+        """Take an immutable snapshot of the volume group.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        return VolumeGroupSnapshot.take(self)  # type: ignore
+
+    def try_lv_from_name(self, name: str) -> Optional[FakeLogicalVolume]:
+        """Find a logical volume by name.
+
+        Args:
+            name (str): The name.
+
+        Returns:
+            Optional[FakeLogicalVolume]: The logical volume, or None.
+        """
+        if name not in self._read().lvs:
+            return None
+        return FakeLogicalVolume(self, name)
+
+    def lv_from_name(self, name: str) -> FakeLogicalVolume:
+        """Find a logical volume by name.
+
+        Args:
+            name (str): The name.
+
+        Raises:
+            LVMNotFoundError: If there is no such logical volume.
+
+        Returns:
+            FakeLogicalVolume: The logical volume.
+        """
+        volume = self.try_lv_from_name(name)
+        if volume is None:
+            raise self.fail(ENOENT, f'Logical volume {name} not found')
+        return volume
+
+    def try_lv_from_uuid(self, uuid: str) -> Optional[FakeLogicalVolume]:
+        """Find a logical volume by uuid.
+
+        Args:
+            uuid (str): The uuid.
+
+        Returns:
+            Optional[FakeLogicalVolume]: The logical volume, or None.
+        """
+        name = self._read().lv_names.get(uuid)
+        return FakeLogicalVolume(self, name) if name is not None else None
+
+    def lv_from_uuid(self, uuid: str) -> FakeLogicalVolume:
+        """Find a logical volume by uuid.
+
+        Args:
+            uuid (str): The uuid.
+
+        Raises:
+            LVMNotFoundError: If there is no such logical volume.
+
+        Returns:
+            FakeLogicalVolume: The logical volume.
+        """
+        volume = self.try_lv_from_uuid(uuid)
+        if volume is None:
+            raise self.fail(ENOENT, f'Logical volume {uuid} not found')
+        return volume
+
+    def _create(self, name: str, size: int) -> FakeLogicalVolume:
+        self._require_writable()
+        meta = self._read()
+        if not _valid_name(name):
+            raise self.fail(EINVAL, f'Invalid logical volume name {name}')
+        if name in meta.lvs:
+            raise self.fail(EEXIST, f'Logical volume {name} already exists')
+        if meta.max_lv and len(meta.lvs) >= meta.max_lv:
+            raise self.fail(EINVAL, f'Volume group {meta.name} is full')
+        extents = -(-size // meta.extent_size)
+        if extents > meta.extent_count - meta.allocated:
+            raise self.fail(
+                ENOSPC, f'Insufficient free space: {extents} extents needed')
+
+        # Like the library, fill the physical volumes in order.
+        segments: List[Tuple[str, int]] = []
+        remaining = extents
+        for pv in meta.pvs.values():
+            if remaining == 0:
+                break
+            taken = min(meta.pe_count(pv) - pv.allocated, remaining)
+            if taken > 0:
+                segments.append((pv.name, taken))
+                remaining -= taken
+
+        for device, taken in segments:
+            pv = meta.pvs[device]
+            meta.set_pv(pv._replace(allocated=pv.allocated + taken))
+        meta.set_lv(
+            _LVMeta(name, self.engine.uuid(), extents, (), tuple(segments)))
+        meta.allocated += extents
+        self._commit()
+        return FakeLogicalVolume(self, name)
+
+    def create_lv_linear(self, name: str, size: int) -> FakeLogicalVolume:
+        """Create a linear logical volume, committing the volume group.
+
+        Args:
+            name (str): The name.
+            size (int): The size in bytes, rounded up to whole extents.
+
+        Returns:
+            FakeLogicalVolume: The logical volume.
+        """
+        return self._create(name, size)
+
+    def plan_lv(self, size: int, policy: PlacementPolicy) -> Placement:
+        """Plan the placement of a new logical volume.
+
+        Args:
+            size (int): The size in bytes.
+            policy (PlacementPolicy): The placement policy.
+
+        Returns:
+            Placement: The placement.
+        """
+        extent_size = self.extent_size
+        return policy.plan(
+            capacities(self.physical_volumes, extent_size),
+            size,
+            extent_size
+        )
+
+    def create_lv(
+            self,
+            name: str,
+            size: int,
+            policy: PlacementPolicy
+    ) -> PlacedVolume:
+        """Create a logical volume placed by a policy.
+
+        As with the library the plan is only checked, and the extents are
+        allocated in the order of the physical volumes.
+
+        Args:
+            name (str): The name.
+            size (int): The size in bytes.
+            policy (PlacementPolicy): The placement policy.
+
+        Raises:
+            LVMPlacementError: If a strict policy was not respected.
+
+        Returns:
+            PlacedVolume: The logical volume with its planned and actual
+                placement.
+        """
+        extent_size = self.extent_size
+        before = capacities(self.physical_volumes, extent_size)
+        planned = policy.plan(before, size, extent_size)
+
+        volume = self._create(name, size)
+
+        after = capacities(self.physical_volumes, extent_size)
+        actual = actual_placement(before, after, extent_size)
+        if policy.strict:
+            outside = set(actual.devices) - set(planned.devices)
+            if outside:
+                volume.remove()
+                raise LVMPlacementError(name, outside)
+
+        return PlacedVolume(volume, planned, actual)
+
+
+class FakeVolumeGroupContext:
+    """The context manager returned by vg_open and vg_create"""
+
+    def __init__(
+            self,
+            instance: FakeLVMInstance,
+            name: str,
+            mode: str,
+            create: bool = False
+    ) -> None:
+        self.instance = instance
+        self.name = name
+        self.mode = mode
+        self.create = create
+        self.vg: Optional[FakeVolumeGroup] = None
+        self._locked = False
+
+    def __enter__(self) -> FakeVolumeGroup:
+        engine = self.instance.engine
+        writable = self.create or 'w' in self.mode
+        if writable:
+            engine.lock_vg(self.name)
+            self._locked = True
+        try:
+            meta = engine.read_vg(self.name)
+            if self.create:
+                if meta is not None or not _valid_name(self.name):
+                    raise self.instance.fail(
+                        EEXIST if meta else EINVAL,
+                        f'Can\'t create volume group {self.name}')
+                meta = _VGMeta(self.name, engine.uuid())
+            elif meta is None:
+                raise self.instance.fail(
+                    ENOENT, f'Volume group {self.name} not found')
+            self.vg = FakeVolumeGroup(self.instance, meta, writable)
+        except LVMException:
+            self.__exit__(None, None, None)
+            raise
+        return self.vg
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self.vg is not None:
+            self.vg.closed = True
+        if self._locked:
+            self.instance.engine.unlock_vg(self.name)
+            self._locked = False
+
+
+class FakeLVMInstance:
+    """An lvm instance backed by the fake engine"""
+
+    def __init__(self, engine: FakeEngine) -> None:
+        self.engine = engine
+        self.closed = False
+        self._errno = 0
+        self._errmsg = ''
+        self._config: List[str] = []
+
+    def _check(self) -> None:
+        if self.closed:
+            raise LVMClosedError('lvm')
+
+    def fail(self, errno: int, msg: str) -> LVMException:
+        """Record an error and create its exception.
+
+        Args:
+            errno (int): The error number.
+            msg (str): The message.
+
+        Returns:
+            LVMException: The exception.
+        """
+        self._errno, self._errmsg = errno, msg
+        return exception_for(errno, msg)
+
+    @property
+    def errno(self) -> int:
+        """The number of the last error"""
+        return self._errno
+
+    @property
+    def errmsg(self) -> str:
+        """The message of the last error"""
+        return self._errmsg
+
+    @property
+    def version(self) -> str:
+        """The version of the fake library"""
+        return '2.02.187(2) (fake)'
+
+    def list_vg_names(self) -> List[str]:
+        """The volume group names"""
+        self._check()
+        return list(self.engine.vgs)
+
+    def list_vg_uuids(self) -> List[str]:
+        """The volume group uuids"""
+        self._check()
+        return [meta.uuid for meta in list(self.engine.vgs.values())]
+
+    def vgname_from_pvid(self, pvid: str) -> Optional[str]:
+        """Find the volume group holding a physical volume by uuid.
+
+        Args:
+            pvid (str): The physical volume uuid.
+
+        Returns:
+            Optional[str]: The volume group name.
+        """
+        self._check()
+        for device, uuid in list(self.engine.pvs.items()):
+            if uuid == pvid:
+                return self.vgname_from_device(device)
+        return None
+
+    def vgname_from_device(self, device: str) -> Optional[str]:
+        """Find the volume group holding a device.
+
+        Args:
+            device (str): The device path.
+
+        Returns:
+            Optional[str]: The volume group name.
+        """
+        self._check()
+        meta = self.engine.vg_of_device(device)
+        return meta.name if meta is not None else None
+
+    def vg_name_validate(self, name: str) -> bool:
+        """Validate a volume group name.
+
+        Args:
+            name (str): The name.
+
+        Returns:
+            bool: True if the name is valid and not in use.
+        """
+        return _valid_name(name) and name not in self.engine.vgs
+
+    def scan(self, timeout: Optional[float] = None) -> None:
+        """Scan for volume groups, which the fake engine always knows.
+
+        Args:
+            timeout (Optional[float], optional): Ignored. Defaults to None.
+        """
+        self._check()
+
+    def vg_open(
+            self,
+            name: str,
+            mode: str = "r",
+            flags: int = 0,
+            timeout: Optional[float] = None
+    ) -> FakeVolumeGroupContext:
+        """Open a volume group.
+
+        Args:
+            name (str): The name.
+            mode (str, optional): "r" or "w". Defaults to "r".
+            flags (int, optional): Ignored. Defaults to 0.
+            timeout (Optional[float], optional): Ignored. Defaults to None.
+
+        Returns:
+            FakeVolumeGroupContext: A volume group context.
+        """
+        self._check()
+        return FakeVolumeGroupContext(self, name, mode)
+
+    def vg_create(self, name: str) -> FakeVolumeGroupContext:
+        """Create a volume group, which exists once it is written.
+
+        Args:
+            name (str): The name.
+
+        Returns:
+            FakeVolumeGroupContext: A volume group context.
+        """
+        self._check()
+        return FakeVolumeGroupContext(self, name, 'w', create=True)
+
+    def vg_snapshot(self, name: str) -> VolumeGroupSnapshot:
+        """Open a volume group read only and take a snapshot.
+
+        Args:
+            name (str): The name.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        with self.vg_open(name) as vg:
+            return vg.snapshot()
+
+    @property
+    def physical_volumes(self) -> List[FakePhysicalVolume]:
+        """The physical volumes of the host"""
+        self._check()
+        return [
+            FakePhysicalVolume(self.engine, device)
+            for device in list(self.engine.pvs)
+        ]
+
+    def pv_records(self) -> List[PhysicalVolumeRecord]:
+        """The physical volumes of the host with their volume groups"""
+        records: List[PhysicalVolumeRecord] = []
+        for pv in self.physical_volumes:
+            vg = self.engine.vg_of_device(pv.name)
+            records.append(PhysicalVolumeRecord(
+                pv.name,
+                pv.uuid,
+                vg.name if vg else None,
+                vg.uuid if vg else None,
+                pv.size,
+                pv.free,
+                pv.dev_size,
+                pv.mda_count
+            ))
+        return records
+
+    def pv_create(self, name: str, size: int) -> None:
+        """Create a physical volume on a device.
+
+        Args:
+            name (str): The device path.
+            size (int): The size in bytes, or 0 for the whole device.
+        """
+        self._check()
+        if name not in self.engine.devices:
+            raise self.fail(ENOENT, f'Device {name} not found')
+        if name in self.engine.pvs:
+            raise self.fail(EEXIST, f'{name} is already a physical volume')
+        if size:
+            self.engine.devices[name] = min(size, self.engine.devices[name])
+        self.engine.pvs[name] = self.engine.uuid()
+
+    def pv_remove(self, name: str) -> None:
+        """Remove a physical volume from a device.
+
+        Args:
+            name (str): The device path.
+        """
+        self._check()
+        if name not in self.engine.pvs:
+            raise self.fail(ENOENT, f'{name} is not a physical volume')
+        if self.engine.vg_of_device(name) is not None:
+            raise self.fail(EBUSY, f'{name} is in a volume group')
+        del self.engine.pvs[name]
+
+    def config_override(self, value: str) -> None:
+        """Record a configuration override.
+
+        Args:
+            value (str): The override.
+        """
+        self._check()
+        self._config.append(value)
+
+    def reload_config(self) -> None:
+        """Reload the configuration."""
+        self._check()
+
+    def config_find_bool(self, config_path: str, fail: bool) -> bool:
+        """Find a boolean setting, which the fake engine never has.
+
+        Args:
+            config_path (str): The setting path.
+            fail (bool): The value returned when it is not found.
+
+        Returns:
+            bool: The value.
+        """
+        self._check()
+        return fail
+
+
+class FakeLVM:
+    """The context manager for an lvm instance backed by the fake engine"""
+
+    def __init__(self, engine: Optional[FakeEngine] = None) -> None:
+        """The context manager for a fake lvm instance
+
+        Args:
+            engine (Optional[FakeEngine], optional): The engine. Defaults to
+                None, for a new engine with no devices.
+        """
+        self.engine = engine if engine is not None else FakeEngine()
+        self.instance: Optional[FakeLVMInstance] = None
+
+    def __enter__(self) -> FakeLVMInstance:
+        self.instance = FakeLVMInstance(self.engine)
+        return self.instance
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self.instance is not None:
+            self.instance.closed = True
@@ -0,0 +1,280 @@
+"""Metadata change journal"""
+
+from __future__ import annotations
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING
+)
+
+from .exceptions import LVMException
+
+if TYPE_CHECKING:
+    from .context import VolumeGroupContext  # pylint: disable=cyclic-import
+
+
+class Journal:
+    """An append only, rotating log of metadata changes.
+
+    Each mutating call made through a volume group or logical volume opened
+    with the journal is appended as a line of JSON holding the operation, its
+    arguments, the volume group seqno before and after, the duration and the
+    outcome. When the file grows past `max_bytes` it is rotated, keeping
+    `backups` earlier files with the suffixes .1, .2 and so on.
+
+    The file is kept open between records, and each record is flushed as it
+    is written.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            max_bytes: int = 16 * 1024 * 1024,
+            backups: int = 5
+    ) -> None:
+        """An append only, rotating log of metadata changes
+
+        Args:
+            path (str): The path of the journal file.
+            max_bytes (int, optional): The size at which the file is rotated.
+                Defaults to 16MiB.
+            backups (int, optional): The number of rotated files to keep.
+                Defaults to 5.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._fp: Optional[IO[str]] = None
+        self._size = 0
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def _open(self) -> IO[str]:
+        if self._fp is None:
+            self._fp = open(self.path, 'a', buffering=1)
+            self._size = os.fstat(self._fp.fileno()).st_size
+        return self._fp
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append a record to the journal.
+
+        Args:
+            record (Dict[str, Any]): The record.
+        """
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            fp = self._open()
+            if self._size and self._size + len(line) > self.max_bytes:
+                self._close()
+                self._rotate()
+                fp = self._open()
+            fp.write(line)
+            self._size += len(line)
+
+    def _close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def close(self) -> None:
+        """Close the journal file, which is reopened by the next record."""
+        with self._lock:
+            self._close()
+
+    @contextmanager
+    def entry(
+            self,
+            context: VolumeGroupContext,
+            operation: str,
+            args: Tuple[Any, ...],
+            lv_name: Optional[str] = None
+    ) -> Iterator[None]:
+        """Record the call made within the context.
+
+        Args:
+            context (VolumeGroupContext): The volume group context.
+            operation (str): The operation name.
+            args (Tuple[Any, ...]): The arguments.
+            lv_name (Optional[str], optional): The logical volume, for calls on
+                a logical volume. Defaults to None.
+
+        Yields:
+            None: Nothing
+        """
+        # pylint: disable=import-outside-toplevel
+        from .bindings import lvm_vg_get_name, lvm_vg_get_seqno, lvm_vg_get_uuid
+
+        handle = context.handle
+        record: Dict[str, Any] = {
+            'time': time.time(),
+            'vg': context.cached_string(handle, 'name', lvm_vg_get_name),
+            'vg_uuid': context.cached_string(handle, 'uuid', lvm_vg_get_uuid),
+            'op': operation,
+            'lv': lv_name,
+            'args': list(args),
+            'seqno_before': lvm_vg_get_seqno(handle)
+        }
+        start = time.perf_counter()
+        try:
+            yield
+        except LVMException as error:
+            record['ok'] = False
+            record['errno'] = error.errno
+            raise
+        except BaseException:
+            record['ok'] = False
+            record['errno'] = None
+            raise
+        else:
+            record['ok'] = True
+            record['errno'] = None
+        finally:
+            record['duration'] = time.perf_counter() - start
+            record['seqno_after'] = lvm_vg_get_seqno(handle)
+            self.append(record)
+
+
+def read_journal(path: str, backups: int = 5) -> Iterator[Dict[str, Any]]:
+    """Read the records of a journal, oldest first.
+
+    Args:
+        path (str): The path of the journal file.
+        backups (int, optional): The number of rotated files to read.
+            Defaults to 5.
+
+    Yields:
+        Dict[str, Any]: The records.
+    """
+    paths = [f'{path}.{index}' for index in range(backups, 0, -1)] + [path]
+    for filename in paths:
+        if not os.path.exists(filename):
+            continue
+        with open(filename) as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LogicalVolumeState:
+    """The state of a logical volume rebuilt from the journal"""
+
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+        self.tags: Set[str] = set()
+
+
+class VolumeGroupState:
+    """The state of a volume group rebuilt from the journal.
+
+    Only changes recorded in the journal are known, so the state describes
+    what was done through the journal rather than the whole volume group.
+    """
+
+    def __init__(self, name: str, uuid: str) -> None:
+        self.name = name
+        self.uuid = uuid
+        self.seqno = 0
+        self.removed = False
+        self.extent_size: Optional[int] = None
+        self.tags: Set[str] = set()
+        self.devices: Set[str] = set()
+        self.logical_volumes: Dict[str, LogicalVolumeState] = {}
+        self.pending: List[Dict[str, Any]] = []
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        """Apply a successful journal record.
+
+        Args:
+            record (Dict[str, Any]): The record.
+        """
+        operation, args, lv_name = record['op'], record['args'], record['lv']
+        if lv_name is not None:
+            volume = self.logical_volumes.get(lv_name)
+            if operation == 'remove':
+                self.logical_volumes.pop(lv_name, None)
+            elif volume is not None and operation == 'add_tag':
+                volume.tags.add(args[0])
+            elif volume is not None and operation == 'remove_tag':
+                volume.tags.discard(args[0])
+        elif operation == 'create_lv_linear':
+            self.logical_volumes[args[0]] = LogicalVolumeState(args[0], args[1])
+        elif operation == 'create_lv_thin':
+            self.logical_volumes[args[1]] = LogicalVolumeState(args[1], args[2])
+        elif operation == 'add_tag':
+            self.tags.add(args[0])
+        elif operation == 'remove_tag':
+            self.tags.discard(args[0])
+        elif operation == 'extend':
+            self.devices.add(args[0])
+        elif operation == 'reduce':
+            self.devices.discard(args[0])
+        elif operation == 'set_extent_size':
+            self.extent_size = args[0]
+        elif operation == 'remove':
+            self.removed = True
+
+
+def replay(
+        records: Iterable[Dict[str, Any]],
+        seqno: Optional[int] = None
+) -> Dict[str, VolumeGroupState]:
+    """Rebuild the state of the volume groups from journal records.
+
+    Changes to a volume group which only reach the disk when it is written are
+    held back until a successful write is replayed.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): The records, oldest first.
+        seqno (Optional[int], optional): Stop applying the records of a volume
+            group once its seqno would pass this. Defaults to None, to apply
+            every record.
+
+    Returns:
+        Dict[str, VolumeGroupState]: The states by volume group uuid.
+    """
+    states: Dict[str, VolumeGroupState] = {}
+    for record in records:
+        if not record['ok']:
+            continue
+        state = states.get(record['vg_uuid'])
+        if state is None:
+            state = VolumeGroupState(record['vg'], record['vg_uuid'])
+            state.seqno = record['seqno_before']
+            states[record['vg_uuid']] = state
+        if seqno is not None and record['seqno_after'] > seqno:
+            continue
+
+        if record['op'] == 'write':
+            for pending in state.pending:
+                state.apply(pending)
+            state.pending = []
+        elif record['seqno_after'] == record['seqno_before']:
+            # Not yet committed to disk.
+            state.pending.append(record)
+        else:
+            state.apply(record)
+        state.seqno = max(state.seqno, record['seqno_after'])
+
+    return states
@@ -0,0 +1,232 @@
+"""Handle lifecycle tracking"""
+
+from __future__ import annotations
+from ctypes import c_void_p, cast
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from .bindings import lvm_quit, lvm_vg_close
+from .ownership import HandleGuard
+
+_PACKAGE_DIR = os.path.dirname(__file__)
+
+
+class OpenHandle:
+    """A library handle which has not been closed"""
+
+    __slots__ = ('token', 'kind', 'name', 'opened', 'location', 'stack')
+
+    def __init__(
+            self,
+            token: int,
+            kind: str,
+            name: Optional[str],
+            location: Optional[str],
+            stack: Optional[List[str]]
+    ) -> None:
+        self.token = token
+        self.kind = kind
+        self.name = name
+        self.opened = time.monotonic()
+        self.location = location
+        self.stack = stack
+
+    @property
+    def age(self) -> float:
+        """The time in seconds since the handle was opened.
+
+        Returns:
+            float: The age.
+        """
+        return time.monotonic() - self.opened
+
+    def __repr__(self) -> str:
+        return (
+            f'OpenHandle({self.kind!r}, {self.name!r}, age={self.age:.1f},'
+            f' location={self.location!r})'
+        )
+
+
+class HandleTracker:
+    """The register of the lvm and volume group handles which are open.
+
+    Registering a handle only costs a counter and a dictionary insert. The
+    volume group name and the file and line of the caller which opened a
+    handle are only recorded when open sites are captured, which is enabled
+    for debugging by setting the environment variable
+    JETBLACK_LVM2_TRACK_HANDLES. Setting JETBLACK_LVM2_TRACK_STACKS also
+    records the whole stack.
+    """
+
+    def __init__(self) -> None:
+        self.capture_stacks = bool(os.environ.get('JETBLACK_LVM2_TRACK_STACKS'))
+        self.capture_sites = self.capture_stacks or bool(
+            os.environ.get('JETBLACK_LVM2_TRACK_HANDLES'))
+        self._open: Dict[int, OpenHandle] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def opened(self, kind: str, name: Optional[str] = None) -> int:
+        """Register a handle which has been opened.
+
+        When open sites are captured, the location recorded is that of the
+        first caller outside this package.
+
+        Args:
+            kind (str): The kind of handle, for example "vg".
+            name (Optional[str], optional): The name of the object. Defaults
+                to None, for a name which is not known.
+
+        Returns:
+            int: The token used to close the registration.
+        """
+        location: Optional[str] = None
+        stack: Optional[List[str]] = None
+        if self.capture_sites:
+            frame = sys._getframe(1)  # pylint: disable=protected-access
+            while (
+                    frame.f_back is not None and
+                    frame.f_code.co_filename.startswith(_PACKAGE_DIR)
+            ):
+                frame = frame.f_back
+            location = f'{frame.f_code.co_filename}:{frame.f_lineno}'
+            if self.capture_stacks:
+                stack = traceback.format_stack(frame)
+        with self._lock:
+            token = next(self._tokens)
+            self._open[token] = OpenHandle(token, kind, name, location, stack)
+        return token
+
+    def closed(self, token: int) -> None:
+        """Remove the registration of a handle which has been closed.
+
+        Args:
+            token (int): The token returned when it was opened.
+        """
+        with self._lock:
+            self._open.pop(token, None)
+
+    def report(self, kind: Optional[str] = None) -> List[OpenHandle]:
+        """List the open handles, oldest first.
+
+        Args:
+            kind (Optional[str], optional): Only list handles of this kind.
+                Defaults to None, for all handles.
+
+        Returns:
+            List[OpenHandle]: The open handles.
+        """
+        with self._lock:
+            handles = list(self._open.values())
+        return sorted(
+            (handle for handle in handles if kind is None or handle.kind == kind),
+            key=lambda handle: handle.opened
+        )
+
+    def format_report(self, kind: Optional[str] = None) -> str:
+        """Describe the open handles, oldest first.
+
+        Args:
+            kind (Optional[str], optional): Only list handles of this kind.
+                Defaults to None, for all handles.
+
+        Returns:
+            str: The report.
+        """
+        lines: List[str] = []
+        for handle in self.report(kind):
+            line = f'{handle.kind} {handle.name or "?"} open for {handle.age:.1f}s'
+            if handle.location is not None:
+                line += f', opened at {handle.location}'
+            lines.append(line)
+            if handle.stack:
+                lines.extend(line.rstrip() for line in handle.stack)
+        return '\n'.join(lines)
+
+
+tracker = HandleTracker()
+
+# Volume group handles released by finalizers with no guard to queue them on,
+# by the address of the lvm handle they were opened from.
+_unguarded: Dict[int, List[Any]] = {}
+
+
+def _address(handle: Any) -> int:
+    return cast(handle, c_void_p).value or 0
+
+
+def open_handles(kind: Optional[str] = None) -> List[OpenHandle]:
+    """List the lvm and volume group handles which are open, oldest first.
+
+    Args:
+        kind (Optional[str], optional): "lvm" or "vg" to only list handles of
+            that kind. Defaults to None, for all handles.
+
+    Returns:
+        List[OpenHandle]: The open handles.
+    """
+    return tracker.report(kind)
+
+
+def release_leaked_vg(
+        handle: Any,
+        guard: Optional[HandleGuard],
+        lvm_handle: Optional[Any],
+        token: int
+) -> None:
+    """Release a volume group handle whose wrappers were collected unclosed.
+
+    The finalizer may run on any thread, so the handle is queued on the guard
+    and closed by the owner the next time it opens a volume group. If the lvm
+    handle has already been quit the volume group went with it. A handle with
+    no guard is queued against its lvm handle, to be closed the next time that
+    handle opens a volume group, and is left alone if the lvm handle is not
+    known.
+
+    Args:
+        handle (Any): The volume group handle.
+        guard (Optional[HandleGuard]): The guard of the lvm handle.
+        lvm_handle (Optional[Any]): The lvm handle the volume group was
+            opened from.
+        token (int): The tracker token.
+    """
+    tracker.closed(token)
+    if guard is not None:
+        if not guard.closed:
+            guard.leaked.append(handle)
+    elif lvm_handle:
+        _unguarded.setdefault(_address(lvm_handle), []).append(handle)
+
+
+def close_leaked(guard: HandleGuard, lvm_handle: Any) -> None:
+    """Close the volume group handles of an lvm handle queued by finalizers.
+
+    Args:
+        guard (HandleGuard): The guard of the lvm handle, owned by the caller.
+        lvm_handle (Any): The lvm handle.
+    """
+    while guard.leaked:
+        lvm_vg_close(guard.leaked.pop())
+    for handle in _unguarded.pop(_address(lvm_handle), ()):
+        lvm_vg_close(handle)
+
+
+def quit_leaked(handle: Any, token: int) -> None:
+    """Quit an lvm handle whose context was never exited.
+
+    This runs when the guard of the handle is collected, at which point
+    nothing which could use the handle remains.
+
+    Args:
+        handle (Any): The lvm handle.
+        token (int): The tracker token.
+    """
+    tracker.closed(token)
+    # The volume groups go with the handle, whose address may be reused.
+    _unguarded.pop(_address(handle), None)
+    lvm_quit(handle)
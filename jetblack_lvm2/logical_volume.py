@@ -1,6 +1,6 @@
 """Physical Volume"""
 
-from typing import Any, Callable, Optional
+from typing import Any, List, Optional, Union
 
 from .bindings import (
     lvm_lv_get_name,
@@ -12,27 +12,49 @@ from .bindings import (
     lvm_lv_deactivate,
     lvm_vg_remove_lv,
     lvm_lv_get_attr,
-    lvm_lv_get_origin
+    lvm_lv_get_origin,
+    lvm_lv_get_property,
+    lvm_lv_get_tags,
+    lvm_lv_add_tag,
+    lvm_lv_remove_tag
 )
-from .exceptions import LVMException
+from .context import VolumeGroupContext
+from .deadline import supervisor
+from .utils import _dm_list_to_str_list, _intern, _property_value
 
 
 class LogicalVolume:
     """A logical volume"""
 
+    __slots__ = ('_handle', '_context')
+
     def __init__(
             self,
             handle: Any,
-            create_exception: Callable[[], LVMException]
+            context: VolumeGroupContext
     ) -> None:
         """Initialise a logical volume
 
         Args:
             handle (Any): The handle
-            create_exception (Callable[[], LVMException]): An exception factory
+            context (VolumeGroupContext): The owning volume group context
         """
-        self.handle = handle
-        self._create_exception = create_exception
+        self._handle = handle
+        self._context = context
+
+    @property
+    def handle(self) -> Any:
+        """The logical volume handle.
+
+        Raises:
+            LVMClosedError: If the volume group has been closed.
+            LVMOwnershipError: If another thread owns the handle.
+
+        Returns:
+            Any: The handle.
+        """
+        self._context.check()
+        return self._handle
 
     @property
     def name(self) -> str:
@@ -41,7 +63,7 @@ class LogicalVolume:
         Returns:
             str: The logical volume name.
         """
-        return lvm_lv_get_name(self.handle).decode('ascii')
+        return self._context.cached_string(self.handle, 'name', lvm_lv_get_name)
 
     @property
     def uuid(self) -> str:
@@ -50,7 +72,7 @@ class LogicalVolume:
         Returns:
             str: The logical volume uuid.
         """
-        return lvm_lv_get_uuid(self.handle).decode('ascii')
+        return self._context.cached_string(self.handle, 'uuid', lvm_lv_get_uuid)
 
     @property
     def size(self) -> int:
@@ -93,7 +115,7 @@ class LogicalVolume:
         Returns:
             str: The logical volume attributes.
         """
-        return lvm_lv_get_attr(self.handle).decode('ascii')
+        return _intern(lvm_lv_get_attr(self.handle))
 
     @property
     def origin(self) -> Optional[str]:
@@ -105,7 +127,80 @@ class LogicalVolume:
         origin = lvm_lv_get_origin(self.handle)
         return origin.decode('ascii') if origin else None
 
-    def activate(self) -> None:
+    def get_property(self, name: str) -> Optional[Union[str, int]]:
+        """Get the value of a logical volume property.
+
+        The names are those of the "lvs" command, for example "data_percent"
+        or "lv_metadata_size".
+
+        Args:
+            name (str): The property name.
+
+        Returns:
+            Optional[Union[str, int]]: The value, or None if the property is
+                not valid for this logical volume.
+        """
+        value = lvm_lv_get_property(self.handle, name.encode('ascii'))
+        return _property_value(value)
+
+    @property
+    def tags(self) -> List[str]:
+        """The logical volume tags.
+
+        Raises:
+            LVMException: If the tags could not be obtained.
+
+        Returns:
+            List[str]: The tags.
+        """
+        tags = lvm_lv_get_tags(self.handle)
+        if not bool(tags):
+            raise self._context.create_exception()
+        return _dm_list_to_str_list(tags)
+
+    def add_tag(self, tag: str) -> None:
+        """Add a tag to an LV.
+
+        This function requires calling lvm_vg_write() to commit the change to disk.
+        After successfully adding a tag, use lvm_vg_write() to commit the
+        new LV to disk.  Upon failure, retry the operation or release the VG handle
+        with lvm_vg_close().
+
+        Args:
+            tag (str): Tag to add to the LV.
+
+        Raises:
+            LVMException: If the operation failed.
+        """
+        with self._context.journal_entry('add_tag', (tag,), self.handle):
+            retcode = lvm_lv_add_tag(self.handle, tag.encode('ascii'))
+            # The seqno only changes when the volume group is written.
+            self._context.cache.pop('lv_tag_index', None)
+            if retcode != 0:
+                raise self._context.create_exception()
+
+    def remove_tag(self, tag: str) -> None:
+        """Remove a tag from an LV.
+
+        This function requires calling lvm_vg_write() to commit the change to disk.
+        After successfully removing a tag, use lvm_vg_write() to commit the
+        new LV to disk.  Upon failure, retry the operation or release the VG handle
+        with lvm_vg_close().
+
+        Args:
+            tag (str): Tag to remove from the LV.
+
+        Raises:
+            LVMException: If the operation failed.
+        """
+        with self._context.journal_entry('remove_tag', (tag,), self.handle):
+            retcode = lvm_lv_remove_tag(self.handle, tag.encode('ascii'))
+            # The seqno only changes when the volume group is written.
+            self._context.cache.pop('lv_tag_index', None)
+            if retcode != 0:
+                raise self._context.create_exception()
+
+    def activate(self, timeout: Optional[float] = None) -> None:
         """ Activate a logical volume.
 
         This function is the equivalent of the lvm command "lvchange -ay".
@@ -113,22 +208,46 @@ class LogicalVolume:
         NOTE: This function cannot currently handle LVs with an in-progress pvmove or
         lvconvert.
 
+        Args:
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the activation. Defaults to None, for no limit.
+
         Raises:
+            LVMTimeoutError: If the activation did not complete in time. The
+                lvm handle is then quarantined until the call returns.
             LVMException: If the operation was not successful.
         """
-        retcode = lvm_lv_activate(self.handle)
+        handle = self.handle
+        retcode = supervisor.call(
+            'LogicalVolume.activate',
+            self._context.guard,
+            lambda: lvm_lv_activate(handle),
+            timeout
+        )
         if retcode != 0:
-            raise self._create_exception()
+            raise self._context.create_exception()
 
-    def deactivate(self):
+    def deactivate(self, timeout: Optional[float] = None):
         """Deactivate a logical volume.
 
+        Args:
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the deactivation. Defaults to None, for no limit.
+
         Raises:
+            LVMTimeoutError: If the deactivation did not complete in time. The
+                lvm handle is then quarantined until the call returns.
             LVMException: If the operation was not successful.
         """
-        retcode = lvm_lv_deactivate(self.handle)
+        handle = self.handle
+        retcode = supervisor.call(
+            'LogicalVolume.deactivate',
+            self._context.guard,
+            lambda: lvm_lv_deactivate(handle),
+            timeout
+        )
         if retcode != 0:
-            raise self._create_exception()
+            raise self._context.create_exception()
 
     def remove(self):
         """Remove a logical volume from a volume group.
@@ -141,6 +260,8 @@ class LogicalVolume:
         Raises:
             LVMException: If the operation was not successful.
         """
-        retcode = lvm_vg_remove_lv(self.handle)
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('remove', (), self.handle):
+            retcode = lvm_vg_remove_lv(self.handle)
+            if retcode != 0:
+                raise self._context.create_exception()
+        self._context.forget(self.handle)
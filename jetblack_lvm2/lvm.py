@@ -2,11 +2,11 @@
 
 from __future__ import annotations
 from ctypes import cast, c_uint64
-from typing import Any, List, Optional
+import weakref
+from typing import IO, Any, Callable, Iterable, List, Optional, Sequence, Union
 
 from .bindings import (
     lvm_init,
-    lvm_quit,
     lvm_config_reload,
     lvm_config_override,
     lvm_config_find_bool,
@@ -22,17 +22,33 @@ from .bindings import (
     lvm_list_pvs,
     lvm_list_pvs_free,
     lvm_pv_create,
-    lvm_pv_remove,
-    dm_list_empty,
-    dm_list_first,
-    dm_list_next,
-    dm_list_end
+    lvm_pv_remove
 )
 from .types import lvm_pv_list_p
 
-from .exceptions import LVMException
+from .cache import CachedInventory
+from .coalesce import CoalescedReads
+from .deadline import supervisor
+from .events import EventStream, NetlinkSource, StreamSource
+from .columns import LogicalVolumeColumns
+from .exceptions import (
+    LVMClosedError,
+    LVMException,
+    LVMOwnershipError,
+    exception_for
+)
+from .journal import Journal
+from .lifecycle import close_leaked, quit_leaked, tracker
+from .ownership import HandleGuard
 from .physical_volume import PhysicalVolume
-from .utils import _dm_list_to_str_list
+from .records import PhysicalVolumeRecord
+from .pvmove import EvacuationProgress, PVEvacuation
+from .profiles import ConfigProfile, apply_profile, combine_profiles
+from .profiling import start_from_environment
+from .resolver import DeviceResolver
+from .snapshot import VolumeGroupSnapshot
+from .stream import BinaryRecordWriter, RecordWriter, write_inventory
+from .utils import _dm_list_to_str_list, _dm_list_iter
 from .volume_group import (
     VolumeGroupContextManager,
     VolumeGroupCreate,
@@ -43,13 +59,42 @@ from .volume_group import (
 class LVMInstance:
     """An lvm instance"""
 
-    def __init__(self, handle: Any) -> None:
+    def __init__(
+            self,
+            handle: Any,
+            journal: Optional[Journal] = None,
+            guard: Optional[HandleGuard] = None
+    ) -> None:
         """An lvm instance.
 
         Args:
             handle (Any): The handle
+            journal (Optional[Journal], optional): The journal recording
+                metadata changes made through volume groups opened by this
+                instance. Defaults to None.
+            guard (Optional[HandleGuard], optional): The guard shared by the
+                handle and everything opened from it. Defaults to None, for a
+                guard owned by the calling thread.
+        """
+        self._handle = handle
+        self.journal = journal
+        self.guard = guard if guard is not None else HandleGuard('lvm')
+        self._resolver: Optional[DeviceResolver] = None
+        self._coalesced: Optional[CoalescedReads] = None
+
+    @property
+    def handle(self) -> Any:
+        """The lvm handle.
+
+        Raises:
+            LVMClosedError: If lvm_quit has been called on the handle.
+            LVMOwnershipError: If another thread owns the handle.
+
+        Returns:
+            Any: The handle.
         """
-        self.handle = handle
+        self.guard.check()
+        return self._handle
 
     def list_vg_names(self) -> List[str]:
         """Return the list of volume group names.
@@ -69,7 +114,7 @@ class LVMInstance:
         """
         vg_names = lvm_list_vg_names(self.handle)
         if not bool(vg_names):
-            raise LVMException(self.errno, self.errmsg)
+            raise self._create_exception()
         return _dm_list_to_str_list(vg_names)
 
     def list_vg_uuids(self) -> List[str]:
@@ -90,7 +135,7 @@ class LVMInstance:
         """
         vg_uuids = lvm_list_vg_uuids(self.handle)
         if not bool(vg_uuids):
-            raise LVMException(self.errno, self.errmsg)
+            raise self._create_exception()
         return _dm_list_to_str_list(vg_uuids)
 
     @property
@@ -121,7 +166,14 @@ class LVMInstance:
         return msg.decode('iso-8859-1')
 
     def _create_exception(self) -> LVMException:
-        return LVMException(self.errno, self.errmsg)
+        if self.guard.closed:
+            # The error went with the handle.
+            return LVMClosedError(self.guard.name)
+        # The error is read from the raw handle, as the checks of the guard
+        # would replace it with an ownership or quarantine error. The message
+        # is decoded only if it is used.
+        handle = self._handle
+        return exception_for(lvm_errno(handle), lvm_errmsg(handle) or b'')
 
     @property
     def version(self) -> str:
@@ -169,28 +221,198 @@ class LVMInstance:
         name = lvm_vgname_from_device(self.handle, device.encode('ascii'))
         return name.decode('ascii') if name else None
 
-    def scan(self) -> None:
+    @property
+    def resolver(self) -> DeviceResolver:
+        """A cache resolving devices and PV uuids to volume group names.
+
+        The cache is filled in a single pass over the physical volumes and is
+        invalidated by scan, pv_create and pv_remove.
+
+        Returns:
+            DeviceResolver: The device resolver.
+        """
+        if self._resolver is None:
+            self._resolver = DeviceResolver(self)
+        return self._resolver
+
+    def _invalidate_resolver(self) -> None:
+        if self._resolver is not None:
+            self._resolver.invalidate()
+
+    def scan(self, timeout: Optional[float] = None) -> None:
         """Scan all devices on the system for VGs and LVM metadata.
 
+        Args:
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the scan. Defaults to None, for no limit.
+
         Raises:
+            LVMTimeoutError: If the scan did not complete in time. The handle
+                is then quarantined until the scan returns.
             LVMException: If the scan failed.
         """
-        result = lvm_scan(self.handle)
+        handle = self.handle
+        result = supervisor.call(
+            'LVMInstance.scan',
+            self.guard,
+            lambda: lvm_scan(handle),
+            timeout
+        )
+        self._invalidate_resolver()
         if result != 0:
-            raise LVMException(self.errno, self.errmsg)
+            raise self._create_exception()
 
-    def vg_open(self, name: str, mode: str = "r", flags: int = 0) -> VolumeGroupContextManager:
+    def vg_open(
+            self,
+            name: str,
+            mode: str = "r",
+            flags: int = 0,
+            timeout: Optional[float] = None
+    ) -> VolumeGroupContextManager:
         """Open a volume group
 
         Args:
             name (str): The name
             mode (str, optional): The mode. Defaults to "r".
             flags (int, optional): The flags. Defaults to 0.
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the volume group to open. Defaults to None, for no limit.
 
         Returns:
             VolumeGroupContextManager: A volume group context.
         """
-        return VolumeGroupOpen(self.handle, self._create_exception, name, mode, flags)
+        handle = self.handle
+        close_leaked(self.guard, handle)
+        return VolumeGroupOpen(
+            handle,
+            self._create_exception,
+            name,
+            mode,
+            flags,
+            timeout,
+            self.journal,
+            self.guard
+        )
+
+    def vg_snapshot(self, name: str) -> VolumeGroupSnapshot:
+        """Open a volume group read only and take a snapshot.
+
+        Args:
+            name (str): The name
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        with self.vg_open(name) as vg:
+            return vg.snapshot()
+
+    @property
+    def coalesced(self) -> CoalescedReads:
+        """Read methods which coalesce concurrent identical calls.
+
+        Calls from several threads need a handle opened without thread
+        affinity.
+
+        Returns:
+            CoalescedReads: The coalesced read methods.
+        """
+        if self._coalesced is None:
+            self._coalesced = CoalescedReads(self)
+        return self._coalesced
+
+    def cached_inventory(
+            self,
+            path: str,
+            background: bool = True,
+            config_path: Optional[str] = None
+    ) -> CachedInventory:
+        """Serve volume group snapshots from a persistent cache.
+
+        The snapshots saved by the last run are available at once, while the
+        volume groups whose seqno has changed are read again.
+
+        Args:
+            path (str): The path of the cache file.
+            background (bool, optional): If True refresh the cache on a
+                background thread with an lvm handle of its own. If False
+                the cache is not refreshed until refresh or start is called.
+                Defaults to True.
+            config_path (Optional[str], optional): The path to the lvm config
+                of the background handle. Defaults to None.
+
+        Returns:
+            CachedInventory: The cached inventory.
+        """
+        inventory = CachedInventory(self, path, config_path)
+        if background:
+            inventory.start()
+        return inventory
+
+    def event_stream(
+            self,
+            source: Optional[Union[NetlinkSource, StreamSource]] = None
+    ) -> EventStream:
+        """Publish the changes to logical volumes and physical volumes.
+
+        The stream is started by entering it, calling start, or iterating
+        over it asynchronously.
+
+        Args:
+            source (Optional[Union[NetlinkSource, StreamSource]], optional):
+                The uevent source. Defaults to None, for the udev netlink
+                socket.
+
+        Returns:
+            EventStream: The event stream.
+        """
+        return EventStream(self, source)
+
+    def evacuate_pv(
+            self,
+            vg_name: str,
+            device: str,
+            state_path: str,
+            destinations: Sequence[str] = (),
+            chunk_extents: int = 1024,
+            bandwidth: Optional[float] = None,
+            on_progress: Optional[Callable[[EvacuationProgress], None]] = None
+    ) -> EvacuationProgress:
+        """Move every extent off a physical volume and remove it from its
+        volume group.
+
+        The extents are moved in chunks with pvmove. The position is saved in
+        the state file, so calling this again after a crash resumes the
+        evacuation.
+
+        Args:
+            vg_name (str): The volume group name.
+            device (str): The physical volume to evacuate.
+            state_path (str): The file holding the position.
+            destinations (Sequence[str], optional): The physical volumes to
+                move to. Defaults to (), for any with free space.
+            chunk_extents (int, optional): The extents moved by each pvmove.
+                Defaults to 1024.
+            bandwidth (Optional[float], optional): The most bytes per second to
+                move. Defaults to None, for no limit.
+            on_progress (Optional[Callable[[EvacuationProgress], None]],
+                optional): Called after each chunk. Defaults to None.
+
+        Raises:
+            LVMException: If a move or the reduce failed.
+
+        Returns:
+            EvacuationProgress: The final progress.
+        """
+        return PVEvacuation(
+            self,
+            vg_name,
+            device,
+            state_path,
+            destinations=destinations,
+            chunk_extents=chunk_extents,
+            bandwidth=bandwidth,
+            on_progress=on_progress
+        ).run()
 
     def vg_create(self, name: str) -> VolumeGroupContextManager:
         """Create a volume group
@@ -201,7 +423,15 @@ class LVMInstance:
         Returns:
             VolumeGroupContextManager: The volume group context
         """
-        return VolumeGroupCreate(self.handle, self._create_exception, name)
+        handle = self.handle
+        close_leaked(self.guard, handle)
+        return VolumeGroupCreate(
+            handle,
+            self._create_exception,
+            name,
+            self.journal,
+            self.guard
+        )
 
     def vg_name_validate(self, name: str) -> bool:
         """Validate a volume group name
@@ -224,21 +454,71 @@ class LVMInstance:
         """
         pv_list: List[PhysicalVolume] = []
         handles = lvm_list_pvs(self.handle)
-        if not dm_list_empty(handles):
-            handle = dm_list_first(handles)
-            while handle:
+        try:
+            for handle in _dm_list_iter(handles):
                 ptr = cast(handle, lvm_pv_list_p)
                 physical_volume = PhysicalVolume(ptr.contents.pv)
                 pv_list.append(physical_volume)
-                if dm_list_end(handles, handle):
-                    # end of linked list
-                    break
-                handle = dm_list_next(handles, handle)
-
-        lvm_list_pvs_free(handles)
+        finally:
+            lvm_list_pvs_free(handles)
 
         return pv_list
 
+    def pv_records(self) -> List[PhysicalVolumeRecord]:
+        """List the physical volumes of the host with their volume groups.
+
+        The records are read in a single pass over the physical volumes, and
+        do not refer to the library after the list has been freed.
+
+        Raises:
+            LVMException: If the physical volumes could not be listed.
+
+        Returns:
+            List[PhysicalVolumeRecord]: The physical volume records.
+        """
+        records: List[PhysicalVolumeRecord] = []
+        handles = lvm_list_pvs(self.handle)
+        if not bool(handles):
+            raise self._create_exception()
+        try:
+            for handle in _dm_list_iter(handles):
+                ptr = cast(handle, lvm_pv_list_p)
+                records.append(PhysicalVolumeRecord.from_handle(ptr.contents.pv))
+        finally:
+            lvm_list_pvs_free(handles)
+
+        return records
+
+    def lv_columns(self) -> LogicalVolumeColumns:
+        """Export the logical volumes of every volume group as columns.
+
+        Returns:
+            LogicalVolumeColumns: The columns.
+        """
+        columns = LogicalVolumeColumns()
+        for vg_name in self.list_vg_names():
+            with self.vg_open(vg_name) as vg:
+                vg.lv_columns(columns)
+        return columns
+
+    def write_inventory(self, fp: IO, binary: bool = False) -> int:
+        """Stream the inventory of the host to a file.
+
+        Records are written as each volume group is walked, and the file is
+        flushed after each volume group.
+
+        Args:
+            fp (IO): A text file for NDJSON, or a binary file for length
+                prefixed records.
+            binary (bool, optional): If True write length prefixed binary
+                records. Defaults to False.
+
+        Returns:
+            int: The number of records written.
+        """
+        writer = BinaryRecordWriter(fp) if binary else RecordWriter(fp)
+        return write_inventory(self, writer)
+
     def reload_config(self) -> None:
         """Reload the original configuration from the system directory.
 
@@ -293,6 +573,7 @@ class LVMInstance:
         """
         retcode = lvm_pv_create(
             self.handle, name.encode('ascii'), c_uint64(size))
+        self._invalidate_resolver()
         if retcode != 0:
             raise self._create_exception()
 
@@ -306,6 +587,7 @@ class LVMInstance:
             LVMException: If the physical volume could not be created
         """
         retcode = lvm_pv_remove(self.handle, name.encode('ascii'))
+        self._invalidate_resolver()
         if retcode != 0:
             raise self._create_exception()
 
@@ -313,20 +595,76 @@ class LVMInstance:
 class LVM:
     """The lvm context manager"""
 
-    def __init__(self, path: Optional[str] = None) -> None:
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            profiles: Iterable[Union[str, ConfigProfile]] = (),
+            journal: Optional[Journal] = None,
+            thread_affinity: bool = True
+    ) -> None:
         """Create an lvm context
 
         Args:
             path (Optional[str], optional): The path to the config. Defaults to None.
+            profiles (Iterable[Union[str, ConfigProfile]], optional): Config
+                profiles, or the names of registered profiles, to apply to the
+                handle. Defaults to ().
+            journal (Optional[Journal], optional): The journal recording
+                metadata changes. Defaults to None.
+            thread_affinity (bool, optional): If True the handles may only be
+                used by the thread which entered the context. If False any
+                thread may use them, and threads sharing them must enter the
+                guard of the handle. Defaults to True.
+
+        Raises:
+            ValueError: If a profile name is not registered.
         """
         self.path = path
+        self.profile = combine_profiles(profiles)
+        self.journal = journal
+        self.thread_affinity = thread_affinity
         self.handle: Optional[Any] = None
+        self.guard: Optional[HandleGuard] = None
+        self._finalizer: Optional[weakref.finalize] = None
 
     def __enter__(self) -> LVMInstance:
+        start_from_environment()
         bytes_path = self.path.encode('ascii') if self.path else None
         self.handle = lvm_init(bytes_path)
-        return LVMInstance(self.handle)
+        self.guard = HandleGuard('lvm', self.thread_affinity)
+        # If the context is never exited the handle is quit once nothing can
+        # use it, which is when the guard shared by its wrappers is collected.
+        self._finalizer = weakref.finalize(
+            self.guard,
+            quit_leaked,
+            self.handle,
+            tracker.opened('lvm', self.path or 'default')
+        )
+        instance = LVMInstance(self.handle, self.journal, self.guard)
+        if self.profile is not None:
+            try:
+                apply_profile(instance, self.profile)
+            except LVMException:
+                self._quit()
+                raise
+        return instance
+
+    def _quit(self) -> None:
+        if self.guard is not None:
+            self.guard.close()
+            self.guard.leaked.clear()
+        if self._finalizer is not None:
+            # Quit now rather than when the guard is collected.
+            self._finalizer()
+            self._finalizer = None
+        self.handle = None
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         if self.handle:
-            lvm_quit(self.handle)
+            guard = self.guard
+            owned = guard is None or guard.is_owner()
+            # Quit from whichever thread exits, so the handle is never leaked,
+            # and only then report the use from another thread.
+            self._quit()
+            if not owned and exc_type is None:
+                raise LVMOwnershipError(guard.name, guard.owner)
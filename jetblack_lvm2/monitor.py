@@ -0,0 +1,129 @@
+"""Stale tolerant monitoring"""
+
+from contextlib import contextmanager
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from .exceptions import LVMException
+from .lvm import LVM, LVMInstance
+from .profiles import MONITORING, apply_profile
+from .snapshot import VolumeGroupSnapshot
+
+
+class MonitoredSnapshot(NamedTuple):
+    """A volume group snapshot tagged with when it was read"""
+    snapshot: VolumeGroupSnapshot
+    taken: float
+    is_stale: bool
+
+    @property
+    def seqno(self) -> int:
+        """The metadata sequence number of the snapshot.
+
+        Returns:
+            int: The sequence number.
+        """
+        return self.snapshot.seqno
+
+    @property
+    def age(self) -> float:
+        """The age of the snapshot in seconds.
+
+        Returns:
+            float: The age.
+        """
+        return time.monotonic() - self.taken
+
+
+class StaleOkMonitor:
+    """Read volume groups without blocking behind writers.
+
+    The lvm handle is configured to read without locking, so it should be a
+    handle dedicated to monitoring. The last snapshot read successfully for
+    each volume group is kept, and is returned marked as stale when a read
+    fails, for example because a write is rewriting the metadata.
+    """
+
+    def __init__(self, lvm: LVMInstance, max_age: float = 0.0) -> None:
+        """Read volume groups without blocking behind writers
+
+        Args:
+            lvm (LVMInstance): A dedicated lvm instance.
+            max_age (float, optional): The age in seconds under which a cached
+                snapshot is returned without reading. Defaults to 0.0.
+
+        Raises:
+            LVMException: If the monitoring configuration could not be applied.
+        """
+        self.lvm = lvm
+        self.max_age = max_age
+        self._snapshots: Dict[str, MonitoredSnapshot] = {}
+        self._lock = threading.Lock()
+        apply_profile(lvm, MONITORING)
+
+    def vg_snapshot(self, name: str) -> MonitoredSnapshot:
+        """Get a snapshot of a volume group.
+
+        Args:
+            name (str): The volume group name.
+
+        Raises:
+            LVMException: If the volume group could not be read and there is
+                no earlier snapshot.
+
+        Returns:
+            MonitoredSnapshot: The snapshot with its seqno and age.
+        """
+        with self._lock:
+            cached = self._snapshots.get(name)
+            if cached is not None and cached.age < self.max_age:
+                return cached
+
+            try:
+                with self.lvm.guard:
+                    snapshot = self.lvm.vg_snapshot(name)
+            except LVMException:
+                if cached is None:
+                    raise
+                return cached._replace(is_stale=True)
+
+            if cached is not None and snapshot.seqno < cached.seqno:
+                # A lockless read raced a writer and saw older metadata.
+                return cached._replace(is_stale=True)
+
+            monitored = MonitoredSnapshot(snapshot, time.monotonic(), False)
+            self._snapshots[name] = monitored
+            return monitored
+
+    def snapshots(self) -> Dict[str, MonitoredSnapshot]:
+        """Get a snapshot of every volume group.
+
+        Returns:
+            Dict[str, MonitoredSnapshot]: The snapshots by volume group name.
+        """
+        try:
+            with self.lvm.guard:
+                names = self.lvm.list_vg_names()
+        except LVMException:
+            names = list(self._snapshots)
+        return {name: self.vg_snapshot(name) for name in names}
+
+
+@contextmanager
+def monitoring(
+        path: Optional[str] = None,
+        max_age: float = 0.0
+) -> Iterator[StaleOkMonitor]:
+    """Open a dedicated lvm handle for stale tolerant monitoring.
+
+    Args:
+        path (Optional[str], optional): The path to the config. Defaults to None.
+        max_age (float, optional): The age in seconds under which a cached
+            snapshot is returned without reading. Defaults to 0.0.
+
+    Yields:
+        StaleOkMonitor: The monitor.
+    """
+    with LVM(path) as lvm:
+        yield StaleOkMonitor(lvm, max_age)
@@ -0,0 +1,90 @@
+"""Handle ownership"""
+
+from __future__ import annotations
+import threading
+from typing import Any, List, Optional
+
+from .exceptions import LVMClosedError, LVMOwnershipError, LVMQuarantinedError
+
+
+class HandleGuard:
+    """The owner of an lvm handle and the handles taken from it.
+
+    The library is not thread safe, and the volume group, logical volume and
+    physical volume handles all share the state of the lvm handle. A guard is
+    shared by an lvm instance and everything opened from it. Every use of a
+    handle checks the guard, which costs a flag test and a thread id
+    comparison.
+
+    By default the handles have thread affinity, and may only be used by the
+    thread that created the guard. Ownership is never passed to another
+    thread, so work for the handle from other threads must be handed to the
+    owner. Without thread affinity any thread may use the handles, and threads
+    which share them must serialise their calls by entering the guard.
+
+    While a call which ran past its deadline is still running in the library
+    the handles are quarantined, and every use of them fails.
+    """
+
+    __slots__ = (
+        'name', 'owner', 'closed', 'quarantined', 'leaked', '_lock',
+        '__weakref__'
+    )
+
+    def __init__(self, name: str, thread_affinity: bool = True) -> None:
+        """The owner of an lvm handle
+
+        Args:
+            name (str): The name used in errors.
+            thread_affinity (bool, optional): If True only the thread creating
+                the guard may use the handles. Defaults to True.
+        """
+        self.name = name
+        self.owner: Optional[int] = (
+            threading.get_ident() if thread_affinity else None
+        )
+        self.closed = False
+        # The number of timed out calls still running in the library.
+        self.quarantined = 0
+        # Volume group handles released by finalizers, for the owner to close.
+        self.leaked: List[Any] = []
+        self._lock = threading.RLock()
+
+    def is_owner(self) -> bool:
+        """Test if the current thread may use the handles.
+
+        Returns:
+            bool: True if there is no thread affinity or the current thread
+                owns the handles.
+        """
+        owner = self.owner
+        return owner is None or owner == threading.get_ident()
+
+    def check(self) -> None:
+        """Check the handles may be used by the current thread.
+
+        Raises:
+            LVMClosedError: If the handle has been closed.
+            LVMQuarantinedError: If a timed out call is still running.
+            LVMOwnershipError: If another thread owns the handle.
+        """
+        if self.closed:
+            raise LVMClosedError(self.name)
+        if self.quarantined:
+            raise LVMQuarantinedError(self.name)
+        owner = self.owner
+        if owner is not None and owner != threading.get_ident():
+            raise LVMOwnershipError(self.name, owner)
+
+    def close(self) -> None:
+        """Mark the handle as closed"""
+        self.closed = True
+
+    def __enter__(self) -> HandleGuard:
+        if not self.is_owner():
+            raise LVMOwnershipError(self.name, self.owner)
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._lock.release()
@@ -1,6 +1,7 @@
 """Physical Volume"""
 
-from typing import Any
+from __future__ import annotations
+from typing import Any, Optional, Union, TYPE_CHECKING
 
 from .bindings import (
     lvm_pv_get_name,
@@ -8,20 +9,51 @@ from .bindings import (
     lvm_pv_get_mda_count,
     lvm_pv_get_dev_size,
     lvm_pv_get_size,
-    lvm_pv_get_free
+    lvm_pv_get_free,
+    lvm_pv_get_property
 )
+from .utils import _intern, _property_value
+
+if TYPE_CHECKING:
+    from .context import VolumeGroupContext  # pylint: disable=cyclic-import
 
 
 class PhysicalVolume:
     """A physical volume"""
 
-    def __init__(self, handle: Any) -> None:
+    __slots__ = ('_handle', '_uuid', '_context')
+
+    def __init__(
+            self,
+            handle: Any,
+            context: Optional[VolumeGroupContext] = None
+    ) -> None:
         """A physical volume
 
         Args:
             handle (Any): The handle
+            context (Optional[VolumeGroupContext], optional): The owning volume
+                group context, checked before the handle is used. Defaults to
+                None.
+        """
+        self._handle = handle
+        self._uuid: Optional[str] = None
+        self._context = context
+
+    @property
+    def handle(self) -> Any:
+        """The physical volume handle.
+
+        Raises:
+            LVMClosedError: If the volume group has been closed.
+            LVMOwnershipError: If another thread owns the handle.
+
+        Returns:
+            Any: The handle.
         """
-        self.handle = handle
+        if self._context is not None:
+            self._context.check()
+        return self._handle
 
     @property
     def name(self) -> str:
@@ -30,8 +62,7 @@ class PhysicalVolume:
         Returns:
             str: The name
         """
-        name: bytes = lvm_pv_get_name(self.handle)
-        return name.decode('ascii')
+        return _intern(lvm_pv_get_name(self.handle))
 
     @property
     def uuid(self) -> str:
@@ -40,8 +71,9 @@ class PhysicalVolume:
         Returns:
             str: The uuid
         """
-        uuid: bytes = lvm_pv_get_uuid(self.handle)
-        return uuid.decode('ascii')
+        if self._uuid is None:
+            self._uuid = lvm_pv_get_uuid(self.handle).decode('ascii')
+        return self._uuid
 
     @property
     def mda_count(self) -> int:
@@ -79,3 +111,19 @@ class PhysicalVolume:
             int: Free size in bytes.
         """
         return lvm_pv_get_free(self.handle)
+
+    def get_property(self, name: str) -> Optional[Union[str, int]]:
+        """Get the value of a physical volume property.
+
+        The names are those of the "pvs" command, for example "vg_name" or
+        "pv_mda_free".
+
+        Args:
+            name (str): The property name.
+
+        Returns:
+            Optional[Union[str, int]]: The value, or None if the property is
+                not valid for this physical volume.
+        """
+        value = lvm_pv_get_property(self.handle, name.encode('ascii'))
+        return _property_value(value)
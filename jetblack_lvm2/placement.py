@@ -0,0 +1,326 @@
+"""Physical volume placement policies"""
+
+from __future__ import annotations
+from abc import ABCMeta, abstractmethod
+from errno import ENOENT, ENOSPC
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    Tuple
+)
+
+from .exceptions import LVMNoSpaceError, LVMNotFoundError
+
+
+class Capacity(NamedTuple):
+    """The size and free space of a physical volume, in extents"""
+    name: str
+    extents: int
+    free_extents: int
+
+    @property
+    def utilisation(self) -> float:
+        """The fraction of the physical volume which is allocated.
+
+        Returns:
+            float: The utilisation from 0 to 1.
+        """
+        if self.extents == 0:
+            return 1.0
+        return 1 - self.free_extents / self.extents
+
+
+class Placement(NamedTuple):
+    """The planned allocation of a logical volume"""
+    extent_size: int
+    allocations: Tuple[Tuple[str, int], ...]
+
+    @property
+    def devices(self) -> List[str]:
+        """The physical volumes used by the placement.
+
+        Returns:
+            List[str]: The physical volume names.
+        """
+        return [name for name, _ in self.allocations]
+
+    @property
+    def extent_count(self) -> int:
+        """The total number of extents allocated.
+
+        Returns:
+            int: The number of extents.
+        """
+        return sum(extents for _, extents in self.allocations)
+
+    def lvcreate_args(self, vg_name: str, lv_name: str) -> List[str]:
+        """The lvcreate command which allocates the logical volume on the
+        planned devices.
+
+        Args:
+            vg_name (str): The volume group name.
+            lv_name (str): The logical volume name.
+
+        Returns:
+            List[str]: The command line.
+        """
+        return [
+            'lvcreate',
+            '--name', lv_name,
+            '--extents', str(self.extent_count),
+            vg_name,
+            *self.devices
+        ]
+
+
+def capacities(
+        physical_volumes: Iterable,
+        extent_size: int
+) -> List[Capacity]:
+    """Read the capacity of physical volumes.
+
+    Args:
+        physical_volumes (Iterable): Objects with the name, size and free of a
+            physical volume, such as those of
+            VolumeGroupInstance.physical_volumes or a snapshot.
+        extent_size (int): The extent size of the volume group in bytes.
+
+    Returns:
+        List[Capacity]: The capacities.
+    """
+    return [
+        Capacity(pv.name, pv.size // extent_size, pv.free // extent_size)
+        for pv in physical_volumes
+    ]
+
+
+def used_extents(
+        before: Sequence[Capacity],
+        after: Sequence[Capacity]
+) -> Dict[str, int]:
+    """Find the extents allocated on each physical volume between two reads.
+
+    Args:
+        before (Sequence[Capacity]): The capacities before the allocation.
+        after (Sequence[Capacity]): The capacities after the allocation.
+
+    Returns:
+        Dict[str, int]: The extents allocated by physical volume name.
+    """
+    free_before = {pv.name: pv.free_extents for pv in before}
+    return {
+        pv.name: free_before[pv.name] - pv.free_extents
+        for pv in after
+        if pv.name in free_before and free_before[pv.name] > pv.free_extents
+    }
+
+
+def actual_placement(
+        before: Sequence[Capacity],
+        after: Sequence[Capacity],
+        extent_size: int
+) -> Placement:
+    """Find where a logical volume was allocated from two reads.
+
+    Args:
+        before (Sequence[Capacity]): The capacities before the allocation.
+        after (Sequence[Capacity]): The capacities after the allocation.
+        extent_size (int): The extent size of the volume group in bytes.
+
+    Returns:
+        Placement: The extents allocated on each physical volume.
+    """
+    return Placement(extent_size, tuple(used_extents(before, after).items()))
+
+
+class PlacedVolume(NamedTuple):
+    """A logical volume created by a placement policy"""
+    volume: Any
+    planned: Placement
+    actual: Placement
+
+    @property
+    def as_planned(self) -> bool:
+        """True if the library allocated the planned extents on each physical
+        volume.
+
+        Returns:
+            bool: True if the actual placement is the planned placement.
+        """
+        return sorted(self.planned.allocations) == sorted(self.actual.allocations)
+
+
+class PlacementPolicy(metaclass=ABCMeta):
+    """A policy choosing the physical volumes for a new logical volume"""
+
+    # True if allocations outside the planned devices are refused.
+    strict = False
+
+    @abstractmethod
+    def allocate(
+            self,
+            candidates: Sequence[Capacity],
+            extent_count: int
+    ) -> List[Tuple[str, int]]:
+        """Choose the extents to allocate from each candidate.
+
+        Args:
+            candidates (Sequence[Capacity]): The physical volumes with free
+                space.
+            extent_count (int): The number of extents to allocate.
+
+        Returns:
+            List[Tuple[str, int]]: The extents by physical volume name. The
+                total may be short if there is not enough space.
+        """
+
+    def candidates(self, pvs: Sequence[Capacity]) -> List[Capacity]:
+        """Filter the physical volumes the policy may allocate from.
+
+        Args:
+            pvs (Sequence[Capacity]): The physical volumes of the group.
+
+        Returns:
+            List[Capacity]: The candidates.
+        """
+        return [pv for pv in pvs if pv.free_extents > 0]
+
+    def plan(
+            self,
+            pvs: Sequence[Capacity],
+            size: int,
+            extent_size: int
+    ) -> Placement:
+        """Plan the placement of a logical volume.
+
+        Args:
+            pvs (Sequence[Capacity]): The physical volumes of the group.
+            size (int): The size of the logical volume in bytes.
+            extent_size (int): The extent size of the volume group in bytes.
+
+        Raises:
+            LVMNoSpaceError: If the candidates do not have enough free space.
+
+        Returns:
+            Placement: The placement.
+        """
+        extent_count = -(-size // extent_size)
+        allocations = [
+            (name, extents)
+            for name, extents in self.allocate(self.candidates(pvs), extent_count)
+            if extents > 0
+        ]
+        allocated = sum(extents for _, extents in allocations)
+        if allocated < extent_count:
+            raise LVMNoSpaceError(
+                ENOSPC,
+                f'{type(self).__name__} found {allocated} of'
+                f' {extent_count} extents'
+            )
+        return Placement(extent_size, tuple(allocations))
+
+
+class LeastUtilised(PlacementPolicy):
+    """Fill the least utilised physical volumes first"""
+
+    def allocate(
+            self,
+            candidates: Sequence[Capacity],
+            extent_count: int
+    ) -> List[Tuple[str, int]]:
+        allocations: List[Tuple[str, int]] = []
+        remaining = extent_count
+        ordered = sorted(
+            candidates,
+            key=lambda pv: (pv.utilisation, -pv.free_extents)
+        )
+        for pv in ordered:
+            if remaining == 0:
+                break
+            extents = min(pv.free_extents, remaining)
+            allocations.append((pv.name, extents))
+            remaining -= extents
+        return allocations
+
+
+class Spread(PlacementPolicy):
+    """Spread the extents evenly over the physical volumes.
+
+    Physical volumes without room for an even share give what they have, and
+    the rest is shared among the others.
+    """
+
+    def __init__(self, max_devices: int = 0) -> None:
+        """Spread the extents evenly over the physical volumes
+
+        Args:
+            max_devices (int, optional): The most physical volumes to spread
+                over, choosing those with the most free space. Defaults to 0,
+                for all of them.
+        """
+        self.max_devices = max_devices
+
+    def allocate(
+            self,
+            candidates: Sequence[Capacity],
+            extent_count: int
+    ) -> List[Tuple[str, int]]:
+        chosen = sorted(candidates, key=lambda pv: -pv.free_extents)
+        if self.max_devices:
+            chosen = chosen[:self.max_devices]
+        shares: Dict[str, int] = {}
+        remaining = extent_count
+        # Smallest first, so the shortfall of a small volume moves onto the
+        # larger ones.
+        for index, pv in enumerate(reversed(chosen)):
+            share = -(-remaining // (len(chosen) - index))
+            shares[pv.name] = min(pv.free_extents, share)
+            remaining -= shares[pv.name]
+        return [(pv.name, shares[pv.name]) for pv in chosen]
+
+
+class Pinned(PlacementPolicy):
+    """Only allocate from a list of physical volumes.
+
+    A pinned placement is strict: if the library allocates on any other
+    physical volume the logical volume is removed again.
+    """
+
+    strict = True
+
+    def __init__(
+            self,
+            devices: Iterable[str],
+            policy: PlacementPolicy = LeastUtilised()
+    ) -> None:
+        """Only allocate from a list of physical volumes
+
+        Args:
+            devices (Iterable[str]): The physical volume names.
+            policy (PlacementPolicy, optional): The policy used within the
+                pinned devices. Defaults to LeastUtilised().
+        """
+        self.devices = list(devices)
+        self.policy = policy
+
+    def candidates(self, pvs: Sequence[Capacity]) -> List[Capacity]:
+        by_name: Mapping[str, Capacity] = {pv.name: pv for pv in pvs}
+        missing = [name for name in self.devices if name not in by_name]
+        if missing:
+            raise LVMNotFoundError(
+                ENOENT,
+                f'Pinned devices not in the volume group: {", ".join(missing)}'
+            )
+        return self.policy.candidates([by_name[name] for name in self.devices])
+
+    def allocate(
+            self,
+            candidates: Sequence[Capacity],
+            extent_count: int
+    ) -> List[Tuple[str, int]]:
+        return self.policy.allocate(candidates, extent_count)
@@ -0,0 +1,279 @@
+"""Predicates over the properties of a handle
+
+The predicates only call the getters of their fields, so they can be built
+and tested without the library.
+"""
+
+from __future__ import annotations
+from abc import ABCMeta, abstractmethod
+import operator
+from typing import Any, Callable, Dict, FrozenSet, List, Union
+
+KiB = 1024
+MiB = 1024 * KiB
+GiB = 1024 * MiB
+TiB = 1024 * GiB
+
+# The relative cost of reading a value, used to order the checks.
+_COST_INTEGER = 1
+_COST_STRING = 2
+_COST_LIST = 4
+
+Row = Dict[str, Any]
+Test = Callable[[Any, Row], bool]
+
+
+def _fetch(handle: Any, row: Row, field: Field) -> Any:
+    try:
+        return row[field.name]
+    except KeyError:
+        value = row[field.name] = field.getter(handle)
+        return value
+
+
+def _no_truth_value(value: Any) -> bool:
+    raise TypeError(
+        f'{value!r} has no truth value: combine conditions with &, | and ~'
+        ' rather than and, or, not or chained comparisons'
+    )
+
+
+class Predicate(metaclass=ABCMeta):
+    """A condition on a logical volume.
+
+    Predicates are combined with `&`, `|` and `~`. They have no truth value,
+    as `and`, `or`, `not` and chained comparisons would silently drop
+    conditions.
+    """
+
+    cost = 0
+
+    __bool__ = _no_truth_value
+
+    def __and__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AllOf(self, other)
+
+    def __rand__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AllOf(other, self)
+
+    def __or__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AnyOf(self, other)
+
+    def __ror__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AnyOf(other, self)
+
+    def __invert__(self) -> Predicate:
+        return Not(self)
+
+    @abstractmethod
+    def fields(self) -> FrozenSet[str]:
+        """The names of the fields the predicate reads.
+
+        Returns:
+            FrozenSet[str]: The field names.
+        """
+
+    @abstractmethod
+    def compile(self) -> Test:
+        """Compile the predicate to a function of a handle and a row of the
+        values read so far.
+
+        Returns:
+            Test: The compiled test.
+        """
+
+
+def _as_predicate(value: Union[Predicate, Field]) -> Predicate:
+    if isinstance(value, Field):
+        return Compare(value, operator.eq, True)
+    if isinstance(value, Predicate):
+        return value
+    raise TypeError(f'Not a predicate: {value!r}')
+
+
+class Field:
+    """A logical volume property which can be compared and returned"""
+
+    def __init__(
+            self,
+            name: str,
+            getter: Callable[[Any], Any],
+            cost: int,
+            convert: Callable[[Any], Any] = lambda value: value,
+            encode: Callable[[Any], Any] = lambda value: value
+    ) -> None:
+        """A logical volume property
+
+        Args:
+            name (str): The field name.
+            getter (Callable[[Any], Any]): Read the raw value from a handle.
+            cost (int): The relative cost of reading the value.
+            convert (Callable[[Any], Any], optional): Convert a raw value to
+                the value returned. Defaults to the identity.
+            encode (Callable[[Any], Any], optional): Convert a value in a
+                comparison to a raw value, so the comparison is made on raw
+                values. Defaults to the identity.
+        """
+        self.name = name
+        self.getter = getter
+        self.cost = cost
+        self.convert = convert
+        self.encode = encode
+
+    __hash__ = object.__hash__
+
+    __bool__ = _no_truth_value
+
+    def __eq__(self, value: Any) -> Predicate:  # type: ignore
+        return Compare(self, operator.eq, value)
+
+    def __ne__(self, value: Any) -> Predicate:  # type: ignore
+        return Compare(self, operator.ne, value)
+
+    def __lt__(self, value: Any) -> Predicate:
+        return Compare(self, operator.lt, value)
+
+    def __le__(self, value: Any) -> Predicate:
+        return Compare(self, operator.le, value)
+
+    def __gt__(self, value: Any) -> Predicate:
+        return Compare(self, operator.gt, value)
+
+    def __ge__(self, value: Any) -> Predicate:
+        return Compare(self, operator.ge, value)
+
+    def __and__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AllOf(self, other)
+
+    def __rand__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AllOf(other, self)
+
+    def __or__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AnyOf(self, other)
+
+    def __ror__(self, other: Union[Predicate, Field]) -> Predicate:
+        return AnyOf(other, self)
+
+    def __invert__(self) -> Predicate:
+        return Not(self)
+
+    def startswith(self, prefix: str) -> Predicate:
+        """Test if a string field starts with a prefix.
+
+        Args:
+            prefix (str): The prefix.
+
+        Returns:
+            Predicate: The predicate.
+        """
+        return Compare(
+            self,
+            lambda value, encoded: value is not None and value.startswith(encoded),
+            prefix
+        )
+
+    def __repr__(self) -> str:
+        return f'Field({self.name!r})'
+
+
+class Compare(Predicate):
+    """Compare a field with a constant"""
+
+    def __init__(
+            self,
+            field: Field,
+            compare: Callable[[Any, Any], bool],
+            value: Any
+    ) -> None:
+        self.field = field
+        self.compare = compare
+        self.value = value
+        self.cost = field.cost
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset((self.field.name,))
+
+    def compile(self) -> Test:
+        field, compare = self.field, self.compare
+        # Encode the constant once, so the raw values are never decoded.
+        value = field.encode(self.value)
+        return lambda handle, row: compare(_fetch(handle, row, field), value)
+
+
+class HasTag(Predicate):
+    """Test if a set of tags holds a tag"""
+
+    def __init__(self, field: Field, tag: str) -> None:
+        self.field = field
+        self.tag = tag
+        self.cost = field.cost
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset((self.field.name,))
+
+    def compile(self) -> Test:
+        field, tag = self.field, self.tag.encode('ascii')
+        return lambda handle, row: tag in _fetch(handle, row, field)
+
+
+class AllOf(Predicate):
+    """True if every predicate is true"""
+
+    def __init__(self, *predicates: Union[Predicate, Field]) -> None:
+        self.predicates: List[Predicate] = []
+        for predicate in map(_as_predicate, predicates):
+            if isinstance(predicate, AllOf):
+                self.predicates.extend(predicate.predicates)
+            else:
+                self.predicates.append(predicate)
+        self.cost = sum(predicate.cost for predicate in self.predicates)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(p.fields() for p in self.predicates))
+
+    def compile(self) -> Test:
+        # Run the cheapest checks first, so the costly reads are skipped when
+        # a cheap check fails.
+        tests = tuple(
+            predicate.compile()
+            for predicate in sorted(self.predicates, key=lambda p: p.cost)
+        )
+        return lambda handle, row: all(test(handle, row) for test in tests)
+
+
+class AnyOf(Predicate):
+    """True if any predicate is true"""
+
+    def __init__(self, *predicates: Union[Predicate, Field]) -> None:
+        self.predicates: List[Predicate] = []
+        for predicate in map(_as_predicate, predicates):
+            if isinstance(predicate, AnyOf):
+                self.predicates.extend(predicate.predicates)
+            else:
+                self.predicates.append(predicate)
+        self.cost = sum(predicate.cost for predicate in self.predicates)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(p.fields() for p in self.predicates))
+
+    def compile(self) -> Test:
+        tests = tuple(
+            predicate.compile()
+            for predicate in sorted(self.predicates, key=lambda p: p.cost)
+        )
+        return lambda handle, row: any(test(handle, row) for test in tests)
+
+
+class Not(Predicate):
+    """True if the predicate is false"""
+
+    def __init__(self, predicate: Union[Predicate, Field]) -> None:
+        self.predicate = _as_predicate(predicate)
+        self.cost = self.predicate.cost
+
+    def fields(self) -> FrozenSet[str]:
+        return self.predicate.fields()
+
+    def compile(self) -> Test:
+        test = self.predicate.compile()
+        return lambda handle, row: not test(handle, row)
@@ -0,0 +1,244 @@
+"""Configuration profiles"""
+
+from __future__ import annotations
+import re
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+    TYPE_CHECKING
+)
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+ConfigValue = Union[bool, int, str, Sequence[str]]
+
+_PATH = re.compile(r'^[a-z_]+/[a-z_]+$')
+
+# The device filters, which are intersected rather than replaced.
+_FILTER_PATHS = frozenset(('devices/filter', 'devices/global_filter'))
+
+
+def _render_value(path: str, value: ConfigValue) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        if '"' in value:
+            raise ValueError(f'Invalid value for {path}: {value!r}')
+        return f'"{value}"'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_render_value(path, item) for item in value) + ']'
+    raise ValueError(f'Invalid value for {path}: {value!r}')
+
+
+def _intersect_filters(
+        first: ConfigValue,
+        second: ConfigValue
+) -> Optional[List[str]]:
+    first_patterns = [first] if isinstance(first, str) else list(first)
+    second_patterns = [second] if isinstance(second, str) else list(second)
+    if first_patterns == second_patterns:
+        return first_patterns
+    # A device matching no pattern is accepted, so a filter which only
+    # rejects can run ahead of the other filter without widening it.
+    for rejects, rest in (
+            (first_patterns, second_patterns),
+            (second_patterns, first_patterns)
+    ):
+        if all(pattern.startswith('r') for pattern in rejects):
+            return rejects + [
+                pattern for pattern in rest if pattern not in rejects
+            ]
+    return None
+
+
+class ConfigProfile:
+    """A named, validated set of configuration overrides.
+
+    The overrides are validated and rendered to an lvm config string once,
+    when the profile is created.
+    """
+
+    def __init__(self, name: str, settings: Mapping[str, ConfigValue]) -> None:
+        """A named set of configuration overrides
+
+        Args:
+            name (str): The profile name.
+            settings (Mapping[str, ConfigValue]): The values by config path,
+                for example {'devices/filter': ['a|^/dev/sdb$|', 'r|.*|']}.
+
+        Raises:
+            ValueError: If a path or value is invalid.
+        """
+        self.name = name
+        self.settings: Dict[str, ConfigValue] = dict(settings)
+
+        sections: Dict[str, List[str]] = {}
+        for path, value in self.settings.items():
+            if not _PATH.match(path):
+                raise ValueError(f'Invalid config path: {path}')
+            section, key = path.split('/')
+            sections.setdefault(section, []).append(
+                f'{key}={_render_value(path, value)}'
+            )
+        self.config = ' '.join(
+            section + '{' + ' '.join(values) + '}'
+            for section, values in sections.items()
+        )
+
+    def __add__(self, other: ConfigProfile) -> ConfigProfile:
+        """Combine two profiles.
+
+        A device filter in both profiles is intersected when one of them
+        only rejects devices, by running its patterns first. Any other
+        setting in both profiles, including filters which both accept
+        devices, must have the same value.
+
+        Args:
+            other (ConfigProfile): The other profile.
+
+        Raises:
+            ValueError: If the profiles set a path to different values.
+
+        Returns:
+            ConfigProfile: The combined profile.
+        """
+        settings = dict(self.settings)
+        for path, value in other.settings.items():
+            if path not in settings:
+                settings[path] = value
+                continue
+            if path in _FILTER_PATHS:
+                patterns = _intersect_filters(settings[path], value)
+                if patterns is not None:
+                    settings[path] = patterns
+                    continue
+            if settings[path] != value:
+                raise ValueError(
+                    f'Profiles {self.name} and {other.name} set {path} to'
+                    f' {settings[path]!r} and {value!r}'
+                )
+        return ConfigProfile(f'{self.name}+{other.name}', settings)
+
+    def __repr__(self) -> str:
+        return f'ConfigProfile({self.name!r}, {self.settings!r})'
+
+
+def scan_devices(name: str, devices: Iterable[str]) -> ConfigProfile:
+    """Create a profile which restricts scanning to the given devices.
+
+    Args:
+        name (str): The profile name.
+        devices (Iterable[str]): Regular expressions matching the device paths
+            to scan, for example '^/dev/nvme'.
+
+    Returns:
+        ConfigProfile: The profile.
+    """
+    accept = [f'a|{pattern}|' for pattern in devices]
+    return ConfigProfile(
+        name,
+        {
+            'devices/filter': accept + ['r|.*|'],
+            'devices/global_filter': accept + ['r|.*|']
+        }
+    )
+
+
+# Skip devices which never hold physical volumes.
+SKIP_VIRTUAL = ConfigProfile(
+    'skip_virtual',
+    {
+        'devices/global_filter': [
+            'r|^/dev/loop|', 'r|^/dev/ram|', 'r|^/dev/sr|', 'r|^/dev/fd|'
+        ]
+    }
+)
+
+# Take the device list from the directory scan rather than asking udev.
+NO_UDEV = ConfigProfile(
+    'no_udev',
+    {
+        'devices/obtain_device_list_from_udev': False,
+        'devices/external_device_info_source': 'none'
+    }
+)
+
+# Only scan NVMe namespaces.
+NVME_ONLY = scan_devices('nvme_only', ['^/dev/nvme'])
+
+# Read metadata without taking or waiting for locks, and refuse to write it.
+MONITORING = ConfigProfile(
+    'monitoring',
+    {
+        'global/locking_type': 0,
+        'global/wait_for_locks': False,
+        'global/metadata_read_only': True
+    }
+)
+
+PROFILES: Dict[str, ConfigProfile] = {
+    profile.name: profile
+    for profile in (SKIP_VIRTUAL, NO_UDEV, NVME_ONLY, MONITORING)
+}
+
+
+def register_profile(profile: ConfigProfile) -> None:
+    """Register a profile so it can be referred to by name.
+
+    Args:
+        profile (ConfigProfile): The profile.
+    """
+    PROFILES[profile.name] = profile
+
+
+def combine_profiles(
+        profiles: Iterable[Union[str, ConfigProfile]]
+) -> Optional[ConfigProfile]:
+    """Resolve and combine profiles.
+
+    The device filters of the profiles are intersected where one only
+    rejects devices, and any other setting made by more than one profile
+    must have the same value in each.
+
+    Args:
+        profiles (Iterable[Union[str, ConfigProfile]]): Profiles or the names
+            of registered profiles.
+
+    Raises:
+        ValueError: If a profile name is not registered, or two profiles set
+            a path to different values.
+
+    Returns:
+        Optional[ConfigProfile]: The combined profile, or None if there were
+            no profiles.
+    """
+    combined: Optional[ConfigProfile] = None
+    for profile in profiles:
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f'Unknown config profile: {profile}')
+            profile = PROFILES[profile]
+        combined = profile if combined is None else combined + profile
+    return combined
+
+
+def apply_profile(lvm: LVMInstance, profile: ConfigProfile) -> None:
+    """Apply a profile to an lvm handle.
+
+    Args:
+        lvm (LVMInstance): The lvm instance.
+        profile (ConfigProfile): The profile.
+
+    Raises:
+        LVMException: If the configuration could not be applied.
+    """
+    lvm.config_override(profile.config)
+    lvm.reload_config()
@@ -0,0 +1,400 @@
+"""Call tree profiling"""
+
+from __future__ import annotations
+import atexit
+from contextlib import contextmanager
+import functools
+import os
+import sys
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple
+)
+
+# The categories time is attributed to.
+API = 'api'
+FFI = 'ffi'
+DECODE = 'decode'
+CONSTRUCT = 'construct'
+
+# The classes whose public methods and properties are timed.
+_API_CLASSES = (
+    ('lvm', 'LVM'),
+    ('lvm', 'LVMInstance'),
+    ('volume_group', 'VolumeGroupInstance'),
+    ('volume_group', 'VolumeGroupOpen'),
+    ('volume_group', 'VolumeGroupCreate'),
+    ('logical_volume', 'LogicalVolume'),
+    ('physical_volume', 'PhysicalVolume')
+)
+
+# The classes whose construction is timed.
+_CONSTRUCT_CLASSES = (
+    ('volume_group', 'VolumeGroupInstance'),
+    ('context', 'VolumeGroupContext'),
+    ('logical_volume', 'LogicalVolume'),
+    ('physical_volume', 'PhysicalVolume')
+)
+
+# The functions which decode library strings.
+_DECODE_FUNCTIONS = ('_intern', '_dm_list_to_str_list', '_property_value')
+
+
+class CallNode:
+    """A function in the call tree"""
+
+    __slots__ = ('name', 'category', 'calls', 'total', 'children')
+
+    def __init__(self, name: str, category: str) -> None:
+        self.name = name
+        self.category = category
+        self.calls = 0
+        self.total = 0
+        self.children: Dict[str, CallNode] = {}
+
+    @property
+    def self_time(self) -> int:
+        """The time in nanoseconds spent in the function and not its children.
+
+        Returns:
+            int: The time.
+        """
+        return self.total - sum(child.total for child in self.children.values())
+
+    def child(self, name: str, category: str) -> CallNode:
+        """Get or add a child.
+
+        Args:
+            name (str): The function name.
+            category (str): The category.
+
+        Returns:
+            CallNode: The child.
+        """
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = CallNode(name, category)
+        return node
+
+    def merge(self, other: CallNode) -> None:
+        """Add the times of another tree to this one.
+
+        Args:
+            other (CallNode): The other tree.
+        """
+        self.calls += other.calls
+        self.total += other.total
+        for name, node in other.children.items():
+            self.child(name, node.category).merge(node)
+
+
+class Profile:
+    """The call trees recorded while profiling.
+
+    Each thread records its own tree, and the trees are merged when they are
+    reported.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._roots: List[CallNode] = []
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[CallNode]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            root = CallNode('root', API)
+            with self._lock:
+                self._roots.append(root)
+            stack = self._local.stack = [root]
+        return stack
+
+    def wrap(
+            self,
+            func: Callable[..., Any],
+            name: str,
+            category: str
+    ) -> Callable[..., Any]:
+        """Wrap a function so its calls are recorded.
+
+        Args:
+            func (Callable[..., Any]): The function.
+            name (str): The name in the call tree.
+            category (str): The category.
+
+        Returns:
+            Callable[..., Any]: The wrapped function.
+        """
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            stack = self._stack()
+            node = stack[-1].child(name, category)
+            stack.append(node)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                node.total += clock() - start
+                node.calls += 1
+                stack.pop()
+
+        return functools.wraps(func)(timed)
+
+    @property
+    def tree(self) -> CallNode:
+        """The merged call tree of every thread.
+
+        Returns:
+            CallNode: The root of the tree.
+        """
+        root = CallNode('root', API)
+        with self._lock:
+            roots = list(self._roots)
+        for thread_root in roots:
+            root.merge(thread_root)
+        root.total = sum(child.total for child in root.children.values())
+        return root
+
+    def totals(self) -> Dict[str, int]:
+        """The time in nanoseconds spent in each category.
+
+        Time in a public method which is not spent in a library call, decoding
+        or constructing a wrapper is counted as api time.
+
+        Returns:
+            Dict[str, int]: The time by category.
+        """
+        totals = {API: 0, FFI: 0, DECODE: 0, CONSTRUCT: 0}
+        pending = list(self.tree.children.values())
+        while pending:
+            node = pending.pop()
+            totals[node.category] += node.self_time
+            pending.extend(node.children.values())
+        return totals
+
+    def collapsed(self) -> List[str]:
+        """The call stacks in the collapsed format read by flamegraph tools.
+
+        Each line holds the frames separated by semicolons, then the time in
+        microseconds spent in the last frame.
+
+        Returns:
+            List[str]: The lines.
+        """
+        lines: List[str] = []
+        pending: List[Tuple[str, CallNode]] = [
+            (node.name, node) for node in self.tree.children.values()
+        ]
+        while pending:
+            path, node = pending.pop()
+            micros = node.self_time // 1000
+            if micros > 0:
+                lines.append(f'{path} {micros}')
+            pending.extend(
+                (f'{path};{child.name}', child)
+                for child in node.children.values()
+            )
+        return sorted(lines)
+
+    def write_collapsed(self, fp: TextIO) -> None:
+        """Write the collapsed call stacks.
+
+        Args:
+            fp (TextIO): The file to write to.
+        """
+        for line in self.collapsed():
+            fp.write(line + '\n')
+
+    def format_tree(self, min_fraction: float = 0.0) -> str:
+        """Describe the call tree.
+
+        Args:
+            min_fraction (float, optional): Leave out calls which took less
+                than this fraction of the total. Defaults to 0.0.
+
+        Returns:
+            str: The call tree, one call per line.
+        """
+        root = self.tree
+        lines: List[str] = []
+
+        def describe(node: CallNode, depth: int) -> None:
+            for child in sorted(
+                    node.children.values(),
+                    key=lambda child: -child.total
+            ):
+                if root.total and child.total / root.total < min_fraction:
+                    continue
+                lines.append(
+                    f'{"  " * depth}{child.name} [{child.category}]'
+                    f' calls={child.calls}'
+                    f' total={child.total / 1e6:.3f}ms'
+                    f' self={child.self_time / 1e6:.3f}ms'
+                )
+                describe(child, depth + 1)
+
+        describe(root, 0)
+        return '\n'.join(lines)
+
+
+def _module(name: str) -> Any:
+    return sys.modules[f'{__package__}.{name}']
+
+
+def _instrument(profile: Profile) -> List[Tuple[Any, str, Any]]:
+    # Import every module so the bound names can be found.
+    # pylint: disable=import-outside-toplevel,unused-import
+    from . import bindings, context, logical_volume, lvm, physical_volume
+    from . import utils, volume_group
+
+    patches: List[Tuple[Any, str, Any]] = []
+
+    def patch(owner: Any, attr: str, value: Any) -> None:
+        patches.append((owner, attr, getattr(owner, attr)))
+        setattr(owner, attr, value)
+
+    for module_name, class_name in _CONSTRUCT_CLASSES:
+        cls = getattr(_module(module_name), class_name)
+        patch(
+            cls,
+            '__init__',
+            profile.wrap(cls.__init__, f'{class_name}()', CONSTRUCT)
+        )
+
+    for module_name, class_name in _API_CLASSES:
+        cls = getattr(_module(module_name), class_name)
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_') and attr not in ('__enter__', '__exit__'):
+                continue
+            name = f'{class_name}.{attr}'
+            if isinstance(value, property):
+                patch(cls, attr, property(
+                    profile.wrap(value.fget, name, API) if value.fget else None,
+                    profile.wrap(value.fset, name, API) if value.fset else None,
+                    value.fdel,
+                    value.__doc__
+                ))
+            elif callable(value) and not isinstance(value, (type, staticmethod)):
+                patch(cls, attr, profile.wrap(value, name, API))
+
+    # The library functions are bound by name into each module.
+    library = {
+        id(value): name
+        for name, value in vars(bindings).items()
+        if name.startswith(('lvm_', 'dm_list_'))
+    }
+    decoders = {id(getattr(utils, name)): name for name in _DECODE_FUNCTIONS}
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith(f'{__package__}.') or module is None:
+            continue
+        if module_name == f'{__package__}.bindings':
+            continue
+        for attr, value in list(vars(module).items()):
+            if id(value) in library and library[id(value)] == attr:
+                patch(module, attr, profile.wrap(value, attr, FFI))
+            elif id(value) in decoders and decoders[id(value)] == attr:
+                patch(module, attr, profile.wrap(value, attr, DECODE))
+
+    context_cls = _module('context').VolumeGroupContext
+    patch(
+        context_cls,
+        'cached_string',
+        profile.wrap(
+            context_cls.cached_string,
+            'VolumeGroupContext.cached_string',
+            DECODE
+        )
+    )
+
+    return patches
+
+
+_lock = threading.Lock()
+_active: Optional[List[Tuple[Any, str, Any]]] = None
+# Whether the environment has been checked for a profile to start.
+_environment_checked = False
+
+
+def start(profile: Optional[Profile] = None) -> Profile:
+    """Start recording calls.
+
+    The public methods, library calls, string decoding and wrapper
+    construction are timed by replacing them with timed wrappers, which are
+    removed by stop, so there is no cost when not profiling.
+
+    Args:
+        profile (Optional[Profile], optional): The profile to record to.
+            Defaults to None, for a new profile.
+
+    Raises:
+        RuntimeError: If profiling has already started.
+
+    Returns:
+        Profile: The profile.
+    """
+    global _active  # pylint: disable=global-statement
+    profile = profile if profile is not None else Profile()
+    with _lock:
+        if _active is not None:
+            raise RuntimeError('Profiling has already started')
+        _active = _instrument(profile)
+    return profile
+
+
+def stop() -> None:
+    """Stop recording calls"""
+    global _active  # pylint: disable=global-statement
+    with _lock:
+        if _active is None:
+            return
+        for owner, attr, value in reversed(_active):
+            setattr(owner, attr, value)
+        _active = None
+
+
+@contextmanager
+def profiling() -> Iterator[Profile]:
+    """Record the calls made within the context.
+
+    Yields:
+        Profile: The profile.
+    """
+    profile = start()
+    try:
+        yield profile
+    finally:
+        stop()
+
+
+def start_from_environment() -> None:
+    """Start profiling if JETBLACK_LVM2_PROFILE is set.
+
+    The collapsed call stacks are written to the file it names when the
+    process exits. This is called when an lvm handle is first opened, and
+    only checks the environment once.
+    """
+    global _environment_checked  # pylint: disable=global-statement
+    with _lock:
+        if _environment_checked:
+            return
+        _environment_checked = True
+    path = os.environ.get('JETBLACK_LVM2_PROFILE')
+    if not path:
+        return
+    profile = start()
+
+    def write() -> None:
+        stop()
+        with open(path, 'w') as fp:
+            profile.write_collapsed(fp)
+
+    atexit.register(write)
@@ -0,0 +1,176 @@
+"""The binary protocol used between the daemon and its clients.
+
+Each frame is a four byte big endian length followed by a single encoded
+value. Values are encoded with a one byte type tag:
+
+* ``N`` None
+* ``T``/``F`` True and False
+* ``I`` an unsigned 64 bit integer
+* ``i`` a signed 64 bit integer
+* ``f`` a double
+* ``s`` a utf-8 string prefixed by a four byte length
+* ``l`` a list prefixed by a four byte count
+* ``d`` a dictionary prefixed by a four byte count of key value pairs
+"""
+
+import socket
+import struct
+from typing import Any, Optional
+
+_LENGTH = struct.Struct('>I')
+_UINT64 = struct.Struct('>Q')
+_INT64 = struct.Struct('>q')
+_DOUBLE = struct.Struct('>d')
+
+
+def _encode_into(buf: bytearray, value: Any) -> None:
+    if value is None:
+        buf += b'N'
+    elif value is True:
+        buf += b'T'
+    elif value is False:
+        buf += b'F'
+    elif isinstance(value, int):
+        if value >= 0:
+            buf += b'I'
+            buf += _UINT64.pack(value)
+        else:
+            buf += b'i'
+            buf += _INT64.pack(value)
+    elif isinstance(value, float):
+        buf += b'f'
+        buf += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        buf += b's'
+        buf += _LENGTH.pack(len(encoded))
+        buf += encoded
+    elif isinstance(value, (list, tuple)):
+        buf += b'l'
+        buf += _LENGTH.pack(len(value))
+        for item in value:
+            _encode_into(buf, item)
+    elif isinstance(value, dict):
+        buf += b'd'
+        buf += _LENGTH.pack(len(value))
+        for key, item in value.items():
+            _encode_into(buf, key)
+            _encode_into(buf, item)
+    else:
+        raise TypeError(f'Cannot encode {type(value).__name__}')
+
+
+def encode(value: Any) -> bytes:
+    """Encode a value.
+
+    Args:
+        value (Any): The value to encode.
+
+    Raises:
+        TypeError: If the value contains an unsupported type.
+
+    Returns:
+        bytes: The encoded value.
+    """
+    buf = bytearray()
+    _encode_into(buf, value)
+    return bytes(buf)
+
+
+def _decode_from(buf: memoryview, offset: int) -> Any:
+    tag = buf[offset]
+    offset += 1
+    if tag == 0x4e:  # N
+        return None, offset
+    if tag == 0x54:  # T
+        return True, offset
+    if tag == 0x46:  # F
+        return False, offset
+    if tag == 0x49:  # I
+        return _UINT64.unpack_from(buf, offset)[0], offset + _UINT64.size
+    if tag == 0x69:  # i
+        return _INT64.unpack_from(buf, offset)[0], offset + _INT64.size
+    if tag == 0x66:  # f
+        return _DOUBLE.unpack_from(buf, offset)[0], offset + _DOUBLE.size
+    if tag == 0x73:  # s
+        (length,) = _LENGTH.unpack_from(buf, offset)
+        offset += _LENGTH.size
+        return bytes(buf[offset:offset + length]).decode('utf-8'), offset + length
+    if tag == 0x6c:  # l
+        (count,) = _LENGTH.unpack_from(buf, offset)
+        offset += _LENGTH.size
+        items = []
+        for _ in range(count):
+            item, offset = _decode_from(buf, offset)
+            items.append(item)
+        return items, offset
+    if tag == 0x64:  # d
+        (count,) = _LENGTH.unpack_from(buf, offset)
+        offset += _LENGTH.size
+        mapping = {}
+        for _ in range(count):
+            key, offset = _decode_from(buf, offset)
+            mapping[key], offset = _decode_from(buf, offset)
+        return mapping, offset
+    raise ValueError(f'Unknown type tag {tag}')
+
+
+def decode(data: bytes) -> Any:
+    """Decode a value.
+
+    Args:
+        data (bytes): The encoded value.
+
+    Raises:
+        ValueError: If the data is not a valid encoding.
+
+    Returns:
+        Any: The decoded value.
+    """
+    value, _ = _decode_from(memoryview(data), 0)
+    return value
+
+
+def send_frame(sock: socket.socket, value: Any) -> None:
+    """Encode a value and send it as a frame.
+
+    Args:
+        sock (socket.socket): The socket.
+        value (Any): The value to send.
+    """
+    payload = encode(value)
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock: socket.socket, count: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < count:
+        chunk = sock.recv(count - len(buf))
+        if not chunk:
+            if buf:
+                raise EOFError('Connection closed mid frame')
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> Any:
+    """Receive a frame and decode its value.
+
+    Args:
+        sock (socket.socket): The socket.
+
+    Raises:
+        EOFError: If the connection was closed.
+
+    Returns:
+        Any: The decoded value.
+    """
+    header = _recv_exactly(sock, _LENGTH.size)
+    if header is None:
+        raise EOFError('Connection closed')
+    (length,) = _LENGTH.unpack(header)
+    payload = _recv_exactly(sock, length)
+    if payload is None:
+        raise EOFError('Connection closed mid frame')
+    return decode(payload)
@@ -0,0 +1,284 @@
+"""Physical volume evacuation"""
+
+from __future__ import annotations
+from errno import EBUSY, ENOENT
+import json
+import os
+import subprocess
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING
+)
+
+from .exceptions import LVMCommandError, LVMNotFoundError, exception_for
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+# pvmove reports this when a range holds no allocated extents.
+_NO_DATA = b'No data to move'
+
+Runner = Callable[[List[str]], 'subprocess.CompletedProcess[bytes]']
+
+
+def _run(args: List[str]) -> 'subprocess.CompletedProcess[bytes]':
+    return subprocess.run(args, capture_output=True, check=False)
+
+
+class EvacuationProgress(NamedTuple):
+    """The progress of an evacuation"""
+    device: str
+    moved_extents: int
+    total_extents: int
+    elapsed: float
+    eta: Optional[float]
+
+    @property
+    def fraction(self) -> float:
+        """The fraction of the extents moved.
+
+        Returns:
+            float: The fraction from 0 to 1.
+        """
+        if self.total_extents == 0:
+            return 1.0
+        return self.moved_extents / self.total_extents
+
+
+class PVEvacuation:
+    """Move every extent off a physical volume, a chunk at a time.
+
+    liblvm2app cannot move extents, so each chunk is moved by running pvmove
+    on a range of physical extents. The position is saved to a state file
+    before and after every chunk. If the process dies, running the evacuation
+    again first lets pvmove finish any interrupted move, then carries on from
+    the saved position. When the physical volume is empty it is removed from
+    the volume group.
+
+    Extents allocated behind the position while moving are picked up by
+    another pass. The evacuation fails if a pass moves nothing, or if the
+    physical volume is not empty after `max_passes` passes.
+
+    Each pvmove runs at full speed, so a bandwidth limit is kept by pausing
+    after each chunk until its extents have taken as long as they would at
+    the limit. Each pvmove has a large fixed cost, so the chunks are not
+    shrunk to smooth the rate; use a smaller `chunk_extents` for shorter
+    bursts.
+    """
+
+    def __init__(
+            self,
+            lvm: LVMInstance,
+            vg_name: str,
+            device: str,
+            state_path: str,
+            *,
+            destinations: Sequence[str] = (),
+            chunk_extents: int = 1024,
+            bandwidth: Optional[float] = None,
+            on_progress: Optional[Callable[[EvacuationProgress], None]] = None,
+            reduce: bool = True,
+            max_passes: int = 8,
+            runner: Runner = _run
+    ) -> None:
+        """Move every extent off a physical volume
+
+        Args:
+            lvm (LVMInstance): The lvm instance.
+            vg_name (str): The volume group name.
+            device (str): The physical volume to evacuate.
+            state_path (str): The file holding the position, for resuming.
+            destinations (Sequence[str], optional): The physical volumes to
+                move to. Defaults to (), for any with free space.
+            chunk_extents (int, optional): The extents in each pvmove.
+                Defaults to 1024.
+            bandwidth (Optional[float], optional): The most bytes per second to
+                move, averaged over each chunk and the pause after it.
+                Defaults to None, for no limit.
+            on_progress (Optional[Callable[[EvacuationProgress], None]],
+                optional): Called after each chunk. Defaults to None.
+            reduce (bool, optional): If True remove the physical volume from
+                the volume group when it is empty. Defaults to True.
+            max_passes (int, optional): The most passes over the physical
+                volume. Defaults to 8.
+            runner (Runner, optional): Runs a command. Defaults to
+                subprocess.run.
+        """
+        self.lvm = lvm
+        self.vg_name = vg_name
+        self.device = device
+        self.state_path = state_path
+        self.destinations = list(destinations)
+        self.chunk_extents = chunk_extents
+        self.bandwidth = bandwidth
+        self.on_progress = on_progress
+        self.reduce = reduce
+        self.max_passes = max_passes
+        self.runner = runner
+
+    def _read_extents(self) -> Tuple[int, int, int]:
+        """Read the extent size, extent count and allocated extents"""
+        with self.lvm.vg_open(self.vg_name) as vg:
+            extent_size = vg.extent_size
+            for pv in vg.physical_volumes:
+                if pv.name == self.device:
+                    size, free = pv.size, pv.free
+                    return (
+                        extent_size,
+                        size // extent_size,
+                        (size - free) // extent_size
+                    )
+        raise LVMNotFoundError(
+            ENOENT, f'{self.device} is not in volume group {self.vg_name}'
+        )
+
+    def load_state(self) -> Optional[Dict[str, Any]]:
+        """Read the saved position.
+
+        Returns:
+            Optional[Dict[str, Any]]: The state, or None if there is none.
+        """
+        try:
+            with open(self.state_path) as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return None
+        if state['vg'] != self.vg_name or state['device'] != self.device:
+            raise ValueError(
+                f'{self.state_path} is for {state["device"]} in {state["vg"]}'
+            )
+        return state
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        temp_path = f'{self.state_path}.tmp'
+        with open(temp_path, 'w') as fp:
+            json.dump(state, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp_path, self.state_path)
+
+    def _pvmove(self, args: List[str]) -> bool:
+        result = self.runner(['pvmove', *args])
+        if result.returncode == 0:
+            return True
+        if _NO_DATA in result.stdout or _NO_DATA in result.stderr:
+            return False
+        raise LVMCommandError(
+            'pvmove', result.returncode, result.stderr or result.stdout)
+
+    def _reduce(self) -> None:
+        with self.lvm.vg_open(self.vg_name, 'w') as vg:
+            vg.reduce(self.device)
+            vg.write()
+
+    def run(self) -> EvacuationProgress:
+        """Evacuate the physical volume, resuming from any saved position.
+
+        Raises:
+            LVMCommandError: If a pvmove failed. The position is kept, so the
+                evacuation can be run again.
+            LVMException: If the reduce failed.
+            LVMLockedError: If a pass moved nothing, or the physical volume
+                was not empty after the last pass.
+
+        Returns:
+            EvacuationProgress: The final progress.
+        """
+        state = self.load_state()
+        if state is not None and state['in_progress']:
+            # Let pvmove finish the move that was interrupted.
+            self._pvmove([])
+
+        extent_size, extent_count, allocated = self._read_extents()
+        if state is None:
+            state = {
+                'vg': self.vg_name,
+                'device': self.device,
+                'total_extents': allocated,
+                'next_extent': 0,
+                'in_progress': False
+            }
+            self._save_state(state)
+
+        start_time = time.monotonic()
+        start_allocated = allocated
+
+        passes = 0
+        while True:
+            total = state['total_extents']
+            progress = EvacuationProgress(
+                self.device, total - allocated, total,
+                time.monotonic() - start_time, None)
+
+            passes += 1
+            pass_allocated = allocated
+            # A resumed pass may start near the end, so only a whole pass
+            # which moves nothing counts as stuck.
+            whole_pass = state['next_extent'] == 0
+            while allocated > 0 and state['next_extent'] < extent_count:
+                first = state['next_extent']
+                last = min(first + self.chunk_extents, extent_count) - 1
+
+                state['in_progress'] = True
+                self._save_state(state)
+                chunk_start = time.monotonic()
+                self._pvmove(
+                    [f'{self.device}:{first}-{last}', *self.destinations])
+                state['next_extent'] = last + 1
+                state['in_progress'] = False
+                self._save_state(state)
+
+                before = allocated
+                _, _, allocated = self._read_extents()
+                moved = before - allocated
+
+                if self.bandwidth and moved > 0:
+                    minimum = moved * extent_size / self.bandwidth
+                    delay = minimum - (time.monotonic() - chunk_start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                elapsed = time.monotonic() - start_time
+                moved_this_run = start_allocated - allocated
+                eta = (
+                    allocated * elapsed / moved_this_run
+                    if moved_this_run > 0 else None
+                )
+                progress = EvacuationProgress(
+                    self.device, max(total - allocated, 0), total, elapsed, eta)
+                if self.on_progress is not None:
+                    self.on_progress(progress)
+
+            if allocated == 0:
+                break
+            if whole_pass and allocated >= pass_allocated:
+                raise exception_for(
+                    EBUSY,
+                    f'No extents were moved off {self.device} in a pass;'
+                    f' {allocated} remain'
+                )
+            if passes >= self.max_passes:
+                raise exception_for(
+                    EBUSY,
+                    f'{allocated} extents remain on {self.device} after'
+                    f' {passes} passes'
+                )
+
+            # Extents were allocated behind the position while moving, so
+            # make another pass.
+            state['next_extent'] = 0
+            state['total_extents'] = max(total, allocated)
+            self._save_state(state)
+
+        if self.reduce:
+            self._reduce()
+        os.remove(self.state_path)
+        return progress
@@ -0,0 +1,158 @@
+"""Logical volume queries"""
+
+from __future__ import annotations
+from ctypes import cast
+from errno import ENOMEM
+from typing import Any, Dict, FrozenSet, Optional, Sequence, Union
+
+from .bindings import (
+    lvm_lv_get_name,
+    lvm_lv_get_uuid,
+    lvm_lv_get_size,
+    lvm_lv_get_attr,
+    lvm_lv_get_origin,
+    lvm_lv_get_tags,
+    lvm_lv_is_active,
+    lvm_lv_is_suspended
+)
+from .exceptions import exception_for
+from .predicates import (
+    Field,
+    HasTag,
+    Predicate,
+    Row,
+    _COST_INTEGER,
+    _COST_LIST,
+    _COST_STRING,
+    _as_predicate,
+    _fetch
+)
+from .types import lvm_str_list_p
+from .utils import _dm_list_iter, _intern
+
+
+def _get_tags(handle: Any) -> FrozenSet[bytes]:
+    tags = lvm_lv_get_tags(handle)
+    if not bool(tags):
+        # The list is only missing when it could not be allocated.
+        raise exception_for(ENOMEM, 'Unable to read the logical volume tags')
+    return frozenset(
+        cast(value, lvm_str_list_p).contents.str
+        for value in _dm_list_iter(tags)
+    )
+
+
+def _encode_string(value: Optional[str]) -> Optional[bytes]:
+    return value.encode('ascii') if value is not None else None
+
+
+def _decode_string(value: Optional[bytes]) -> Optional[str]:
+    return value.decode('ascii') if value is not None else None
+
+
+NAME = Field('name', lvm_lv_get_name, _COST_STRING, _decode_string, _encode_string)
+UUID = Field('uuid', lvm_lv_get_uuid, _COST_STRING, _decode_string, _encode_string)
+ATTR = Field('attr', lvm_lv_get_attr, _COST_STRING, _intern, _encode_string)
+ORIGIN = Field(
+    'origin', lvm_lv_get_origin, _COST_STRING, _decode_string, _encode_string
+)
+SIZE = Field('size', lvm_lv_get_size, _COST_INTEGER)
+ACTIVE = Field(
+    'active', lambda handle: lvm_lv_is_active(handle) == 1, _COST_INTEGER
+)
+SUSPENDED = Field(
+    'suspended', lambda handle: lvm_lv_is_suspended(handle) == 1, _COST_INTEGER
+)
+TAGS = Field(
+    'tags',
+    _get_tags,
+    _COST_LIST,
+    lambda tags: sorted(_intern(tag) for tag in tags)
+)
+
+FIELDS: Dict[str, Field] = {
+    field.name: field
+    for field in (NAME, UUID, ATTR, ORIGIN, SIZE, ACTIVE, SUSPENDED, TAGS)
+}
+
+DEFAULT_FIELDS = ('name', 'uuid', 'size', 'attr', 'active')
+
+
+class _LogicalVolumeFields:
+    """The fields of a logical volume, for building queries"""
+
+    name = NAME
+    uuid = UUID
+    attr = ATTR
+    origin = ORIGIN
+    size = SIZE
+    active = ACTIVE
+    suspended = SUSPENDED
+
+    @staticmethod
+    def tag(tag: str) -> Predicate:
+        """Test if a logical volume carries a tag.
+
+        Args:
+            tag (str): The tag.
+
+        Returns:
+            Predicate: The predicate.
+        """
+        return HasTag(TAGS, tag)
+
+
+# The logical volume fields, for example `(lv.size > 10 * GiB) & lv.active`.
+lv = _LogicalVolumeFields()
+
+
+class Query:
+    """A compiled logical volume query.
+
+    The condition is compiled once to a chain of closures with the cheapest
+    checks first. While the logical volume list is walked only the values the
+    condition needs are read, and only as far as the first failing check.
+    Values already read for the condition are reused for the result.
+    """
+
+    def __init__(
+            self,
+            where: Optional[Union[Predicate, Field]] = None,
+            fields: Optional[Sequence[str]] = None
+    ) -> None:
+        """A compiled logical volume query
+
+        Args:
+            where (Optional[Union[Predicate, Field]], optional): The condition.
+                Defaults to None, to select every logical volume.
+            fields (Optional[Sequence[str]], optional): The names of the fields
+                to return. Defaults to name, uuid, size, attr and active.
+
+        Raises:
+            ValueError: If a field name is unknown.
+        """
+        names = DEFAULT_FIELDS if fields is None else tuple(fields)
+        unknown = [name for name in names if name not in FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        self.fields = tuple(FIELDS[name] for name in names)
+        self.where = None if where is None else _as_predicate(where)
+        self._test = None if self.where is None else self.where.compile()
+
+    def match(self, handle: Any) -> Optional[Dict[str, Any]]:
+        """Run the query against a logical volume handle.
+
+        Args:
+            handle (Any): The logical volume handle.
+
+        Returns:
+            Optional[Dict[str, Any]]: The selected fields, or None if the
+                logical volume does not match.
+        """
+        row: Row = {}
+        if self._test is not None and not self._test(handle, row):
+            return None
+        return {
+            field.name: field.convert(_fetch(handle, row, field))
+            for field in self.fields
+        }
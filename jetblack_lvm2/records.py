@@ -0,0 +1,52 @@
+"""Records which can be used without the library"""
+
+from __future__ import annotations
+from typing import Any, NamedTuple, Optional
+
+
+class PhysicalVolumeRecord(NamedTuple):
+    """A snapshot of a physical volume and the volume group it belongs to"""
+    name: str
+    uuid: str
+    vg_name: Optional[str]
+    vg_uuid: Optional[str]
+    size: int
+    free: int
+    dev_size: int
+    mda_count: int
+
+    @classmethod
+    def from_handle(cls, handle: Any) -> 'PhysicalVolumeRecord':
+        """Read a record from a physical volume handle.
+
+        Args:
+            handle (Any): The physical volume handle.
+
+        Returns:
+            PhysicalVolumeRecord: The record.
+        """
+        # Imported here so the record can be used without the library.
+        # pylint: disable=import-outside-toplevel
+        from .bindings import (
+            lvm_pv_get_name,
+            lvm_pv_get_uuid,
+            lvm_pv_get_mda_count,
+            lvm_pv_get_dev_size,
+            lvm_pv_get_size,
+            lvm_pv_get_free,
+            lvm_pv_get_property
+        )
+        from .utils import _intern, _property_value
+
+        vg_name = _property_value(lvm_pv_get_property(handle, b'vg_name'))
+        vg_uuid = _property_value(lvm_pv_get_property(handle, b'vg_uuid'))
+        return cls(
+            _intern(lvm_pv_get_name(handle)),
+            lvm_pv_get_uuid(handle).decode('ascii'),
+            str(vg_name) if vg_name else None,
+            str(vg_uuid) if vg_uuid else None,
+            lvm_pv_get_size(handle),
+            lvm_pv_get_free(handle),
+            lvm_pv_get_dev_size(handle),
+            lvm_pv_get_mda_count(handle)
+        )
@@ -0,0 +1,151 @@
+"""Device resolution"""
+
+from __future__ import annotations
+import os
+import time
+from typing import Dict, Optional, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+DeviceKey = Union[Tuple[int, int], str]
+
+
+def device_key(device: str) -> DeviceKey:
+    """Find the canonical key of a device path.
+
+    Symbolic links such as those in /dev/disk/by-id and /dev/mapper resolve
+    to the major and minor number of the block device. If the device cannot
+    be found the resolved path is used.
+
+    Args:
+        device (str): The device path.
+
+    Returns:
+        DeviceKey: The major and minor number, or the resolved path.
+    """
+    try:
+        rdev = os.stat(device).st_rdev
+    except OSError:
+        return os.path.realpath(device)
+    if rdev == 0:
+        return os.path.realpath(device)
+    return (os.major(rdev), os.minor(rdev))
+
+
+def _pvid(uuid: str) -> str:
+    # The library formats uuids with dashes, while a pvid has none.
+    return uuid.replace('-', '')
+
+
+class DeviceResolver:
+    """A cache resolving devices and physical volume uuids to volume groups.
+
+    The cache is filled from a single pass over the physical volumes of the
+    host, and is invalidated when the lvm instance scans or creates or removes
+    a physical volume. A lookup miss refills the cache, at most once every
+    `min_refresh` seconds, so a burst of events for unknown devices does not
+    cause a burst of scans.
+    """
+
+    def __init__(
+            self,
+            lvm: LVMInstance,
+            max_age: Optional[float] = None,
+            min_refresh: float = 1.0
+    ) -> None:
+        """A device resolution cache
+
+        Args:
+            lvm (LVMInstance): The lvm instance.
+            max_age (Optional[float], optional): The age in seconds after which
+                the cache is refilled. Defaults to None, for no limit.
+            min_refresh (float, optional): The minimum time in seconds between
+                refills caused by a lookup miss. Defaults to 1.0.
+        """
+        self.lvm = lvm
+        self.max_age = max_age
+        self.min_refresh = min_refresh
+        self._by_device: Dict[DeviceKey, Optional[str]] = {}
+        self._by_pvid: Dict[str, Optional[str]] = {}
+        self._filled: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Refill the cache on the next lookup.
+
+        The resolutions are kept for `lookup` until the cache is refilled.
+        """
+        self._filled = None
+
+    def lookup(self, key: DeviceKey) -> Tuple[bool, Optional[str]]:
+        """Look up a device key in the resolutions of the last refill.
+
+        The library is never used, so this may be called from any thread.
+
+        Args:
+            key (DeviceKey): The major and minor number, or the resolved path.
+
+        Returns:
+            Tuple[bool, Optional[str]]: True if the device was a physical
+                volume, and the name of its volume group if it was in one.
+        """
+        by_device = self._by_device
+        return key in by_device, by_device.get(key)
+
+    def refresh(self) -> None:
+        """Refill the cache from a single pass over the physical volumes"""
+        by_device: Dict[DeviceKey, Optional[str]] = {}
+        by_pvid: Dict[str, Optional[str]] = {}
+
+        for record in self.lvm.pv_records():
+            by_device[device_key(record.name)] = record.vg_name
+            by_pvid[_pvid(record.uuid)] = record.vg_name
+
+        self._by_device = by_device
+        self._by_pvid = by_pvid
+        self._filled = time.monotonic()
+
+    def _ensure_fresh(self, missed: bool) -> bool:
+        now = time.monotonic()
+        # Read once, as the event stream may invalidate from its own thread.
+        filled = self._filled
+        if filled is None or (
+                self.max_age is not None and now - filled > self.max_age
+        ) or (
+                missed and now - filled > self.min_refresh
+        ):
+            self.refresh()
+            return True
+        return False
+
+    def vgname_from_device(self, device: str) -> Optional[str]:
+        """Return the volume group name given a device name
+
+        Args:
+            device (str): The device path, which may be a symbolic link.
+
+        Returns:
+            Optional[str]: The volume group name, or None if the device is not
+                a physical volume in a volume group.
+        """
+        key = device_key(device)
+        refreshed = self._ensure_fresh(False)
+        if key not in self._by_device and not refreshed:
+            self._ensure_fresh(True)
+        return self._by_device.get(key)
+
+    def vgname_from_pvid(self, pvid: str) -> Optional[str]:
+        """Return the volume group name given a PV UUID
+
+        Args:
+            pvid (str): The PV uuid, with or without dashes.
+
+        Returns:
+            Optional[str]: The volume group name, or None if the PV is not in a
+                volume group.
+        """
+        key = _pvid(pvid)
+        refreshed = self._ensure_fresh(False)
+        if key not in self._by_pvid and not refreshed:
+            self._ensure_fresh(True)
+        return self._by_pvid.get(key)
@@ -0,0 +1,66 @@
+"""Single flight request coalescing"""
+
+from concurrent.futures import Future
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls made from threads.
+
+    The first caller for a key runs the call, and callers arriving while it is
+    in flight wait for and share its result. Results should therefore be
+    immutable.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls currently in flight.
+
+        Returns:
+            int: The number of calls.
+        """
+        return len(self._inflight)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Call a function, or wait for the identical call in flight.
+
+        Args:
+            key (Hashable): The key identifying the call.
+            func (Callable[[], Any]): The function to call.
+
+        Returns:
+            Any: The result of the call.
+        """
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.executions += 1
+                future = Future()
+                self._inflight[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+        return future.result()
+
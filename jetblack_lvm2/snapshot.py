@@ -0,0 +1,144 @@
+"""Immutable snapshots"""
+
+from __future__ import annotations
+from typing import Any, Dict, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .volume_group import VolumeGroupInstance  # pylint: disable=cyclic-import
+
+
+class LogicalVolumeSnapshot(NamedTuple):
+    """The state of a logical volume at the time of the snapshot"""
+    name: str
+    uuid: str
+    size: int
+    attr: str
+    is_active: bool
+    is_suspended: bool
+    origin: Optional[str]
+    tags: Tuple[str, ...]
+
+
+class PhysicalVolumeSnapshot(NamedTuple):
+    """The state of a physical volume at the time of the snapshot"""
+    name: str
+    uuid: str
+    mda_count: int
+    dev_size: int
+    size: int
+    free: int
+
+
+class VolumeGroupSnapshot(NamedTuple):
+    """The state of a volume group at the time of the snapshot.
+
+    A snapshot holds no library handles, so it may be shared between threads
+    and kept after the volume group has been closed.
+    """
+    name: str
+    uuid: str
+    seqno: int
+    is_clustered: bool
+    is_exported: bool
+    is_partial: bool
+    size: int
+    free_size: int
+    extent_size: int
+    extent_count: int
+    free_extent_count: int
+    pv_count: int
+    max_pv: int
+    max_lv: int
+    tags: Tuple[str, ...]
+    logical_volumes: Tuple[LogicalVolumeSnapshot, ...]
+    physical_volumes: Tuple[PhysicalVolumeSnapshot, ...]
+
+    @classmethod
+    def take(cls, vg: VolumeGroupInstance) -> VolumeGroupSnapshot:
+        """Take a snapshot of an open volume group.
+
+        Args:
+            vg (VolumeGroupInstance): The volume group.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        return cls(
+            vg.name,
+            vg.uuid,
+            vg.seqno,
+            vg.is_clustered,
+            vg.is_exported,
+            vg.is_partial,
+            vg.size,
+            vg.free_size,
+            vg.extent_size,
+            vg.extent_count,
+            vg.free_extent_count,
+            vg.pv_count,
+            vg.max_pv,
+            vg.max_lv,
+            tuple(vg.tags),
+            tuple(
+                LogicalVolumeSnapshot(
+                    lv.name,
+                    lv.uuid,
+                    lv.size,
+                    lv.attr,
+                    lv.is_active,
+                    lv.is_suspended,
+                    lv.origin,
+                    tuple(lv.tags)
+                )
+                for lv in vg.logical_volumes
+            ),
+            tuple(
+                PhysicalVolumeSnapshot(
+                    pv.name,
+                    pv.uuid,
+                    pv.mda_count,
+                    pv.dev_size,
+                    pv.size,
+                    pv.free
+                )
+                for pv in vg.physical_volumes
+            )
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the snapshot to plain dictionaries and lists.
+
+        Returns:
+            Dict[str, Any]: The snapshot as a dictionary.
+        """
+        values = self._asdict()
+        values['tags'] = list(self.tags)
+        values['logical_volumes'] = [
+            dict(lv._asdict(), tags=list(lv.tags))
+            for lv in self.logical_volumes
+        ]
+        values['physical_volumes'] = [
+            dict(pv._asdict()) for pv in self.physical_volumes
+        ]
+        return dict(values)
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> VolumeGroupSnapshot:
+        """Create a snapshot from the dictionary made by to_dict.
+
+        Args:
+            values (Dict[str, Any]): The snapshot as a dictionary.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        values = dict(values)
+        values['tags'] = tuple(values['tags'])
+        values['logical_volumes'] = tuple(
+            LogicalVolumeSnapshot(**dict(lv, tags=tuple(lv['tags'])))
+            for lv in values['logical_volumes']
+        )
+        values['physical_volumes'] = tuple(
+            PhysicalVolumeSnapshot(**pv) for pv in values['physical_volumes']
+        )
+        return cls(**values)
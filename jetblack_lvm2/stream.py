@@ -0,0 +1,217 @@
+"""Streaming inventory"""
+
+from __future__ import annotations
+from ctypes import cast
+import json
+import struct
+from typing import Any, BinaryIO, Dict, IO, Iterator, Tuple, TYPE_CHECKING
+
+from .bindings import (
+    lvm_vg_get_name,
+    lvm_vg_get_uuid,
+    lvm_vg_get_size,
+    lvm_vg_get_free_size,
+    lvm_vg_get_seqno,
+    lvm_vg_list_lvs,
+    lvm_vg_list_pvs,
+    lvm_lv_get_name,
+    lvm_lv_get_uuid,
+    lvm_lv_get_size,
+    lvm_lv_get_attr,
+    lvm_lv_is_active,
+    lvm_pv_get_name,
+    lvm_pv_get_uuid,
+    lvm_pv_get_size,
+    lvm_pv_get_free,
+    lvm_pv_get_mda_count
+)
+from .types import lvm_lv_list_p, lvm_pv_list_p
+from .utils import _dm_list_iter
+
+if TYPE_CHECKING:
+    from .lvm import LVMInstance  # pylint: disable=cyclic-import
+
+# The fields of each record kind, with 's' for a string and 'Q' for an
+# unsigned 64 bit integer.
+RECORD_FIELDS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    'vg': (
+        ('name', 's'),
+        ('uuid', 's'),
+        ('size', 'Q'),
+        ('free_size', 'Q'),
+        ('seqno', 'Q')
+    ),
+    'lv': (
+        ('vg', 's'),
+        ('name', 's'),
+        ('uuid', 's'),
+        ('attr', 's'),
+        ('size', 'Q'),
+        ('active', 'Q')
+    ),
+    'pv': (
+        ('vg', 's'),
+        ('name', 's'),
+        ('uuid', 's'),
+        ('size', 'Q'),
+        ('free', 'Q'),
+        ('mda_count', 'Q')
+    )
+}
+
+_KIND_CODES = {'vg': b'V', 'lv': b'L', 'pv': b'P'}
+_CODE_KINDS = {code[0]: kind for kind, code in _KIND_CODES.items()}
+
+_LENGTH = struct.Struct('>I')
+_STRING_LENGTH = struct.Struct('>H')
+_UINT64 = struct.Struct('>Q')
+
+
+class RecordWriter:
+    """Write inventory records as newline delimited JSON"""
+
+    def __init__(self, fp: IO) -> None:
+        """Write inventory records as newline delimited JSON
+
+        Args:
+            fp (IO): A text file-like object.
+        """
+        self.fp = fp
+
+    def write(self, kind: str, values: Tuple[Any, ...]) -> None:
+        """Write a record.
+
+        Args:
+            kind (str): The record kind: 'vg', 'lv' or 'pv'.
+            values (Tuple[Any, ...]): The values in the order of RECORD_FIELDS.
+        """
+        record: Dict[str, Any] = {'type': kind}
+        for (name, _), value in zip(RECORD_FIELDS[kind], values):
+            record[name] = value
+        self.fp.write(json.dumps(record, separators=(',', ':')))
+        self.fp.write('\n')
+
+    def flush(self) -> None:
+        """Flush the underlying file"""
+        self.fp.flush()
+
+
+class BinaryRecordWriter(RecordWriter):
+    """Write inventory records as length prefixed binary.
+
+    Each record is a four byte big endian length followed by the payload. The
+    payload is a single byte record kind followed by the fields, where strings
+    are prefixed by a two byte length and integers are eight bytes.
+    """
+
+    def write(self, kind: str, values: Tuple[Any, ...]) -> None:
+        payload = bytearray(_KIND_CODES[kind])
+        for (_, field_type), value in zip(RECORD_FIELDS[kind], values):
+            if field_type == 's':
+                encoded = value.encode('ascii')
+                payload += _STRING_LENGTH.pack(len(encoded))
+                payload += encoded
+            else:
+                payload += _UINT64.pack(value)
+        self.fp.write(_LENGTH.pack(len(payload)))
+        self.fp.write(payload)
+
+
+def _read_exactly(fp: BinaryIO, count: int) -> bytes:
+    buf = fp.read(count)
+    if len(buf) != count:
+        raise EOFError('Truncated inventory record')
+    return buf
+
+
+def read_records(fp: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Read length prefixed binary inventory records.
+
+    Args:
+        fp (BinaryIO): A binary file-like object.
+
+    Raises:
+        EOFError: If a record is truncated.
+
+    Yields:
+        Dict[str, Any]: The records.
+    """
+    while True:
+        header = fp.read(_LENGTH.size)
+        if not header:
+            return
+        if len(header) != _LENGTH.size:
+            raise EOFError('Truncated inventory record')
+        (length,) = _LENGTH.unpack(header)
+        payload = _read_exactly(fp, length)
+        kind = _CODE_KINDS[payload[0]]
+        record: Dict[str, Any] = {'type': kind}
+        offset = 1
+        for name, field_type in RECORD_FIELDS[kind]:
+            if field_type == 's':
+                (size,) = _STRING_LENGTH.unpack_from(payload, offset)
+                offset += _STRING_LENGTH.size
+                record[name] = payload[offset:offset + size].decode('ascii')
+                offset += size
+            else:
+                (record[name],) = _UINT64.unpack_from(payload, offset)
+                offset += _UINT64.size
+        yield record
+
+
+def write_inventory(lvm: LVMInstance, writer: RecordWriter) -> int:
+    """Stream the inventory of the host to a record writer.
+
+    The volume groups are opened one at a time and their logical and physical
+    volumes are written directly from the list handles, so peak memory does
+    not depend on the number of volumes. The writer is flushed after each
+    volume group.
+
+    Args:
+        lvm (LVMInstance): The lvm instance.
+        writer (RecordWriter): The record writer.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    for vg_name in lvm.list_vg_names():
+        with lvm.vg_open(vg_name) as vg:
+            handle = vg.handle
+            name = lvm_vg_get_name(handle).decode('ascii')
+            writer.write('vg', (
+                name,
+                lvm_vg_get_uuid(handle).decode('ascii'),
+                lvm_vg_get_size(handle),
+                lvm_vg_get_free_size(handle),
+                lvm_vg_get_seqno(handle)
+            ))
+            count += 1
+
+            for lv_handle in _dm_list_iter(lvm_vg_list_lvs(handle)):
+                lv = cast(lv_handle, lvm_lv_list_p).contents.lv
+                writer.write('lv', (
+                    name,
+                    lvm_lv_get_name(lv).decode('ascii'),
+                    lvm_lv_get_uuid(lv).decode('ascii'),
+                    lvm_lv_get_attr(lv).decode('ascii'),
+                    lvm_lv_get_size(lv),
+                    1 if lvm_lv_is_active(lv) == 1 else 0
+                ))
+                count += 1
+
+            for pv_handle in _dm_list_iter(lvm_vg_list_pvs(handle)):
+                pv = cast(pv_handle, lvm_pv_list_p).contents.pv
+                writer.write('pv', (
+                    name,
+                    lvm_pv_get_name(pv).decode('ascii'),
+                    lvm_pv_get_uuid(pv).decode('ascii'),
+                    lvm_pv_get_size(pv),
+                    lvm_pv_get_free(pv),
+                    lvm_pv_get_mda_count(pv)
+                ))
+                count += 1
+
+        writer.flush()
+
+    return count
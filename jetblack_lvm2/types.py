@@ -1,6 +1,6 @@
 """Conversion"""
 
-from ctypes import Structure, Union, POINTER, c_char_p, c_uint32, c_int32
+from ctypes import Structure, Union, POINTER, c_char_p, c_uint32, c_uint64, c_int64
 
 # lvm_t
 #
@@ -46,6 +46,15 @@ class logical_volume(Structure):
 
 lv_t = POINTER(logical_volume)
 
+# lv_create_params_t
+#
+# The parameters used to create a logical volume with lvm_lv_create(). They
+# are bound to the vg_t they were created from.
+class lv_create_params(Structure):
+    pass
+
+lv_create_params_t = POINTER(lv_create_params)
+
 # A list consists of a list head plus elements.
 # Each element has 'next' and 'previous' pointers.
 # The list head's pointers point to the first and the last element.
@@ -90,8 +99,8 @@ lvm_lv_list_p = POINTER(lvm_lv_list)
 class _lvm_property_value_union(Union):
     _fields_ = [
         ('string', c_char_p),
-        ('integer', c_uint32),
-        ('signed_integer', c_int32)
+        ('integer', c_uint64),
+        ('signed_integer', c_int64)
     ]
 
 class lvm_property_value(Structure):
@@ -1,7 +1,8 @@
 """LVM"""
 
+from collections import OrderedDict
 from ctypes import cast
-from typing import List
+from typing import Any, Iterator, List, Optional, Union
 
 from .types import (
     lvm_str_list_p
@@ -13,6 +14,32 @@ from .bindings import (
     dm_list_empty
 )
 
+# The most distinct values held in the intern table. Only low cardinality
+# strings such as attributes, tags and device names are interned, and the
+# least recently used are evicted so a long running process keeps interning
+# the values it currently sees.
+_INTERN_LIMIT = 4096
+_interned: 'OrderedDict[bytes, str]' = OrderedDict()
+
+
+def _intern(value: bytes) -> str:
+    text = _interned.get(value)
+    if text is None:
+        text = value.decode('ascii')
+        _interned[value] = text
+        if len(_interned) > _INTERN_LIMIT:
+            try:
+                _interned.popitem(last=False)
+            except KeyError:
+                pass
+    else:
+        try:
+            _interned.move_to_end(value)
+        except KeyError:
+            # Evicted by another thread.
+            pass
+    return text
+
 
 def _dm_list_to_str_list(values) -> List[str]:
     names: List[str] = []
@@ -20,9 +47,33 @@ def _dm_list_to_str_list(values) -> List[str]:
         value = dm_list_first(values)
         while value:
             c = cast(value, lvm_str_list_p)
-            names.append(c.contents.str.decode('ascii'))
+            names.append(_intern(c.contents.str))
             if dm_list_end(values, value):
                 # end of linked list
                 break
             value = dm_list_next(values, value)
     return names
+
+
+def _dm_list_iter(values) -> Iterator[Any]:
+    if not dm_list_empty(values):
+        value = dm_list_first(values)
+        while value:
+            yield value
+            if dm_list_end(values, value):
+                # end of linked list
+                break
+            value = dm_list_next(values, value)
+
+
+def _property_value(value) -> Optional[Union[str, int]]:
+    if not value.is_valid:
+        return None
+    if value.is_string:
+        # Properties include uuids, which are not worth interning.
+        if value.string is None:
+            return None
+        return value.string.decode('ascii')
+    if value.is_signed:
+        return value.signed_integer
+    return value.integer
@@ -3,7 +3,7 @@
 from __future__ import annotations
 from abc import ABCMeta, abstractmethod
 from ctypes import cast, c_ulong, c_ulonglong
-from typing import Any, Callable, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 from .types import lvm_pv_list_p, lvm_lv_list_p
 from .bindings import (
@@ -36,33 +36,84 @@ from .bindings import (
     lvm_vg_list_lvs,
     lvm_vg_create_lv_linear,
     lvm_lv_from_name,
+    lvm_lv_from_uuid,
+    lvm_lv_params_create_thin,
+    lvm_lv_create,
     dm_list_empty,
     dm_list_first,
     dm_list_next,
     dm_list_end
 )
-from .exceptions import LVMException
+from .columns import LogicalVolumeColumns
+from .context import VolumeGroupContext
+from .deadline import supervisor
+from .exceptions import (
+    LVMClosedError,
+    LVMException,
+    LVMOwnershipError,
+    LVMPlacementError
+)
+from .journal import Journal
 from .logical_volume import LogicalVolume
+from .ownership import HandleGuard
 from .physical_volume import PhysicalVolume
-from .utils import _dm_list_to_str_list
+from .placement import (
+    Placement,
+    PlacedVolume,
+    PlacementPolicy,
+    actual_placement,
+    capacities
+)
+from .predicates import Field, Predicate
+from .query import Query
+from .snapshot import VolumeGroupSnapshot
+from .utils import _dm_list_to_str_list, _dm_list_iter
 
 
 class VolumeGroupInstance:
     """A volume group instance"""
 
+    __slots__ = ('_context',)
+
     def __init__(
             self,
             handle: Any,
-            create_exception: Callable[[], LVMException]
+            create_exception: Callable[[], LVMException],
+            journal: Optional[Journal] = None,
+            guard: Optional[HandleGuard] = None,
+            lvm_handle: Optional[Any] = None
     ) -> None:
         """A volume group instance
 
         Args:
             handle(Any): The volume group handle
             create_exception(Callable[[], LVMException]): An exception factory.
+            journal(Optional[Journal], optional): The journal recording
+                metadata changes. Defaults to None.
+            guard(Optional[HandleGuard], optional): The guard of the owning
+                lvm handle. Defaults to None.
+            lvm_handle(Optional[Any], optional): The owning lvm handle.
+                Defaults to None.
         """
-        self._create_exception = create_exception
-        self.handle: Any = handle
+        self._context = VolumeGroupContext(
+            handle, create_exception, journal, guard, lvm_handle)
+
+    @property
+    def handle(self) -> Any:
+        """The volume group handle.
+
+        Raises:
+            LVMClosedError: If the volume group has been closed.
+            LVMOwnershipError: If another thread owns the handle.
+
+        Returns:
+            Any: The handle.
+        """
+        self._context.check()
+        return self._context.handle
+
+    def _invalidate(self) -> None:
+        self._context.close()
 
     @property
     def name(self) -> str:
@@ -71,8 +122,7 @@ class VolumeGroupInstance:
         Returns:
             str: The name
         """
-        name = lvm_vg_get_name(self.handle)
-        return name.decode('ascii')
+        return self._context.cached_string(self.handle, 'name', lvm_vg_get_name)
 
     @property
     def is_clustered(self) -> bool:
@@ -121,8 +171,7 @@ class VolumeGroupInstance:
         Returns:
             str: The uuid string.
         """
-        uuid = lvm_vg_get_uuid(self.handle)
-        return uuid.decode('ascii')
+        return self._context.cached_string(self.handle, 'uuid', lvm_vg_get_uuid)
 
     @property
     def size(self) -> int:
@@ -153,9 +202,10 @@ class VolumeGroupInstance:
 
     @extent_size.setter
     def extent_size(self, value: int) -> None:
-        retcode = lvm_vg_set_extent_size(self.handle, c_ulong(value))
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('set_extent_size', (value,)):
+            retcode = lvm_vg_set_extent_size(self.handle, c_ulong(value))
+            if retcode != 0:
+                raise self._context.create_exception()
 
     @property
     def extent_count(self) -> int:
@@ -214,7 +264,7 @@ class VolumeGroupInstance:
         """
         tags = lvm_vg_get_tags(self.handle)
         if not bool(tags):
-            raise self._create_exception()
+            raise self._context.create_exception()
         return _dm_list_to_str_list(tags)
 
     def add_tag(self, tag: str) -> None:
@@ -231,9 +281,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_add_tag(self.handle, tag.encode('ascii'))
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('add_tag', (tag,)):
+            retcode = lvm_vg_add_tag(self.handle, tag.encode('ascii'))
+            if retcode != 0:
+                raise self._context.create_exception()
 
     def remove_tag(self, tag: str) -> None:
         """Remove a tag from a VG.
@@ -249,9 +300,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_remove_tag(self.handle, tag.encode('ascii'))
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('remove_tag', (tag,)):
+            retcode = lvm_vg_remove_tag(self.handle, tag.encode('ascii'))
+            if retcode != 0:
+                raise self._context.create_exception()
 
     def write(self) -> None:
         """Write a VG to disk.
@@ -263,9 +315,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_write(self.handle)
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('write', ()):
+            retcode = lvm_vg_write(self.handle)
+            if retcode != 0:
+                raise self._context.create_exception()
 
     def remove(self):
         """Remove a VG from the system.
@@ -276,9 +329,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_remove(self.handle)
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('remove', ()):
+            retcode = lvm_vg_remove(self.handle)
+            if retcode != 0:
+                raise self._context.create_exception()
 
     def extend(self, device: str) -> None:
         """Extend a VG by adding a device.
@@ -289,9 +343,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_extend(self.handle, device.encode('ascii'))
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('extend', (device,)):
+            retcode = lvm_vg_extend(self.handle, device.encode('ascii'))
+            if retcode != 0:
+                raise self._context.create_exception()
 
     def reduce(self, device: str) -> None:
         """Reduce a VG by removing an unused device.
@@ -302,9 +357,10 @@ class VolumeGroupInstance:
         Raises:
             LVMException: If the operation failed.
         """
-        retcode = lvm_vg_reduce(self.handle, device.encode('ascii'))
-        if retcode != 0:
-            raise self._create_exception()
+        with self._context.journal_entry('reduce', (device,)):
+            retcode = lvm_vg_reduce(self.handle, device.encode('ascii'))
+            if retcode != 0:
+                raise self._context.create_exception()
 
     @property
     def physical_volumes(self) -> List[PhysicalVolume]:
@@ -319,7 +375,7 @@ class VolumeGroupInstance:
             pv_handle = dm_list_first(pv_handles)
             while pv_handle:
                 ptr = cast(pv_handle, lvm_pv_list_p)
-                volume = PhysicalVolume(ptr.contents.pv)
+                volume = PhysicalVolume(ptr.contents.pv, self._context)
                 pv_list.append(volume)
                 if dm_list_end(pv_handles, pv_handle):
                     # end of linked list
@@ -341,7 +397,7 @@ class VolumeGroupInstance:
             lv_handle = dm_list_first(lv_handles)
             while lv_handle:
                 ptr = cast(lv_handle, lvm_lv_list_p)
-                volume = LogicalVolume(ptr.contents.lv, self._create_exception)
+                volume = LogicalVolume(ptr.contents.lv, self._context)
                 lv_list.append(volume)
                 if dm_list_end(lv_handles, lv_handle):
                     # end of linked list
@@ -350,6 +406,121 @@ class VolumeGroupInstance:
 
         return lv_list
 
+    @property
+    def lv_tag_index(self) -> Dict[str, List[LogicalVolume]]:
+        """An index from tag to the logical volumes carrying the tag.
+
+        The index is built in a single pass over the logical volume list and
+        is cached against the metadata sequence number. Adding or removing a
+        logical volume tag discards it, as the sequence number only changes
+        when the volume group is written.
+
+        Raises:
+            LVMException: If the tags of a logical volume could not be obtained.
+
+        Returns:
+            Dict[str, List[LogicalVolume]]: The logical volumes by tag.
+        """
+        seqno = self.seqno
+        cached: Optional[Tuple[int, Dict[str, List[LogicalVolume]]]] = \
+            self._context.cache.get('lv_tag_index')
+        if cached is not None and cached[0] == seqno:
+            return cached[1]
+
+        index: Dict[str, List[LogicalVolume]] = {}
+        for lv_handle in _dm_list_iter(lvm_vg_list_lvs(self.handle)):
+            ptr = cast(lv_handle, lvm_lv_list_p)
+            volume = LogicalVolume(ptr.contents.lv, self._context)
+            for tag in volume.tags:
+                index.setdefault(tag, []).append(volume)
+
+        self._context.cache['lv_tag_index'] = (seqno, index)
+        return index
+
+    def lvs_with_tag(self, tag: str) -> List[LogicalVolume]:
+        """Find the logical volumes with a given tag.
+
+        Args:
+            tag (str): The tag to look up.
+
+        Returns:
+            List[LogicalVolume]: The logical volumes carrying the tag.
+        """
+        return list(self.lv_tag_index.get(tag, []))
+
+    def lv_columns(
+            self,
+            columns: Optional[LogicalVolumeColumns] = None
+    ) -> LogicalVolumeColumns:
+        """Export the logical volumes of this volume group as columns.
+
+        Args:
+            columns (Optional[LogicalVolumeColumns], optional): Columns to
+                append to. Defaults to None.
+
+        Returns:
+            LogicalVolumeColumns: The columns.
+        """
+        if columns is None:
+            columns = LogicalVolumeColumns()
+        vg_name = lvm_vg_get_name(self.handle)
+        for lv_handle in _dm_list_iter(lvm_vg_list_lvs(self.handle)):
+            ptr = cast(lv_handle, lvm_lv_list_p)
+            columns.append(vg_name, ptr.contents.lv)
+        return columns
+
+    def select(
+            self,
+            where: Optional[Union[Predicate, Field, Query]] = None,
+            fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Select logical volumes matching a condition.
+
+        The condition is evaluated while the logical volume list is walked,
+        reading only the values it needs, for example:
+
+            vg.select(
+                where=(lv.size > 10 * GiB) & lv.active & lv.tag('tenant-a'),
+                fields=['name', 'size']
+            )
+
+        Args:
+            where (Optional[Union[Predicate, Field, Query]], optional): The
+                condition, or a query compiled in advance. Defaults to None,
+                to select every logical volume.
+            fields (Optional[Sequence[str]], optional): The names of the
+                fields to return. Defaults to None, for the default fields.
+
+        Raises:
+            ValueError: If fields are given with a compiled query, or a
+                field name is unknown.
+
+        Returns:
+            List[Dict[str, Any]]: The selected fields of the matching logical
+                volumes.
+        """
+        if isinstance(where, Query):
+            if fields is not None:
+                raise ValueError('The fields of a compiled query are fixed')
+            query = where
+        else:
+            query = Query(where, fields)
+
+        rows: List[Dict[str, Any]] = []
+        for lv_handle in _dm_list_iter(lvm_vg_list_lvs(self.handle)):
+            row = query.match(cast(lv_handle, lvm_lv_list_p).contents.lv)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def snapshot(self) -> VolumeGroupSnapshot:
+        """Take an immutable snapshot of the volume group.
+
+        Returns:
+            VolumeGroupSnapshot: The snapshot.
+        """
+        return VolumeGroupSnapshot.take(self)
+
     def lv_from_name(self, name: str) -> LogicalVolume:
         """Lookup an LV handle in a VG by the LV name.
 
@@ -362,10 +533,56 @@ class VolumeGroupInstance:
         Returns:
             LogicalVolume: The logical volume
         """
-        handle = lvm_lv_from_name(self.handle, name)
+        handle = lvm_lv_from_name(self.handle, name.encode('ascii'))
         if not handle:
-            raise self._create_exception()
-        return LogicalVolume(handle, self._create_exception)
+            raise self._context.create_exception()
+        return LogicalVolume(handle, self._context)
+
+    def try_lv_from_name(self, name: str) -> Optional[LogicalVolume]:
+        """Lookup an LV handle in a VG by the LV name without raising.
+
+        This is intended for existence checks, as no exception is built when
+        the volume is not found.
+
+        Args:
+            name(str): The name of the logical volume.
+
+        Returns:
+            Optional[LogicalVolume]: The logical volume, or None if it could
+                not be obtained.
+        """
+        handle = lvm_lv_from_name(self.handle, name.encode('ascii'))
+        return LogicalVolume(handle, self._context) if handle else None
+
+    def lv_from_uuid(self, uuid: str) -> LogicalVolume:
+        """Lookup an LV handle in a VG by the LV uuid.
+
+        Args:
+            uuid(str): The uuid of the logical volume.
+
+        Raises:
+            LVMException: If the volume could not be obtained.
+
+        Returns:
+            LogicalVolume: The logical volume
+        """
+        handle = lvm_lv_from_uuid(self.handle, uuid.encode('ascii'))
+        if not handle:
+            raise self._context.create_exception()
+        return LogicalVolume(handle, self._context)
+
+    def try_lv_from_uuid(self, uuid: str) -> Optional[LogicalVolume]:
+        """Lookup an LV handle in a VG by the LV uuid without raising.
+
+        Args:
+            uuid(str): The uuid of the logical volume.
+
+        Returns:
+            Optional[LogicalVolume]: The logical volume, or None if it could
+                not be obtained.
+        """
+        handle = lvm_lv_from_uuid(self.handle, uuid.encode('ascii'))
+        return LogicalVolume(handle, self._context) if handle else None
 
     def create_lv_linear(self, name: str, size: int) -> LogicalVolume:
         """Create a linear logical volume.
@@ -383,14 +600,120 @@ class VolumeGroupInstance:
         Returns:
             LogicalVolume: The logical volume created
         """
-        handle = lvm_vg_create_lv_linear(
-            self.handle,
-            name.encode('ascii'),
-            c_ulonglong(size)
+        with self._context.journal_entry('create_lv_linear', (name, size)):
+            handle = lvm_vg_create_lv_linear(
+                self.handle,
+                name.encode('ascii'),
+                c_ulonglong(size)
+            )
+            if not handle:
+                raise self._context.create_exception()
+        return LogicalVolume(handle, self._context)
+
+    def plan_lv(self, size: int, policy: PlacementPolicy) -> Placement:
+        """Plan the placement of a new logical volume.
+
+        Args:
+            size (int): The size of the logical volume in bytes.
+            policy (PlacementPolicy): The placement policy.
+
+        Raises:
+            LVMNoSpaceError: If the policy cannot find enough free space.
+            LVMNotFoundError: If a pinned device is not in the volume group.
+
+        Returns:
+            Placement: The placement.
+        """
+        extent_size = self.extent_size
+        return policy.plan(
+            capacities(self.physical_volumes, extent_size),
+            size,
+            extent_size
         )
-        if not handle:
-            raise self._create_exception()
-        return LogicalVolume(handle, self._create_exception)
+
+    def create_lv(
+            self,
+            name: str,
+            size: int,
+            policy: PlacementPolicy
+    ) -> PlacedVolume:
+        """Create a linear logical volume placed by a policy.
+
+        The library chooses the physical volumes itself, so the placement is
+        planned first to check there is room where the policy wants it, and
+        the extents taken from each physical volume are read afterwards. The
+        library may not follow the plan of a policy such as LeastUtilised or
+        Spread, so check PlacedVolume.as_planned. A strict policy removes the
+        logical volume if it was allocated outside the planned devices. Use
+        Placement.lvcreate_args to have the command line tools allocate on
+        exactly the planned devices.
+
+        Args:
+            name (str): The name of the logical volume.
+            size (int): The size of the logical volume in bytes.
+            policy (PlacementPolicy): The placement policy.
+
+        Raises:
+            LVMNoSpaceError: If the policy cannot find enough free space.
+            LVMPlacementError: If a strict policy was not respected.
+            LVMException: If the logical volume could not be created.
+
+        Returns:
+            PlacedVolume: The logical volume created, with its planned and
+                actual placement.
+        """
+        extent_size = self.extent_size
+        before = capacities(self.physical_volumes, extent_size)
+        planned = policy.plan(before, size, extent_size)
+
+        volume = self.create_lv_linear(name, size)
+
+        after = capacities(self.physical_volumes, extent_size)
+        actual = actual_placement(before, after, extent_size)
+        if policy.strict:
+            outside = set(actual.devices) - set(planned.devices)
+            if outside:
+                volume.remove()
+                raise LVMPlacementError(name, outside)
+
+        return PlacedVolume(volume, planned, actual)
+
+    def create_lv_thin(self, pool: str, name: str, size: int) -> LogicalVolume:
+        """Create a thin logical volume in a thin pool.
+
+        This function commits the change to disk and does _not_ require calling
+        write.
+
+        Args:
+            pool (str): The name of the thin pool.
+            name (str): The name of the logical volume.
+            size (int): The virtual size of the logical volume in bytes.
+
+        Raises:
+            LVMException: If the operation was unsuccessful.
+
+        Returns:
+            LogicalVolume: The logical volume created.
+        """
+        with self._context.journal_entry('create_lv_thin', (pool, name, size)):
+            params = lvm_lv_params_create_thin(
+                self.handle,
+                pool.encode('ascii'),
+                name.encode('ascii'),
+                size
+            )
+            if not params:
+                raise self._context.create_exception()
+            handle = lvm_lv_create(params)
+            if not handle:
+                raise self._context.create_exception()
+        return LogicalVolume(handle, self._context)
+
+
+def _close_late(handle: Any) -> None:
+    # A volume group opened after its deadline has no owner to close it.
+    if handle:
+        lvm_vg_close(handle)
 
 
 class VolumeGroupContextManager(metaclass=ABCMeta):
@@ -400,7 +723,9 @@ class VolumeGroupContextManager(metaclass=ABCMeta):
             self,
             lvm_handle: Any,
             create_exception: Callable[[], LVMException],
-            name: str
+            name: str,
+            journal: Optional[Journal] = None,
+            guard: Optional[HandleGuard] = None
     ) -> None:
         """The volume group context manager
 
@@ -408,21 +733,59 @@ class VolumeGroupContextManager(metaclass=ABCMeta):
             lvm_handle (Any): The lvm handle
             create_exception (Callable[[], LVMException]): An exception factory
             name (str): The volume group name.
+            journal (Optional[Journal], optional): The journal recording
+                metadata changes. Defaults to None.
+            guard (Optional[HandleGuard], optional): The guard of the lvm
+                handle. Defaults to None.
         """
         self.lvm_handle = lvm_handle
         self._create_exception = create_exception
         self.name = name
+        self.journal = journal
+        self.guard = guard
         self.handle: Optional[Any] = None
+        self.instance: Optional[VolumeGroupInstance] = None
 
     @abstractmethod
     def __enter__(self) -> VolumeGroupInstance:
         ...
 
+    def _open(self, handle: Any) -> VolumeGroupInstance:
+        self.handle = handle
+        if not self.handle:
+            raise self._create_exception()
+        self.instance = VolumeGroupInstance(
+            self.handle,
+            self._create_exception,
+            self.journal,
+            self.guard,
+            self.lvm_handle
+        )
+        return self.instance
+
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         if self.handle:
-            retcode = lvm_vg_close(self.handle)
+            if self.instance is not None:
+                # Wrappers kept after the close fail rather than use freed
+                # memory.
+                self.instance._invalidate()  # pylint: disable=protected-access
+            handle, self.handle = self.handle, None
+            guard = self.guard
+            if guard is not None and guard.closed:
+                # The handle was freed when the lvm handle was quit.
+                if exc_type is None:
+                    raise LVMClosedError(guard.name)
+                return
+            # Close from whichever thread exits, so the handle and its lock are
+            # never leaked, and only then report the use from another thread.
+            owned = guard is None or guard.is_owner()
+            retcode = lvm_vg_close(handle)
+            if exc_type is not None:
+                return
             if retcode != 0:
                 raise self._create_exception()
+            if not owned:
+                raise LVMOwnershipError(guard.name, guard.owner)
 
 
 class VolumeGroupOpen(VolumeGroupContextManager):
@@ -434,7 +797,10 @@ class VolumeGroupOpen(VolumeGroupContextManager):
             create_exception: Callable[[], LVMException],
             name: str,
             mode: str = "r",
-            flags: int = 0
+            flags: int = 0,
+            timeout: Optional[float] = None,
+            journal: Optional[Journal] = None,
+            guard: Optional[HandleGuard] = None
     ) -> None:
         """The volume group context manager for an existing volume group
 
@@ -445,32 +811,36 @@ class VolumeGroupOpen(VolumeGroupContextManager):
             mode (str, optional): The mode in which to open the volume group.
                 Defaults to "r".
             flags (int, optional): The flags to use. Defaults to 0.
+            timeout (Optional[float], optional): The time in seconds to wait
+                for the volume group to open. Defaults to None, for no limit.
+            journal (Optional[Journal], optional): The journal recording
+                metadata changes. Defaults to None.
+            guard (Optional[HandleGuard], optional): The guard of the lvm
+                handle. Defaults to None.
         """
-        super().__init__(lvm_handle, create_exception, name)
+        super().__init__(lvm_handle, create_exception, name, journal, guard)
         self.mode = mode
         self.flags = flags
+        self.timeout = timeout
         self.handle: Optional[Any] = None
 
     def __enter__(self) -> VolumeGroupInstance:
-        self.handle = lvm_vg_open(
-            self.lvm_handle,
-            self.name.encode('ascii'),
-            self.mode.encode('ascii'),
-            self.flags
-        )
-        if not self.handle:
-            raise self._create_exception()
-        return VolumeGroupInstance(self.handle, self._create_exception)
+        name = self.name.encode('ascii')
+        mode = self.mode.encode('ascii')
+        return self._open(supervisor.call(
+            'VolumeGroupOpen.__enter__',
+            self.guard,
+            lambda: lvm_vg_open(self.lvm_handle, name, mode, self.flags),
+            self.timeout,
+            on_late_result=_close_late
+        ))
 
 
 class VolumeGroupCreate(VolumeGroupContextManager):
     """The volume group context manager for creating a new volume group"""
 
     def __enter__(self) -> VolumeGroupInstance:
-        self.handle = lvm_vg_create(
+        return self._open(lvm_vg_create(
             self.lvm_handle,
             self.name.encode('ascii')
-        )
-        if not self.handle:
-            raise self._create_exception()
-        return VolumeGroupInstance(self.handle, self._create_exception)
+        ))
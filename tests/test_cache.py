@@ -0,0 +1,98 @@
+"""Tests for the inventory cache"""
+
+import pytest
+
+from jetblack_lvm2.cache import (
+    CachedInventory,
+    InventoryCache,
+    _LENGTH,
+    _MAGIC
+)
+from jetblack_lvm2.fake import FakeEngine, FakeLVM
+from jetblack_lvm2.protocol import encode
+
+MiB = 1024 * 1024
+
+
+def test_save_and_load(tmp_path) -> None:
+    engine = FakeEngine()
+    engine.add_device('/dev/sda', 64 * MiB)
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_create('vg0') as vg:
+            vg.extend('/dev/sda')
+            vg.write()
+            vg.create_lv_linear('lv0', 4 * MiB)
+        snapshot = lvm.vg_snapshot('vg0')
+
+    path = str(tmp_path / 'inventory')
+    InventoryCache(path).save([snapshot])
+    assert [p.name for p in tmp_path.iterdir()] == ['inventory']
+
+    cache = InventoryCache(path)
+    assert cache.load()
+    assert cache.get(snapshot.uuid) == snapshot
+    cache.close()
+
+
+@pytest.mark.parametrize('index', [5, [[1, 2]], {'a': 1}, [5]])
+def test_load_rejects_a_wrong_shaped_index(tmp_path, index) -> None:
+    path = tmp_path / 'inventory'
+    encoded = encode(index)
+    path.write_bytes(_MAGIC + _LENGTH.pack(len(encoded)) + encoded)
+    cache = InventoryCache(str(path))
+    assert not cache.load()
+    assert cache.entries == {}
+
+
+def _engine_with(*names: str) -> FakeEngine:
+    engine = FakeEngine()
+    with FakeLVM(engine) as lvm:
+        for index, name in enumerate(names):
+            device = f'/dev/sd{chr(ord("a") + index)}'
+            engine.add_device(device, 64 * MiB)
+            with lvm.vg_create(name) as vg:
+                vg.extend(device)
+                vg.write()
+    return engine
+
+
+class _ListsRemoved:
+    """An lvm instance listing a volume group which has been removed"""
+
+    def __init__(self, lvm) -> None:
+        self.lvm = lvm
+
+    def list_vg_names(self):
+        return self.lvm.list_vg_names() + ['removed']
+
+    def vg_open(self, name):
+        return self.lvm.vg_open(name)
+
+
+def test_background_refresh_opens_a_handle(tmp_path, monkeypatch) -> None:
+    engine = _engine_with('vg0', 'vg1')
+    opened = []
+
+    def open_lvm(_inventory):
+        opened.append(True)
+        return FakeLVM(engine)
+
+    monkeypatch.setattr(CachedInventory, '_open_lvm', open_lvm)
+    inventory = CachedInventory(None, str(tmp_path / 'inventory'))
+    inventory.start()
+    assert inventory.join(5)
+    assert inventory.error is None
+    assert opened == [True]
+    assert sorted(inventory.names) == ['vg0', 'vg1']
+
+    reloaded = CachedInventory(None, str(tmp_path / 'inventory'))
+    assert sorted(reloaded.names) == ['vg0', 'vg1']
+
+
+def test_refresh_skips_a_removed_volume_group(tmp_path) -> None:
+    engine = _engine_with('vg0')
+    inventory = CachedInventory(None, str(tmp_path / 'inventory'))
+    with FakeLVM(engine) as lvm:
+        # pylint: disable=protected-access
+        assert inventory._refresh(_ListsRemoved(lvm)) == 1
+    assert inventory.names == ['vg0']
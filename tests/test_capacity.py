@@ -0,0 +1,64 @@
+"""Tests for the capacity history"""
+
+import pytest
+
+from jetblack_lvm2.capacity import CapacityHistory, CapacityRing
+
+
+def test_growth_and_time_to_full() -> None:
+    ring = CapacityRing(10)
+    for t in range(5):
+        ring.append(t * 60, 1000, 100 + t * 60)
+    forecast = ring.forecast('vg0')
+    assert forecast.samples == 5
+    assert forecast.growth_rate == pytest.approx(1.0)
+    assert forecast.time_to_full == pytest.approx(660.0)
+
+
+def test_wrapped_ring_matches_a_fresh_fit() -> None:
+    ring = CapacityRing(4)
+    for t in range(10):
+        ring.append(t, 100, t * t)
+    fresh = CapacityRing(4)
+    for t in range(6, 10):
+        fresh.append(t, 100, t * t)
+    assert ring.samples() == fresh.samples()
+    assert ring.forecast('a').growth_rate == fresh.forecast('a').growth_rate
+
+
+def test_window() -> None:
+    ring = CapacityRing(8)
+    for t in range(12):
+        ring.append(t, 100, 0 if t < 9 else (t - 8) * 10)
+    forecast = ring.forecast('a', window=2)
+    assert forecast.samples == 3
+    assert forecast.growth_rate == pytest.approx(10.0)
+
+
+def test_no_growth() -> None:
+    history = CapacityHistory(4)
+    history.record('shrinking', 0, 100, 50)
+    history.record('shrinking', 1, 100, 40)
+    history.record('growing', 0, 100, 10)
+    history.record('growing', 1, 100, 20)
+    forecasts = history.forecast()
+    assert [forecast.key for forecast in forecasts] == ['growing', 'shrinking']
+    assert forecasts[1].time_to_full is None
+
+
+def test_ordered_past_the_newest_is_empty() -> None:
+    ring = CapacityRing(4)
+    for t in range(6):
+        ring.append(t, 100, t)
+    # pylint: disable=protected-access
+    assert len(ring._ordered(ring.times, 4)) == 0
+    assert list(ring._ordered(ring.times, 3)) == [5]
+
+
+def test_negative_window_is_refused() -> None:
+    ring = CapacityRing(4)
+    ring.append(0, 100, 0)
+    with pytest.raises(ValueError):
+        ring.forecast('a', window=-1)
+    with pytest.raises(ValueError):
+        CapacityHistory(4).forecast(window=-1)
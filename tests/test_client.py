@@ -0,0 +1,29 @@
+"""Tests for the daemon client"""
+
+import socket
+
+import pytest
+
+from jetblack_lvm2.client import RemoteLVMInstance
+from jetblack_lvm2.exceptions import LVMException
+from jetblack_lvm2.protocol import recv_frame, send_frame
+
+
+def test_an_unread_request_raises_the_daemon_error() -> None:
+    client_sock, daemon_sock = socket.socketpair()
+    with client_sock, daemon_sock:
+        # The daemon answers a request it cannot read without an id.
+        send_frame(daemon_sock, [None, False, [-1, 'Malformed request']])
+        with pytest.raises(LVMException) as error:
+            RemoteLVMInstance(client_sock).call('list_vg_names')
+        assert error.value.msg == 'Malformed request'
+        assert recv_frame(daemon_sock) == [0, 'list_vg_names', []]
+
+
+def test_a_response_for_another_request_is_out_of_sequence() -> None:
+    client_sock, daemon_sock = socket.socketpair()
+    with client_sock, daemon_sock:
+        send_frame(daemon_sock, [7, True, []])
+        with pytest.raises(LVMException) as error:
+            RemoteLVMInstance(client_sock).call('list_vg_names')
+        assert error.value.msg == 'Response out of sequence'
@@ -0,0 +1,58 @@
+"""Tests for the columnar inventory"""
+
+from ctypes.util import find_library
+
+import pytest
+
+if find_library('lvm2app') is None:
+    pytest.skip('liblvm2app is not installed', allow_module_level=True)
+
+# pylint: disable=wrong-import-position
+from jetblack_lvm2.columns import (
+    LogicalVolumeColumns,
+    _DictionaryColumn,
+    _StringColumn
+)
+
+
+def test_string_column() -> None:
+    column = _StringColumn()
+    for value in (b'lv0', b'', b'lv-long-name'):
+        column.append(value)
+    assert list(column.offsets) == [0, 3, 3, 15]
+    assert [column[index] for index in range(3)] == ['lv0', '', 'lv-long-name']
+
+
+def test_dictionary_column_interns() -> None:
+    column = _DictionaryColumn()
+    for value in (b'vg0', b'vg1', b'vg0', b'vg0'):
+        column.append(value)
+    assert column.table == ['vg0', 'vg1']
+    assert list(column.codes) == [0, 1, 0, 0]
+    assert column[2] == 'vg0'
+
+
+def test_string_columns_are_ascii() -> None:
+    column = _StringColumn()
+    column.append('lvé'.encode('utf-8'))
+    with pytest.raises(UnicodeDecodeError):
+        column[0]  # pylint: disable=pointless-statement
+
+
+def test_row() -> None:
+    columns = LogicalVolumeColumns()
+    columns.vg.append(b'vg0')
+    columns.name.append(b'lv0')
+    columns.uuid.append(b'uuid-lv0')
+    columns.attr.append(b'-wi-a-----')
+    columns.size.append(4 * 1024 * 1024)
+    columns.active.append(1)
+    assert len(columns) == 1
+    assert columns.row(0) == {
+        'vg': 'vg0',
+        'name': 'lv0',
+        'uuid': 'uuid-lv0',
+        'attr': '-wi-a-----',
+        'size': 4 * 1024 * 1024,
+        'active': True
+    }
@@ -0,0 +1,42 @@
+"""Tests for deadlines on blocking calls"""
+
+import threading
+
+import pytest
+
+from jetblack_lvm2.deadline import Supervisor
+from jetblack_lvm2.exceptions import LVMQuarantinedError, LVMTimeoutError
+from jetblack_lvm2.ownership import HandleGuard
+
+
+def test_quarantine_lasts_until_the_call_returns() -> None:
+    supervisor = Supervisor()
+    guard = HandleGuard('lvm')
+    release = threading.Event()
+    returned = threading.Event()
+    late = []
+
+    def on_late_result(result) -> None:
+        late.append((result, guard.quarantined))
+        returned.set()
+
+    with pytest.raises(LVMTimeoutError):
+        supervisor.call(
+            'scan',
+            guard,
+            lambda: release.wait() and 42,
+            0.01,
+            on_late_result
+        )
+
+    with pytest.raises(LVMQuarantinedError):
+        guard.check()
+    with pytest.raises(LVMQuarantinedError):
+        supervisor.call('scan', guard, lambda: 1, None)
+
+    release.set()
+    assert returned.wait(5)
+    assert late == [(42, 1)]
+    guard.check()
+    assert supervisor.call('scan', guard, lambda: 1, 1.0) == 1
+    assert supervisor.timings[0].elapsed is not None
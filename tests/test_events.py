@@ -0,0 +1,289 @@
+"""Tests for the udev event stream"""
+
+import os
+import struct
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from jetblack_lvm2.events import (
+    ACTIVATED,
+    ADDED,
+    CHANGED,
+    DEACTIVATED,
+    EventMapper,
+    LogicalVolumeEvent,
+    PhysicalVolumeEvent,
+    StreamSource,
+    parse_uevent,
+    split_dm_name
+)
+
+# Recorded with `udevadm monitor --udev --property`.
+ACTIVATE_LV = b"""\
+monitor will print the received events for:
+UDEV - the event which udev sends out after rule processing
+
+UDEV  [5081.212417] change   /devices/virtual/block/dm-2 (block)
+ACTION=change
+DEVPATH=/devices/virtual/block/dm-2
+SUBSYSTEM=block
+DM_COOKIE=6308019
+DEVNAME=/dev/dm-2
+DEVTYPE=disk
+DISKSEQ=14
+SEQNUM=3937
+MAJOR=253
+MINOR=2
+DM_UDEV_PRIMARY_SOURCE_FLAG=1
+DM_ACTIVATION=1
+DM_NAME=vg--data-lv0
+DM_UUID=LVM-Xf3BgHqv1w2JkR0tYv7Zc9sdEo4QmNaLk8PpW6uTr5yHcD2sVbGfJx1nMeKo
+DM_SUSPENDED=0
+DM_VG_NAME=vg-data
+DM_LV_NAME=lv0
+DM_LV_LAYER=
+ID_FS_TYPE=ext4
+USEC_INITIALIZED=5081208121
+
+"""
+
+CHANGE_LV = b"""\
+UDEV  [5090.004411] change   /devices/virtual/block/dm-2 (block)
+ACTION=change
+DEVPATH=/devices/virtual/block/dm-2
+SUBSYSTEM=block
+DEVNAME=/dev/dm-2
+DEVTYPE=disk
+SEQNUM=3951
+MAJOR=253
+MINOR=2
+DM_NAME=vg--data-lv0
+DM_UUID=LVM-Xf3BgHqv1w2JkR0tYv7Zc9sdEo4QmNaLk8PpW6uTr5yHcD2sVbGfJx1nMeKo
+DM_VG_NAME=vg-data
+DM_LV_NAME=lv0
+
+"""
+
+REMOVE_LV = b"""\
+UDEV  [5102.551237] remove   /devices/virtual/block/dm-2 (block)
+ACTION=remove
+DEVPATH=/devices/virtual/block/dm-2
+SUBSYSTEM=block
+DEVNAME=/dev/dm-2
+DEVTYPE=disk
+SEQNUM=3960
+MAJOR=253
+MINOR=2
+
+"""
+
+THIN_POOL_LAYER = b"""\
+UDEV  [5110.120034] change   /devices/virtual/block/dm-5 (block)
+ACTION=change
+DEVPATH=/devices/virtual/block/dm-5
+SUBSYSTEM=block
+DEVNAME=/dev/dm-5
+SEQNUM=3971
+MAJOR=253
+MINOR=5
+DM_NAME=vg--data-pool0_tdata
+DM_UUID=LVM-Xf3BgHqv1w2JkR0tYv7Zc9sdEo4QmNaLpQ7rT2vBn8sKd4HjW1eXy6Zc-tdata
+DM_VG_NAME=vg-data
+DM_LV_NAME=pool0
+DM_LV_LAYER=tdata
+
+"""
+
+ADD_DISK = b"""\
+UDEV  [5120.884190] add      /devices/pci0000:00/0000:00:1f.2/ata2/host1/\
+target1:0:0/1:0:0:0/block/sdb (block)
+ACTION=add
+DEVPATH=/devices/pci0000:00/0000:00:1f.2/ata2/host1/target1:0:0/1:0:0:0/\
+block/sdb
+SUBSYSTEM=block
+DEVNAME=/dev/sdb
+DEVTYPE=disk
+SEQNUM=3980
+MAJOR=8
+MINOR=16
+ID_FS_TYPE=LVM2_member
+ID_FS_UUID=aBcDeF-1234-5678-9abc-def0-1234-567890
+ID_FS_VERSION=LVM2 001
+
+"""
+
+ADD_MULTIPATH_PV = b"""\
+UDEV  [5131.402210] change   /devices/virtual/block/dm-7 (block)
+ACTION=change
+DEVPATH=/devices/virtual/block/dm-7
+SUBSYSTEM=block
+DEVNAME=/dev/dm-7
+DEVTYPE=disk
+SEQNUM=3994
+MAJOR=253
+MINOR=7
+DM_NAME=mpatha
+DM_UUID=mpath-3600508b4000156d700012000000b0000
+ID_FS_TYPE=LVM2_member
+
+"""
+
+ADD_PARTITION = b"""\
+UDEV  [5140.002011] add      /devices/virtual/block/loop0/loop0p1 (block)
+ACTION=add
+DEVPATH=/devices/virtual/block/loop0/loop0p1
+SUBSYSTEM=block
+DEVNAME=/dev/loop0p1
+DEVTYPE=partition
+SEQNUM=4002
+MAJOR=259
+MINOR=0
+ID_FS_TYPE=xfs
+
+"""
+
+
+class _Resolver:
+    """A device resolver with fixed resolutions"""
+
+    def __init__(self, devices: Dict[Tuple[int, int], Optional[str]]) -> None:
+        self.devices = devices
+        self.refreshed = 0
+        self.invalidated = 0
+
+    def refresh(self) -> None:
+        self.refreshed += 1
+
+    def invalidate(self) -> None:
+        self.invalidated += 1
+
+    def lookup(self, key) -> Tuple[bool, Optional[str]]:
+        return key in self.devices, self.devices.get(key)
+
+
+def _replay(tmp_path, *blocks: bytes) -> List[Dict[str, str]]:
+    path = tmp_path / 'events'
+    path.write_bytes(b''.join(blocks))
+    events: List[Dict[str, str]] = []
+    with open(path, 'rb') as stream:
+        source = StreamSource(stream)
+        try:
+            while True:
+                events.extend(source.read())
+        except EOFError:
+            pass
+    return events
+
+
+def _mapper(
+        tmp_path,
+        devices: Optional[Dict[Tuple[int, int], Optional[str]]] = None
+) -> EventMapper:
+    lvm = SimpleNamespace(resolver=_Resolver(devices or {}))
+    return EventMapper(lvm, str(tmp_path))  # type: ignore
+
+
+def test_parse_kernel_uevent() -> None:
+    data = (
+        b'change@/devices/virtual/block/dm-2\0ACTION=change\0'
+        b'DEVPATH=/devices/virtual/block/dm-2\0SUBSYSTEM=block\0'
+        b'DEVNAME=dm-2\0SEQNUM=3936\0'
+    )
+    assert parse_uevent(data) == {
+        'ACTION': 'change',
+        'DEVPATH': '/devices/virtual/block/dm-2',
+        'SUBSYSTEM': 'block',
+        'DEVNAME': 'dm-2',
+        'SEQNUM': '3936'
+    }
+    assert parse_uevent(b'ACTION=change\0') is None
+
+
+def test_parse_udev_uevent() -> None:
+    properties = b'ACTION=add\0SUBSYSTEM=block\0DEVNAME=/dev/sdb\0'
+    header = bytearray(40)
+    header[:8] = b'libudev\0'
+    struct.pack_into('!I', header, 8, 0xfeedcafe)
+    struct.pack_into('=II', header, 16, len(header), len(properties))
+    assert parse_uevent(bytes(header) + properties) == {
+        'ACTION': 'add',
+        'SUBSYSTEM': 'block',
+        'DEVNAME': '/dev/sdb'
+    }
+    struct.pack_into('!I', header, 8, 0)
+    assert parse_uevent(bytes(header) + properties) is None
+
+
+@pytest.mark.parametrize('name, names', [
+    ('vg0-lv0', ('vg0', 'lv0')),
+    ('vg--data-lv0', ('vg-data', 'lv0')),
+    ('vg--a-lv--b--c', ('vg-a', 'lv-b-c')),
+    ('mpatha', None),
+    ('-lv0', None)
+])
+def test_split_dm_name(name: str, names: Optional[Tuple[str, str]]) -> None:
+    assert split_dm_name(name) == names
+
+
+def test_stream_source_reads_recorded_blocks(tmp_path) -> None:
+    # The last block of a recording need not end with a blank line.
+    events = _replay(tmp_path, ACTIVATE_LV, ADD_DISK.rstrip(b'\n'))
+    assert [event['SEQNUM'] for event in events] == ['3937', '3980']
+    assert events[0]['DM_LV_LAYER'] == ''
+    assert events[1]['ID_FS_VERSION'] == 'LVM2 001'
+
+
+def test_stream_source_keeps_a_partial_block() -> None:
+    read_fd, write_fd = os.pipe()
+    source = StreamSource(os.fdopen(read_fd, 'rb'))
+    os.write(write_fd, CHANGE_LV[:200])
+    assert source.read() == []
+    os.write(write_fd, CHANGE_LV[200:])
+    (event,) = source.read()
+    assert event['DM_LV_NAME'] == 'lv0'
+    os.close(write_fd)
+    with pytest.raises(EOFError):
+        source.read()
+    source.close()
+
+
+def test_logical_volume_lifecycle(tmp_path) -> None:
+    mapper = _mapper(tmp_path)
+    events = [
+        mapper.map(properties)
+        for properties in _replay(
+            tmp_path, ACTIVATE_LV, CHANGE_LV, THIN_POOL_LAYER, REMOVE_LV)
+    ]
+    assert [
+        (event.action, event.vg_name, event.lv_name, event.seqnum)
+        for event in events
+        if isinstance(event, LogicalVolumeEvent)
+    ] == [
+        (ACTIVATED, 'vg-data', 'lv0', 3937),
+        (CHANGED, 'vg-data', 'lv0', 3951),
+        (DEACTIVATED, 'vg-data', 'lv0', 3960)
+    ]
+    # The hidden layer of the thin pool is not reported.
+    assert events[2] is None
+
+
+def test_physical_volumes(tmp_path) -> None:
+    mapper = _mapper(tmp_path, {(8, 16): 'vg-data'})
+    disk, multipath, partition = (
+        mapper.map(properties)
+        for properties in _replay(
+            tmp_path, ADD_DISK, ADD_MULTIPATH_PV, ADD_PARTITION)
+    )
+    assert isinstance(disk, PhysicalVolumeEvent)
+    assert (disk.action, disk.vg_name, disk.device) == (
+        ADDED, 'vg-data', '/dev/sdb')
+    # A physical volume on a device mapper device which is not a logical
+    # volume, which the resolver has not seen.
+    assert isinstance(multipath, PhysicalVolumeEvent)
+    assert (multipath.action, multipath.vg_name, multipath.device) == (
+        CHANGED, None, '/dev/dm-7')
+    assert partition is None
+    # The new members make the next lookup on the lvm thread refresh.
+    assert mapper.resolver.invalidated == 2
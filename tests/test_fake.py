@@ -0,0 +1,166 @@
+"""Tests for the fake engine"""
+
+from errno import EAGAIN, EBUSY, EEXIST, ENOENT, ENOSPC, EPERM
+
+import pytest
+
+from jetblack_lvm2.exceptions import (
+    LVMException,
+    LVMExistsError,
+    LVMLockedError,
+    LVMNoSpaceError,
+    LVMNotFoundError,
+    LVMPlacementError
+)
+from jetblack_lvm2.fake import FakeEngine, FakeLVM
+from jetblack_lvm2.placement import LeastUtilised, Pinned
+
+MiB = 1024 * 1024
+
+
+@pytest.fixture
+def engine() -> FakeEngine:
+    engine = FakeEngine(lock_timeout=0.1)
+    engine.add_device('/dev/sda', 64 * MiB)
+    engine.add_device('/dev/sdb', 64 * MiB)
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_create('vg0') as vg:
+            vg.extend('/dev/sda')
+            vg.write()
+    return engine
+
+
+def test_seqno_increments_on_commit(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0', 'w') as vg:
+            seqno = vg.seqno
+            vg.add_tag('backup')
+            assert vg.seqno == seqno
+            vg.write()
+            assert vg.seqno == seqno + 1
+            vg.create_lv_linear('lv0', 4 * MiB)
+            assert vg.seqno == seqno + 2
+
+
+def test_readers_see_committed_metadata_only(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0', 'w') as writer:
+            writer.add_tag('pending')
+            with lvm.vg_open('vg0') as reader:
+                assert reader.tags == []
+            writer.write()
+        with lvm.vg_open('vg0') as reader:
+            assert reader.tags == ['pending']
+
+
+def test_lv_tags_need_a_write(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0', 'w') as vg:
+            lv = vg.create_lv_linear('lv0', 4 * MiB)
+            lv.add_tag('a')
+            lv.add_tag('a')
+            lv.add_tag('b')
+            assert lv.tags == ['a', 'b']
+            assert [v.name for v in vg.lvs_with_tag('a')] == ['lv0']
+            lv.remove_tag('a')
+            assert lv.tags == ['b']
+            assert vg.lvs_with_tag('a') == []
+        with lvm.vg_open('vg0') as vg:
+            assert vg.lv_from_name('lv0').tags == []
+
+
+def test_tags_on_a_read_only_handle(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0') as vg:
+            with pytest.raises(LVMException) as error:
+                vg.add_tag('backup')
+            assert error.value.errno == EPERM
+            assert lvm.errno == EPERM
+
+
+def test_errnos(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with pytest.raises(LVMNotFoundError) as not_found:
+            with lvm.vg_open('missing'):
+                pass
+        assert not_found.value.errno == ENOENT
+
+        with lvm.vg_open('vg0', 'w') as vg:
+            vg.create_lv_linear('lv0', 4 * MiB)
+            with pytest.raises(LVMExistsError) as exists:
+                vg.create_lv_linear('lv0', 4 * MiB)
+            assert exists.value.errno == EEXIST
+
+            with pytest.raises(LVMNoSpaceError) as no_space:
+                vg.create_lv_linear('big', 1024 * MiB)
+            assert no_space.value.errno == ENOSPC
+
+            lv = vg.lv_from_name('lv0')
+            lv.activate()
+            with pytest.raises(LVMLockedError) as busy:
+                lv.remove()
+            assert busy.value.errno == EBUSY
+            lv.deactivate()
+            lv.remove()
+            assert vg.try_lv_from_name('lv0') is None
+
+
+def test_write_lock(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0', 'w'):
+            with pytest.raises(LVMLockedError) as locked:
+                with lvm.vg_open('vg0', 'w'):
+                    pass
+            assert locked.value.errno == EAGAIN
+        with lvm.vg_open('vg0', 'w'):
+            pass
+
+
+def test_pv_records(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        lvm.pv_create('/dev/sdb', 0)
+        records = {record.name: record for record in lvm.pv_records()}
+        assert records['/dev/sda'].vg_name == 'vg0'
+        assert records['/dev/sdb'].vg_name is None
+        assert lvm.vgname_from_device('/dev/sda') == 'vg0'
+
+
+def test_create_lv_reports_the_actual_placement(engine: FakeEngine) -> None:
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0', 'w') as vg:
+            vg.extend('/dev/sdb')
+            vg.write()
+            vg.create_lv_linear('lv0', 32 * MiB)
+
+            placed = vg.create_lv('lv1', 8 * MiB, LeastUtilised())
+            assert placed.planned.devices == ['/dev/sdb']
+            assert placed.actual.devices == ['/dev/sda']
+            assert not placed.as_planned
+
+            with pytest.raises(LVMPlacementError):
+                vg.create_lv('lv2', 8 * MiB, Pinned(['/dev/sdb']))
+            assert vg.try_lv_from_name('lv2') is None
+
+            placed = vg.create_lv('lv3', 4 * MiB, Pinned(['/dev/sda']))
+            assert placed.as_planned
+
+
+def test_open_readers_keep_their_copy(
+        engine: FakeEngine,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Fold the changes into new shared dicts while readers hold the old ones.
+    monkeypatch.setattr('jetblack_lvm2.fake._MAX_CHANGES', 2)
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_open('vg0') as before:
+            with lvm.vg_open('vg0', 'w') as vg:
+                for index in range(5):
+                    vg.create_lv_linear(f'lv{index}', 4 * MiB)
+                vg.lv_from_name('lv1').remove()
+            assert before.logical_volumes == []
+        with lvm.vg_open('vg0') as vg:
+            assert [lv.name for lv in vg.logical_volumes] == [
+                'lv0', 'lv2', 'lv3', 'lv4'
+            ]
+            assert vg.lv_from_uuid(vg.lv_from_name('lv4').uuid).name == 'lv4'
+            assert vg.try_lv_from_name('lv1') is None
@@ -0,0 +1,75 @@
+"""Tests for replaying the journal"""
+
+from typing import Any, Dict, List, Optional
+
+from jetblack_lvm2.journal import Journal, read_journal, replay
+
+
+def _record(
+        op: str,
+        args: List[Any],
+        before: int,
+        after: int,
+        lv: Optional[str] = None,
+        ok: bool = True
+) -> Dict[str, Any]:
+    return {
+        'time': 0.0,
+        'vg': 'vg0',
+        'vg_uuid': 'uuid0',
+        'op': op,
+        'lv': lv,
+        'args': args,
+        'seqno_before': before,
+        'seqno_after': after,
+        'ok': ok,
+        'errno': None if ok else 5,
+        'duration': 0.0
+    }
+
+
+RECORDS = [
+    _record('create_lv_linear', ['lv0', 4096], 1, 2),
+    _record('add_tag', ['backup'], 2, 2),
+    _record('add_tag', ['cache'], 2, 2, lv='lv0'),
+    _record('write', [], 2, 3),
+    _record('create_lv_linear', ['lv1', 8192], 3, 4),
+    _record('create_lv_linear', ['lv2', 8192], 4, 4, ok=False),
+    _record('add_tag', ['pending'], 4, 4)
+]
+
+
+def test_replay() -> None:
+    state = replay(RECORDS)['uuid0']
+    assert state.seqno == 4
+    assert state.tags == {'backup'}
+    assert sorted(state.logical_volumes) == ['lv0', 'lv1']
+    assert state.logical_volumes['lv0'].tags == {'cache'}
+    assert [record['args'] for record in state.pending] == [['pending']]
+
+
+def test_replay_to_seqno() -> None:
+    state = replay(RECORDS, seqno=3)['uuid0']
+    assert state.seqno == 3
+    assert sorted(state.logical_volumes) == ['lv0']
+
+
+def test_rotation(tmp_path) -> None:
+    path = str(tmp_path / 'journal')
+    journal = Journal(path, max_bytes=600, backups=2)
+    for record in RECORDS * 3:
+        journal.append(record)
+    records = list(read_journal(path, backups=2))
+    assert 0 < len(records) < len(RECORDS) * 3
+    assert records[-1] == RECORDS[-1]
+
+
+def test_records_are_flushed_as_written(tmp_path) -> None:
+    path = str(tmp_path / 'journal')
+    journal = Journal(path)
+    journal.append(RECORDS[0])
+    assert list(read_journal(path)) == [RECORDS[0]]
+    journal.close()
+    journal.append(RECORDS[1])
+    assert list(read_journal(path)) == RECORDS[:2]
+    journal.close()
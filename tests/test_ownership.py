@@ -0,0 +1,61 @@
+"""Tests for handle ownership"""
+
+import threading
+
+import pytest
+
+from jetblack_lvm2.exceptions import LVMClosedError, LVMOwnershipError
+from jetblack_lvm2.ownership import HandleGuard
+
+
+def _in_thread(target) -> BaseException:
+    errors = []
+
+    def run() -> None:
+        try:
+            target()
+        except BaseException as error:  # pylint: disable=broad-except
+            errors.append(error)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return errors[0] if errors else None
+
+
+def test_affinity_refuses_other_threads() -> None:
+    guard = HandleGuard('lvm', thread_affinity=True)
+    guard.check()
+    with guard:
+        guard.check()
+
+    def enter() -> None:
+        with guard:
+            pass
+
+    assert isinstance(_in_thread(guard.check), LVMOwnershipError)
+    assert isinstance(_in_thread(enter), LVMOwnershipError)
+    guard.check()
+
+
+def test_without_affinity_any_thread_may_use() -> None:
+    guard = HandleGuard('lvm', thread_affinity=False)
+
+    def enter() -> None:
+        with guard:
+            guard.check()
+
+    assert _in_thread(enter) is None
+
+
+def test_closed() -> None:
+    guard = HandleGuard('lvm')
+    guard.close()
+    with pytest.raises(LVMClosedError):
+        guard.check()
+
+
+def test_affinity_by_default() -> None:
+    guard = HandleGuard('lvm')
+    guard.check()
+    assert isinstance(_in_thread(guard.check), LVMOwnershipError)
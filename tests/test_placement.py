@@ -0,0 +1,58 @@
+"""Tests for the placement policies"""
+
+import pytest
+
+from jetblack_lvm2.exceptions import LVMNoSpaceError, LVMNotFoundError
+from jetblack_lvm2.placement import (
+    Capacity,
+    LeastUtilised,
+    Pinned,
+    Spread,
+    used_extents
+)
+
+EXTENT = 4
+PVS = [
+    Capacity('/dev/sda', 100, 10),
+    Capacity('/dev/sdb', 100, 80),
+    Capacity('/dev/sdc', 50, 50)
+]
+
+
+def test_least_utilised() -> None:
+    placement = LeastUtilised().plan(PVS, 60 * EXTENT, EXTENT)
+    assert placement.allocations == (('/dev/sdc', 50), ('/dev/sdb', 10))
+    assert placement.extent_count == 60
+
+
+def test_spread() -> None:
+    placement = Spread().plan(PVS, 30 * EXTENT, EXTENT)
+    assert dict(placement.allocations) == {
+        '/dev/sda': 10, '/dev/sdb': 10, '/dev/sdc': 10
+    }
+    placement = Spread(max_devices=2).plan(PVS, 31 * EXTENT, EXTENT)
+    assert dict(placement.allocations) == {'/dev/sdb': 15, '/dev/sdc': 16}
+
+
+def test_spread_moves_the_shortfall() -> None:
+    placement = Spread().plan(PVS, 90 * EXTENT, EXTENT)
+    assert dict(placement.allocations) == {
+        '/dev/sda': 10, '/dev/sdb': 40, '/dev/sdc': 40
+    }
+
+
+def test_pinned() -> None:
+    placement = Pinned(['/dev/sda', '/dev/sdb']).plan(PVS, 20 * EXTENT, EXTENT)
+    assert placement.devices == ['/dev/sdb']
+    assert placement.lvcreate_args('vg0', 'lv0') == [
+        'lvcreate', '--name', 'lv0', '--extents', '20', 'vg0', '/dev/sdb'
+    ]
+    with pytest.raises(LVMNotFoundError):
+        Pinned(['/dev/sdz']).plan(PVS, EXTENT, EXTENT)
+    with pytest.raises(LVMNoSpaceError):
+        Pinned(['/dev/sda']).plan(PVS, 11 * EXTENT, EXTENT)
+
+
+def test_used_extents() -> None:
+    after = [pv._replace(free_extents=pv.free_extents - 5) for pv in PVS[:2]]
+    assert used_extents(PVS, after + PVS[2:]) == {'/dev/sda': 5, '/dev/sdb': 5}
@@ -0,0 +1,50 @@
+"""Tests for configuration profiles"""
+
+import pytest
+
+from jetblack_lvm2.profiles import (
+    MONITORING,
+    NO_UDEV,
+    NVME_ONLY,
+    SKIP_VIRTUAL,
+    ConfigProfile,
+    combine_profiles,
+    scan_devices
+)
+
+
+def test_filters_are_intersected() -> None:
+    combined = combine_profiles(['nvme_only', SKIP_VIRTUAL])
+    assert combined.settings['devices/global_filter'] == [
+        'r|^/dev/loop|',
+        'r|^/dev/ram|',
+        'r|^/dev/sr|',
+        'r|^/dev/fd|',
+        'a|^/dev/nvme|',
+        'r|.*|'
+    ]
+    assert combined.settings['devices/filter'] == (
+        NVME_ONLY.settings['devices/filter']
+    )
+    assert (NVME_ONLY + NVME_ONLY).settings == NVME_ONLY.settings
+
+
+def test_accepting_filters_are_refused() -> None:
+    # Joining the accepted devices would widen the scan of each profile.
+    with pytest.raises(ValueError):
+        combine_profiles([NVME_ONLY, scan_devices('sd_only', ['^/dev/sd'])])
+
+
+def test_distinct_settings_are_merged() -> None:
+    combined = MONITORING + NO_UDEV
+    assert combined.settings == {**MONITORING.settings, **NO_UDEV.settings}
+    assert combined.name == 'monitoring+no_udev'
+
+
+def test_conflicting_settings_are_refused() -> None:
+    other = ConfigProfile('locking', {'global/locking_type': 1})
+    with pytest.raises(ValueError):
+        combine_profiles([MONITORING, other])
+    assert combine_profiles(
+        [MONITORING, ConfigProfile('same', {'global/locking_type': 0})]
+    ) is not None
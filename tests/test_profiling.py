@@ -0,0 +1,15 @@
+"""Tests for call tree profiling"""
+
+import os
+import subprocess
+import sys
+
+
+def test_importing_does_not_start_profiling(tmp_path) -> None:
+    path = tmp_path / 'profile'
+    subprocess.run(
+        [sys.executable, '-c', 'import jetblack_lvm2'],
+        env={**os.environ, 'JETBLACK_LVM2_PROFILE': str(path)},
+        check=True
+    )
+    assert not path.exists()
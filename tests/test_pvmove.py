@@ -0,0 +1,70 @@
+"""Tests for physical volume evacuation"""
+
+from errno import EIO
+import subprocess
+
+import pytest
+
+from jetblack_lvm2.exceptions import LVMCommandError, LVMLockedError
+from jetblack_lvm2.fake import FakeEngine, FakeLVM
+from jetblack_lvm2.pvmove import PVEvacuation
+
+MiB = 1024 * 1024
+
+
+def test_a_pass_which_moves_nothing_fails(tmp_path) -> None:
+    engine = FakeEngine()
+    engine.add_device('/dev/sda', 64 * MiB)
+    engine.add_device('/dev/sdb', 64 * MiB)
+    commands = []
+
+    def runner(args):
+        # Succeeds without moving anything.
+        commands.append(args)
+        return subprocess.CompletedProcess(args, 0, b'', b'')
+
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_create('vg0') as vg:
+            vg.extend('/dev/sda')
+            vg.extend('/dev/sdb')
+            vg.write()
+            vg.create_lv_linear('lv0', 8 * MiB)
+
+        evacuation = PVEvacuation(
+            lvm,
+            'vg0',
+            '/dev/sda',
+            str(tmp_path / 'state'),
+            chunk_extents=1024,
+            bandwidth=8 * MiB,
+            runner=runner
+        )
+        with pytest.raises(LVMLockedError):
+            evacuation.run()
+
+    # The bandwidth limit does not shrink the chunks.
+    assert commands[0] == ['pvmove', '/dev/sda:0-14']
+
+
+def test_a_failed_pvmove_keeps_its_exit_status(tmp_path) -> None:
+    engine = FakeEngine()
+    engine.add_device('/dev/sda', 64 * MiB)
+
+    def runner(args):
+        return subprocess.CompletedProcess(args, 5, b'', b'Insufficient space')
+
+    with FakeLVM(engine) as lvm:
+        with lvm.vg_create('vg0') as vg:
+            vg.extend('/dev/sda')
+            vg.write()
+            vg.create_lv_linear('lv0', 8 * MiB)
+
+        evacuation = PVEvacuation(
+            lvm, 'vg0', '/dev/sda', str(tmp_path / 'state'), runner=runner)
+        with pytest.raises(LVMCommandError) as error:
+            evacuation.run()
+
+    assert error.value.returncode == 5
+    assert error.value.errno == EIO
+    assert error.value.msg == 'Insufficient space'
+    assert evacuation.load_state()['in_progress']
@@ -0,0 +1,78 @@
+"""Tests for the query predicates"""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from jetblack_lvm2.predicates import Field, HasTag, Predicate
+
+READS: List[str] = []
+
+
+def _getter(name: str):
+    def get(handle: Dict[str, Any]) -> Any:
+        READS.append(name)
+        return handle[name]
+    return get
+
+
+SIZE = Field('size', _getter('size'), 1)
+NAME = Field(
+    'name',
+    _getter('name'),
+    2,
+    lambda value: value.decode('ascii'),
+    lambda value: value.encode('ascii')
+)
+ACTIVE = Field('active', _getter('active'), 1)
+TAGS = Field('tags', _getter('tags'), 4)
+
+
+def _test(predicate: Predicate, handle: Dict[str, Any]) -> bool:
+    READS.clear()
+    return predicate.compile()(handle, {})
+
+
+def test_compare() -> None:
+    handle = {'size': 10, 'name': b'root', 'active': True, 'tags': set()}
+    assert _test(SIZE > 5, handle)
+    assert not _test(SIZE < 5, handle)
+    assert _test(NAME == 'root', handle)
+    assert _test(NAME.startswith('ro'), handle)
+    assert _test(~(NAME == 'home'), handle)
+
+
+def test_combine() -> None:
+    handle = {'size': 10, 'name': b'root', 'active': False, 'tags': {b'a'}}
+    assert not _test((SIZE > 5) & ACTIVE, handle)
+    assert _test((SIZE > 50) | HasTag(TAGS, 'a'), handle)
+    assert (SIZE > 5).fields() == frozenset(('size',))
+    assert ((SIZE > 5) & (NAME == 'x')).fields() == frozenset(('size', 'name'))
+
+
+def test_cheapest_checks_run_first() -> None:
+    handle = {'size': 1, 'name': b'root', 'active': True, 'tags': {b'a'}}
+    assert not _test(HasTag(TAGS, 'a') & (NAME == 'root') & (SIZE > 5), handle)
+    assert READS == ['size']
+
+
+def test_values_are_read_once() -> None:
+    handle = {'size': 10, 'name': b'root', 'active': True, 'tags': set()}
+    assert _test((SIZE > 5) & (SIZE < 20), handle)
+    assert READS == ['size']
+
+
+def test_no_truth_value() -> None:
+    with pytest.raises(TypeError):
+        bool(SIZE)
+    with pytest.raises(TypeError):
+        5 < SIZE < 20  # pylint: disable=pointless-statement
+    with pytest.raises(TypeError):
+        (SIZE > 5) and ACTIVE  # pylint: disable=pointless-statement
+    with pytest.raises(TypeError):
+        not (SIZE > 5)  # pylint: disable=pointless-statement
+
+
+def test_predicate_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Predicate()  # pylint: disable=abstract-class-instantiated
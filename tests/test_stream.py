@@ -0,0 +1,59 @@
+"""Tests for the streaming inventory"""
+
+from ctypes.util import find_library
+import io
+
+import pytest
+
+if find_library('lvm2app') is None:
+    pytest.skip('liblvm2app is not installed', allow_module_level=True)
+
+# pylint: disable=wrong-import-position
+from jetblack_lvm2.stream import BinaryRecordWriter, read_records
+
+
+def test_binary_records_round_trip() -> None:
+    fp = io.BytesIO()
+    writer = BinaryRecordWriter(fp)
+    writer.write('vg', ('vg0', 'uuid-vg0', 2 ** 40, 2 ** 39, 7))
+    writer.write('lv', ('vg0', 'lv0', 'uuid-lv0', '-wi-a-----', 2 ** 32, 1))
+    writer.write('pv', ('vg0', '/dev/sda', 'uuid-pv0', 2 ** 40, 0, 1))
+    writer.flush()
+
+    fp.seek(0)
+    assert list(read_records(fp)) == [
+        {
+            'type': 'vg',
+            'name': 'vg0',
+            'uuid': 'uuid-vg0',
+            'size': 2 ** 40,
+            'free_size': 2 ** 39,
+            'seqno': 7
+        },
+        {
+            'type': 'lv',
+            'vg': 'vg0',
+            'name': 'lv0',
+            'uuid': 'uuid-lv0',
+            'attr': '-wi-a-----',
+            'size': 2 ** 32,
+            'active': 1
+        },
+        {
+            'type': 'pv',
+            'vg': 'vg0',
+            'name': '/dev/sda',
+            'uuid': 'uuid-pv0',
+            'size': 2 ** 40,
+            'free': 0,
+            'mda_count': 1
+        }
+    ]
+
+
+def test_a_truncated_record_raises() -> None:
+    fp = io.BytesIO()
+    BinaryRecordWriter(fp).write('vg', ('vg0', 'uuid-vg0', 1, 0, 1))
+    fp = io.BytesIO(fp.getvalue()[:-1])
+    with pytest.raises(EOFError):
+        list(read_records(fp))